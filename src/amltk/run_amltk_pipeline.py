@@ -106,9 +106,9 @@ def main() -> None:
 
     # Choose set of datasets
     all_datasets = [5, 14, 15, 17, 18, 21, 22, 23, 24, 27, 28, 29, 31, 35, 36]  # 16
-    small_datasets = [1, 5, 14, 17, 18, 21, 27, 31, 35, 36]
+    small_datasets = get_suite("amltk", "small")
     smallest_datasets = [14, 16, 17, 21, 35]  # n ~ 1000, p ~ 15
-    big_datasets = [15, 22, 23, 24, 28, 29]
+    big_datasets = get_suite("amltk", "wide")
 
     optimizer_cls = RandomSearch
     pipeline = lgbm_classifier_pipeline
@@ -140,13 +140,16 @@ def main() -> None:
         display = True
         wait_for_all_workers_to_finish = False
 
+    # Fetch all chosen datasets into the local cache at once instead of one after another inside the loop
+    dataset_views = prefetch_datasets(all_datasets)
+
     for fold in range(folds):
         print("\n\n\n*******************************\n Fold " + str(fold) + "\n*******************************\n")
         inner_fold_seed = random_seed + fold
         # Iterate over all chosen datasets
         for option in all_datasets:
             # Get train test splitted dataset
-            train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=option)
+            train_x, train_y, test_x, test_y, task_hint, name = dataset_views[option].fold()
 
             # ############# Feature Engineering with Method xxx ############# #
             file_name = "results_" + str(name) + "_xxx_" + str(fold) + ".parquet"
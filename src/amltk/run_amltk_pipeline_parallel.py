@@ -12,9 +12,11 @@ from sklearn.metrics import get_scorer
 from sklearn.preprocessing import *
 
 from src.amltk.classifiers.Classifiers import *
+from src.datasets.Artifacts import ARTIFACT_STATS, get_or_compute_features
 from src.datasets.Datasets import *
 from src.amltk.evaluation.Evaluator import get_cv_evaluator
 from src.amltk.optimizer.RandomSearch import RandomSearch
+from src.feature_engineering.Configs import AMLTK_CONFIGS
 
 from src.feature_engineering.autofeat.Autofeat import get_autofeat_features
 from src.feature_engineering.AutoGluon.AutoGluon import get_autogluon_features
@@ -76,19 +78,100 @@ def safe_dataframe(df, working_dir, dataset_name, fold_number, method_name, clas
 lgbm_classifier = get_lgbm_classifier()
 lgbm_classifier_pipeline = Sequential(preprocessing, lgbm_classifier, name="lgbm_classifier_pipeline")
 
+working_dir = Path("src/amltk/results/files")  # Path
 
-def main(args):
-    method_dataset = args.method_dataset
+
+# Adapters from the AMLTK fold to the feature engineering functions, with one configuration of AMLTK_CONFIGS
+def _original(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return train_x, test_x
+
+
+def _autofeat(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_autofeat_features(train_x.copy(), train_y, test_x.copy(), task_hint, config["feat_eng_steps"],
+                                 config["feat_sel_steps"])
+
+
+def _autogluon(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_autogluon_features(train_x, train_y, test_x)
+
+
+def _bioautoml(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_bioautoml_features(train_x, train_y, test_x, config["estimations"], config["continuous"])
+
+
+def _boruta(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_boruta_features(train_x, train_y, test_x)
+
+
+def _cfs(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_correlationbased_features(train_x, train_y, test_x)
+
+
+def _featurewiz(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_featurewiz_features(train_x, train_y, test_x)
+
+
+def _h2o(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_h2o_features(train_x, train_y, test_x)
+
+
+def _macfe(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_macfe_features(train_x, train_y, test_x, test_y, name)
+
+
+def _mafese(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_mafese_features(train_x, train_y, test_x, test_y, name, config["num_features"])
+
+
+def _mljar(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_mljar_features(train_x, train_y, test_x, config["num_features"])
+
+
+def _openfe(train_x, train_y, test_x, test_y, task_hint, name, config):
+    return get_openFE_features(train_x, train_y, test_x, config["n_jobs"], name)
+
+
+# Prefix used in --method_dataset -> (method name in the result files, feature engineering adapter, deterministic,
+# feature engineering function (its package defines the code version of stored features), alternative configurations
+# tried in order while the method fails, shared with the feature engineering pipeline)
+# Features of deterministic methods are computed once and shared by all repetitions, the others are computed for
+# every repetition so that the variance of the method stays part of the results.
+METHODS = {
+    "original": ("original", _original, True, None, [{}]),
+    "autofeat": ("autofeat", _autofeat, False, get_autofeat_features, AMLTK_CONFIGS["autofeat"]),
+    "autogluon": ("autogluon", _autogluon, True, get_autogluon_features, AMLTK_CONFIGS["autogluon"]),
+    "bioautoml": ("bioautoml", _bioautoml, False, get_bioautoml_features, AMLTK_CONFIGS["bioautoml"]),
+    "boruta": ("boruta", _boruta, False, get_boruta_features, AMLTK_CONFIGS["boruta"]),
+    "cfs": ("correlationBasedFS", _cfs, True, get_correlationbased_features, AMLTK_CONFIGS["correlationBasedFS"]),
+    "featurewiz": ("featurewiz", _featurewiz, False, get_featurewiz_features, AMLTK_CONFIGS["featurewiz"]),
+    "h2o": ("h2o", _h2o, False, get_h2o_features, AMLTK_CONFIGS["h2o"]),
+    "macfe": ("macfe", _macfe, False, get_macfe_features, AMLTK_CONFIGS["macfe"]),
+    "mafese": ("mafese", _mafese, False, get_mafese_features, AMLTK_CONFIGS["mafese"]),
+    "mljar": ("mljar", _mljar, False, get_mljar_features, AMLTK_CONFIGS["mljar"]),
+    "openfe": ("openfe", _openfe, True, get_openFE_features, AMLTK_CONFIGS["openfe"]),
+}
+
+
+def parse_method_dataset(method_dataset) -> tuple[str, int]:
+    # Match against the registered prefixes, a regex on letters/digits would split e.g. "h2o1" wrongly
+    for method in sorted(METHODS, key=len, reverse=True):
+        if method_dataset.startswith(method) and method_dataset[len(method):].isdigit():
+            return method, int(method_dataset[len(method):])
+    raise ValueError(f"Unknown method or dataset in {method_dataset}, choose one of {list(METHODS)} + dataset option")
+
+
+def result_file(method, option, fold) -> Path:
+    name = get_dataset_info(option)["name"]
+    return working_dir / f"results_{name}_{METHODS[method][0]}_{lgbm_classifier_pipeline.name}_{fold}.parquet"
+
+
+def run_method_dataset(method, option, folds=range(10), n_workers=4):
+    method_name, get_features, deterministic, fe_function, configs = METHODS[method]
 
     rerun = True  # Decide if you want to re-execute the methods on a dataset or use the existing files
     debugging = False  # Decide if you want ot raise trial exceptions
-    feat_eng_steps = 2  # Number of feature engineering steps for autofeat
-    feat_sel_steps = 5  # Number of feature selection steps for autofeat
-    num_features = 500  # Number of features for MLJAR
-    estimations = 50  # Number of estimations for BioAutoML
-    working_dir = Path("src/amltk/results/files")  # Path
     random_seed = 42  # Set seed
-    folds = 10  # Set number of repetitions
+    outer_fold_number = 0  # All repetitions use the same outer split, only the seed changes
 
     optimizer_cls = RandomSearch
     pipeline = lgbm_classifier_pipeline
@@ -103,7 +186,6 @@ def main(args):
     if debugging:
         max_trials = 1  # don't care about quality of the found model
         max_time = 300  # 5 minutes
-        n_workers = 4
         # Raise an error with traceback, something went wrong
         on_trial_exception = "raise"
         display = True
@@ -111,467 +193,72 @@ def main(args):
     else:
         max_trials = 100000
         max_time = 3600  # one hour
-        n_workers = 4
         # Mark the trial as fail and move on to the next one
         on_trial_exception = "continue"
         display = True
         wait_for_all_workers_to_finish = False
 
+    dataset = DatasetView(option)
+    name = dataset.info["name"]
+    print(f"{method_name} Data - {name}")
+    features = None
+
     # Iterate over 10 folds (10 repetitions)
-    for fold in range(folds):
+    for fold in folds:
         print(f"\n\n\n*******************************\n Fold {fold}\n*******************************\n")
         inner_fold_seed = random_seed + fold
+        if not rerun and os.path.isfile(result_file(method, option, fold)):
+            print("File exists, going for next fold")
+            continue
         try:
-            # Run AMLTK for Original Dataset
-            if method_dataset.startswith("original"):
-                print("Original Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                existing_file = "src/amltk/results/files/" + file_name
-                if rerun or not os.path.isfile(existing_file):
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with Autofeat and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("autofeat"):
-                print("autofeat Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                try:
-                    train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                    print(name)
-                    file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                    file = working_dir / file_name
-                    if rerun or not os.path.isfile(file):
-                        train_x, test_x = get_autofeat_features(train_x, train_y, test_x, task_hint, feat_eng_steps,
-                                                                feat_sel_steps)
-                        evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                     on_trial_exception, task_hint)
-                except:
-                    train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                    print(name)
-                    file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                    file = working_dir / file_name
-                    if rerun or not os.path.isfile(file):
-                        train_x, test_x = get_autofeat_features(train_x, train_y, test_x, task_hint, feat_eng_steps - 1,
-                                                                feat_sel_steps)
-                        evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                     on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with Autogluon and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("autogluon"):
-                print("autogluon Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                print(name)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                file = working_dir / file_name
-                if rerun or not os.path.isfile(file):
-                    train_x, test_x = get_autogluon_features(train_x, train_y, test_x)
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with BioAutoML and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("bioautoml"):
-                print("BioAutoML Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                print(name)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                file = working_dir / file_name
-                if rerun or not os.path.isfile(file):
-                    continuous = True
-                    train_x, test_x = get_bioautoml_features(train_x, train_y, test_x, estimations, continuous)
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception,
-                                                 task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
+            if features is None or not deterministic:
+                train_x, train_y, test_x, test_y, task_hint, name = dataset.fold(outer_fold_number)
+                if fe_function is None:
+                    train_x, test_x = get_features(train_x, train_y, test_x, test_y, task_hint, name, configs[0])
+                else:
+                    # Stochastic methods get one stored artifact per repetition, the first repetition shares its
+                    # artifact with split 0 of the feature engineering pipeline
+                    artifact_configs = configs if deterministic or fold == 0 else [
+                        {**config, "repetition": fold} for config in configs]
+                    train_x, test_x = get_or_compute_features(
+                        dataset.info["openml_task_id"], outer_fold_number, method_name, artifact_configs, fe_function,
+                        lambda config: get_features(train_x, train_y, test_x, test_y, task_hint, name, config),
+                        retry_on=(Exception,)
                     )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with Boruta and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("boruta"):
-                print("boruta Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                print(name)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                file = working_dir / file_name
-                if rerun or not os.path.isfile(file):
-                    train_x, test_x = get_boruta_features(train_x, train_y, test_x)
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with CorrelationBasedFS and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("cfs"):
-                print("CorrelationBasedFS Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                print(name)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                file = working_dir / file_name
-                if rerun or not os.path.isfile(file):
-                    train_x, test_x = get_correlationbased_features(train_x, train_y, test_x)
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with Featurewiz and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("featurewiz"):
-                print("Featurewiz Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                print(name)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                file = working_dir / file_name
-                if rerun or not os.path.isfile(file):
-                    train_x, test_x = get_featurewiz_features(train_x, train_y, test_x)
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with H2O and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("h2o"):
-                print("H2O Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                print(name)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                file = working_dir / file_name
-                if rerun or not os.path.isfile(file):
-                    train_x, test_x = get_h2o_features(train_x, train_y, test_x)
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with MACFE and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("macfe"):
-                print("MACFE Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                print(name)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                file = working_dir / file_name
-                if rerun or not os.path.isfile(file):
-                    train_x, test_x = get_macfe_features(train_x, train_y, test_x, test_y, name)
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with MAFESE and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("mafese"):
-                print("MAFESE Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                print(name)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                file = working_dir / file_name
-                if rerun or not os.path.isfile(file):
-                    train_x, test_x = get_mafese_features(train_x, train_y, test_x, test_y, name, num_features)
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with MLJAR and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("mljar"):
-                print("MLJAR Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                print(name)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                file = working_dir / file_name
-                if rerun or not os.path.isfile(file):
-                    train_x, test_x = get_mljar_features(train_x, train_y, test_x, num_features)
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
-            # Do Feature Engineering with OpenFE and run AMLTK for feature-engineered Dataset
-            elif method_dataset.startswith("openfe"):
-                print("OpenFE Data")
-                dataset = method_dataset[-2:]
-                try:
-                    int(dataset)
-                except ValueError:
-                    dataset = method_dataset[-1:]
-                dataset = int(dataset)
-                method = method_dataset.replace(dataset, "")
-                pipeline_name = pipeline.name
-                train_x, train_y, test_x, test_y, task_hint, name = get_dataset(option=dataset)
-                print(name)
-                file_name = f"results_{name}_{method}_{pipeline_name}_{fold}.parquet"
-                file = working_dir / file_name
-                if rerun or not os.path.isfile(file):
-                    train_x, test_x = get_openFE_features(train_x, train_y, test_x, 1, name)
-                    evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
-                                                 on_trial_exception, task_hint)
-                    history = pipeline.optimize(
-                        target=evaluator.fn,
-                        metric=metric_definition,
-                        optimizer=optimizer_cls,
-                        seed=inner_fold_seed,
-                        max_trials=max_trials,
-                        timeout=max_time,
-                        display=display,
-                        wait=wait_for_all_workers_to_finish,
-                        n_workers=n_workers,
-                        on_trial_exception=on_trial_exception
-                    )
-                    if history.df() is None:
-                        df = pd.DataFrame()
-                    else:
-                        df = history.df()
-                    safe_dataframe(df, working_dir, name, fold, method, pipeline_name)
+                features = train_x, train_y, test_x, test_y, task_hint
+            train_x, train_y, test_x, test_y, task_hint = features
+            evaluator = get_cv_evaluator(train_x, train_y, test_x, test_y, inner_fold_seed,
+                                         on_trial_exception, task_hint)
+            history = pipeline.optimize(
+                target=evaluator.fn,
+                metric=metric_definition,
+                optimizer=optimizer_cls,
+                seed=inner_fold_seed,
+                max_trials=max_trials,
+                timeout=max_time,
+                display=display,
+                wait=wait_for_all_workers_to_finish,
+                n_workers=n_workers,
+                on_trial_exception=on_trial_exception
+            )
+            if history.df() is None:
+                df = pd.DataFrame()
+            else:
+                df = history.df()
+            safe_dataframe(df, working_dir, name, fold, method_name, pipeline.name)
         except Exception as e:
             print(e)
+    print(f"Feature artifact store: {ARTIFACT_STATS}")
+
+
+def main(args):
+    method, option = parse_method_dataset(args.method_dataset)
+    run_method_dataset(method, option)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Run feature engineering methods')
-    parser.add_argument('--method', type=str, required=True, help='Feature engineering method to use')
+    parser.add_argument('--method_dataset', type=str, required=True,
+                        help='Feature engineering method prefix followed by the dataset option, e.g. openfe14')
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,189 @@
+import argparse
+import heapq
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.datasets.Datasets import get_dataset_info, get_suite, prefetch_datasets
+from src.amltk.run_amltk_pipeline_parallel import METHODS, result_file, run_method_dataset, working_dir
+
+claims_dir = working_dir / "claims"  # One file per (method, dataset, fold) cell that a worker has taken
+claim_heartbeat = 300  # Seconds between refreshes of the modification time of a held claim
+claim_stale_after = 3 * claim_heartbeat  # A claim without heartbeat for this long belongs to a dead worker
+fe_cells_per_optimize = 1_000_000  # n * p at which feature engineering takes roughly as long as the 1h optimization
+
+
+def enumerate_cells(methods, options, folds) -> list[tuple[str, int, int]]:
+    return [(method, option, fold) for method in methods for option in options for fold in range(folds)]
+
+
+def estimate_cost(cell) -> float:
+    """Relative cost of a cell in units of one optimization run (all cells optimize for the same time budget)."""
+    method, option, fold = cell
+    if method == "original":
+        return 1.0
+    info = get_dataset_info(option)
+    return 1.0 + info["n"] * info["p"] / fe_cells_per_optimize
+
+
+def is_done(cell) -> bool:
+    return os.path.isfile(result_file(*cell))
+
+
+def _claim_path(cell) -> Path:
+    method, option, fold = cell
+    return claims_dir / f"{method}{option}_{fold}.claim"
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def is_stale(path) -> bool:
+    """A claim is stale if its worker is gone: a dead pid on this host, or no heartbeat for claim_stale_after."""
+    try:
+        owner = path.read_text().split()
+        age = time.time() - path.stat().st_mtime
+    except (OSError, ValueError):
+        return False  # Released meanwhile, or not written yet
+    if len(owner) == 2 and owner[0] == socket.gethostname() and owner[1].isdigit():
+        return not _pid_alive(int(owner[1]))
+    return age > claim_stale_after
+
+
+def claim(cell) -> bool:
+    """Atomically take a cell, exactly one worker over all nodes (shared filesystem) succeeds.
+
+    A stale claim of an unfinished cell is first moved out of the way with an (atomic) rename, so only one worker takes
+    it over. In the worst case, a worker that judged a claim stale just before it was taken over runs the cell twice.
+    """
+    path = _claim_path(cell)
+    if path.exists() and not is_done(cell) and is_stale(path):
+        stale_path = path.with_name(f"{path.name}.{socket.gethostname()}.{os.getpid()}.stale")
+        try:
+            os.rename(path, stale_path)
+        except OSError:
+            pass  # Another worker took it over first
+        else:
+            print(f"Taking over stale claim {path.name}")
+            os.remove(stale_path)
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(f"{socket.gethostname()} {os.getpid()}\n")
+    return True
+
+
+@contextmanager
+def held(cell):
+    """Keep the claim of a cell alive while it runs, and release it if the cell ends without a result file
+    (failure or exception), so the next run of the scheduler retries the cell."""
+    path = _claim_path(cell)
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(claim_heartbeat):
+            try:
+                os.utime(path)
+            except OSError:
+                return
+
+    thread = threading.Thread(target=heartbeat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+        if not is_done(cell):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def partition(cells, n_bins) -> list[list[tuple[str, int, int]]]:
+    """Longest-processing-time-first packing: the most expensive cells are spread first, each on the emptiest bin."""
+    bins = [[] for _ in range(n_bins)]
+    loads = [(0.0, i) for i in range(n_bins)]
+    for cell in sorted(cells, key=estimate_cost, reverse=True):
+        load, i = heapq.heappop(loads)
+        bins[i].append(cell)
+        heapq.heappush(loads, (load + estimate_cost(cell), i))
+    return bins
+
+
+def run_worker(worker_id, n_workers, cells, trial_workers) -> int:
+    """Work through the own bin, then steal unclaimed cells from the cheap end of the other bins."""
+    bins = partition(cells, n_workers)
+    own = bins[worker_id]
+    others = [cell for i, cell_bin in enumerate(bins) if i != worker_id for cell in reversed(cell_bin)]
+    others.sort(key=estimate_cost)
+    n_run = 0
+    for cell in own + others:
+        if is_done(cell) or not claim(cell):
+            continue
+        method, option, fold = cell
+        print(f"Worker {worker_id}: {method}{option} fold {fold} (cost {estimate_cost(cell):.2f})")
+        with held(cell):
+            run_method_dataset(method, option, folds=[fold], n_workers=trial_workers)
+        n_run += 1
+    return n_run
+
+
+def main(args):
+    methods = args.methods if args.methods else list(METHODS)
+    options = args.datasets if args.datasets else sorted(get_suite("amltk"))
+    cells = enumerate_cells(methods, options, args.folds)
+
+    # Claims of crashed or killed workers are taken over as stale, claims of running workers are kept
+    claims_dir.mkdir(parents=True, exist_ok=True)
+
+    # Resume: finished cells (existing result files) are never scheduled again
+    pending = [cell for cell in cells if not is_done(cell)]
+    print(f"{len(pending)} of {len(cells)} cells pending")
+    if not pending:
+        return
+
+    # Fill the dataset cache once before the workers start reading from it
+    prefetch_datasets(sorted({option for _, option, _ in pending}))
+
+    local_workers = args.local_workers if args.local_workers else max(1, (os.cpu_count() or 1) // args.trial_workers)
+    n_workers = args.array_size * local_workers
+    worker_ids = [args.array_index * local_workers + i for i in range(local_workers)]
+    if local_workers == 1:
+        n_run = run_worker(worker_ids[0], n_workers, pending, args.trial_workers)
+    else:
+        with ProcessPoolExecutor(max_workers=local_workers) as ex:
+            futures = [ex.submit(run_worker, worker_id, n_workers, pending, args.trial_workers)
+                       for worker_id in worker_ids]
+            n_run = sum(future.result() for future in futures)
+    print(f"Ran {n_run} cells, {sum(not is_done(cell) for cell in cells)} cells still missing")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Schedule all (method, dataset, fold) cells of the AMLTK benchmark')
+    parser.add_argument('--methods', type=str, nargs='*', help='Method prefixes (default: all registered methods)')
+    parser.add_argument('--datasets', type=int, nargs='*', help='Dataset options (default: the "amltk" suite)')
+    parser.add_argument('--folds', type=int, default=10, help='Number of repetitions per method and dataset')
+    parser.add_argument('--array_index', type=int, default=int(os.environ.get("SLURM_ARRAY_TASK_ID", 0)),
+                        help='Index of this job in the SLURM array')
+    parser.add_argument('--array_size', type=int, default=int(os.environ.get("SLURM_ARRAY_TASK_COUNT", 1)),
+                        help='Number of jobs in the SLURM array')
+    parser.add_argument('--local_workers', type=int, default=0,
+                        help='Concurrent cells on this node (default: CPUs // trial_workers)')
+    parser.add_argument('--trial_workers', type=int, default=4, help='AMLTK workers per optimization')
+    args = parser.parse_args()
+    main(args)
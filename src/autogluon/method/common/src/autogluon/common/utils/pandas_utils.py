@@ -2,7 +2,10 @@ import logging
 import math
 from functools import wraps
 
+import numpy as np
+import pandas as pd
 from pandas import DataFrame
+from scipy.sparse import csr_matrix, hstack
 
 from ..features.infer_types import get_type_map_raw
 from ..features.types import R_CATEGORY, R_FLOAT, R_INT
@@ -58,3 +61,36 @@ def get_approximate_df_mem_usage(df: DataFrame, sample_ratio=0.2):
             )
             memory_usage = memory_usage_inexact.combine_first(memory_usage)
         return memory_usage
+
+
+def get_csr_matrix(df: DataFrame, dtype=None) -> csr_matrix:
+    """
+    Converts a numeric DataFrame with a mix of sparse and dense columns to a CSR matrix with the same column order.
+
+    Sparse columns (e.g. the output of `TextNgramFeatureGenerator(sparse=True)`) are converted without densifying them,
+    only the dense columns are materialized as an array. The dtype defaults to the common dtype of the columns.
+    """
+    if dtype is None:
+        dtype = np.result_type(
+            *[
+                column_dtype.subtype if isinstance(column_dtype, pd.SparseDtype) else column_dtype
+                for column_dtype in df.dtypes
+            ]
+        )
+    is_sparse = [isinstance(column_dtype, pd.SparseDtype) for column_dtype in df.dtypes]
+    blocks = []
+    start = 0
+    # Consecutive columns of the same kind are converted together
+    for end in range(1, len(is_sparse) + 1):
+        if end == len(is_sparse) or is_sparse[end] != is_sparse[start]:
+            df_block = df.iloc[:, start:end]
+            if is_sparse[start]:
+                blocks.append(df_block.sparse.to_coo().astype(dtype).tocsr())
+            else:
+                blocks.append(csr_matrix(df_block.to_numpy(dtype=dtype)))
+            start = end
+    if not blocks:
+        return csr_matrix((len(df), 0), dtype=dtype)
+    if len(blocks) == 1:
+        return blocks[0]
+    return hstack(blocks, format="csr", dtype=dtype)
@@ -27,6 +27,7 @@ from ...utils.savers import save_pkl
 from ...utils.utils import CVSplitter, _compute_fi_with_stddev
 from ..abstract.abstract_model import AbstractModel
 from ..abstract.model_trial import model_trial, skip_hpo
+from .child_inference import _predict_child, get_child_inference
 from .fold_fitting_strategy import (
     FoldFittingStrategy,
     ParallelDistributedFoldFittingStrategy,
@@ -396,14 +397,14 @@ class BaggedEnsembleModel(AbstractModel):
         if children_idx is None:
             children_idx = list(range(self.n_children))
         children = [self.models[index] for index in children_idx]
-        model = self.load_child(children[0])
+        model = self.load_child(children[0], cache=True)
         if preprocess_nonadaptive:
             X = self.preprocess(X, model=model, **kwargs)
         pred_proba_children = []
         pred_proba_children.append(model.predict_proba(X=X, preprocess_nonadaptive=False, normalize=normalize))
-        for model in children[1:]:
-            model = self.load_child(model)
-            pred_proba_children.append(model.predict_proba(X=X, preprocess_nonadaptive=False, normalize=normalize))
+        pred_proba_children += self._predict_children_iter(
+            X, children=children[1:], method="predict_proba", normalize=normalize
+        )
         return pred_proba_children
 
     def predict_children(
@@ -440,23 +441,41 @@ class BaggedEnsembleModel(AbstractModel):
         if children_idx is None:
             children_idx = list(range(self.n_children))
         children = [self.models[index] for index in children_idx]
-        model = self.load_child(children[0])
+        model = self.load_child(children[0], cache=True)
         if preprocess_nonadaptive:
             X = self.preprocess(X, model=model, **kwargs)
         pred_children = []
         pred_children.append(model.predict(X=X, preprocess_nonadaptive=False, normalize=normalize))
-        for model in children[1:]:
-            model = self.load_child(model)
-            pred_children.append(model.predict(X=X, preprocess_nonadaptive=False, normalize=normalize))
+        pred_children += self._predict_children_iter(X, children=children[1:], method="predict", normalize=normalize)
         return pred_children
 
+    def _predict_children_iter(self, X, children: list, method: str, normalize=None):
+        """
+        Yields the predictions of `method` of each child in `children` order on the already preprocessed `X`.
+
+        Inside of a `child_inference` session, children loaded from disk are cached and predict in parallel if enabled.
+        """
+        session = get_child_inference()
+        args_list = []
+        for child in children:
+            if isinstance(child, str):
+                child_path = self.create_contexts(os.path.join(self.path, child))
+                args_list.append((None, self._child_type, child_path, X, method, normalize))
+            else:
+                args_list.append((child, None, None, X, method, normalize))
+        if session is None:
+            return (_predict_child(*args) for args in args_list)
+        return session.imap(_predict_child, args_list)
+
     def _predict_proba_internal(self, X, *, normalize: bool | None = None, **kwargs):
-        model = self.load_child(self.models[0])
+        model = self.load_child(self.models[0], cache=True)
         X = self.preprocess(X, model=model, **kwargs)
         y_pred_proba = model.predict_proba(X=X, preprocess_nonadaptive=False, normalize=normalize)
-        for model in self.models[1:]:
-            model = self.load_child(model)
-            y_pred_proba += model.predict_proba(X=X, preprocess_nonadaptive=False, normalize=normalize)
+        # Accumulate in place in `self.models` order, so the result does not depend on the order the children finish in
+        for child_pred_proba in self._predict_children_iter(
+            X, children=self.models[1:], method="predict_proba", normalize=normalize
+        ):
+            y_pred_proba += child_pred_proba
         y_pred_proba = y_pred_proba / self.n_children
         return y_pred_proba
 
@@ -905,9 +924,18 @@ class BaggedEnsembleModel(AbstractModel):
         assert self.is_fit(), "The model must be fit before calling the get_features method."
         return self.load_child(self.models[0]).get_features()
 
-    def load_child(self, model: Union[AbstractModel, str], verbose=False) -> AbstractModel:
+    def load_child(self, model: Union[AbstractModel, str], verbose=False, cache=False) -> AbstractModel:
+        """
+        Returns the child model, loaded from disk if `model` is its name.
+        If `cache=True` and a `child_inference` session is active,
+        the child is taken from (or added to) the session cache.
+        Only use `cache=True` for read-only access such as inference, as the cached child is shared with other callers.
+        """
         if isinstance(model, str):
             child_path = self.create_contexts(os.path.join(self.path, model))
+            session = get_child_inference() if cache else None
+            if session is not None:
+                return session.load(child_type=self._child_type, path=child_path, verbose=verbose)
             return self._child_type.load(path=child_path, verbose=verbose)
         else:
             return model
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from src.autogluon.method.common.src.autogluon.common.utils.resource_utils import ResourceManager
+
+logger = logging.getLogger(__name__)
+
+_session: ChildInference | None = None
+
+
+class ChildModelCache:
+    """
+    Bounded LRU cache of the child models of bagged ensembles that were loaded from disk.
+
+    Children are keyed by their path and the modification time of their model file,
+    so a child that is saved again after being cached is loaded again on the next access.
+
+    Parameters
+    ----------
+    max_size : int, default = 64
+        The maximum number of children kept in memory. The least recently used child is evicted first.
+    """
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._children = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._children)
+
+    def load(self, child_type, path: str, verbose: bool = False):
+        try:
+            key = (path, os.stat(os.path.join(path, child_type.model_file_name)).st_mtime_ns)
+        except OSError:
+            # Let the model loader raise its own error
+            return child_type.load(path=path, verbose=verbose)
+        with self._lock:
+            child = self._children.get(key)
+            if child is not None:
+                self._children.move_to_end(key)
+                self.hits += 1
+                return child
+            self.misses += 1
+        # Loaded outside the lock so that threads unpickle different children concurrently
+        child = child_type.load(path=path, verbose=verbose)
+        with self._lock:
+            self._children[key] = child
+            while len(self._children) > self.max_size:
+                self._children.popitem(last=False)
+        return child
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+
+class ChildInference:
+    """
+    Inference settings shared by all bagged ensembles while active, e.g. for the calls of a predictor session.
+
+    Use via the `child_inference` context manager. Outside of a session, children are loaded from disk on every
+    prediction and predict sequentially, which is the default behavior.
+
+    Parameters
+    ----------
+    cache_size : int, default = 64
+        Size of the `ChildModelCache` of children loaded from disk (only relevant for `low_memory=True` bags).
+        If 0, no children are cached.
+    parallel : str, default = None
+        How the children of a bag predict. One of:
+            None: sequentially in the calling thread.
+            "thread": in a thread pool.
+                Best for models that release the GIL during inference (LightGBM, XGBoost, CatBoost, torch, numpy).
+            "process": in a process pool. The input data is pickled for every child,
+                and children are loaded in the worker processes, each with its own cache of size `cache_size`.
+    num_workers : int, default = None
+        Number of threads or processes. If None, uses all CPUs.
+    """
+
+    def __init__(self, cache_size: int = 64, parallel: str | None = None, num_workers: int | None = None):
+        if parallel not in [None, "thread", "process"]:
+            raise ValueError(f"parallel must be one of [None, 'thread', 'process'], but is {parallel}")
+        self.cache = ChildModelCache(max_size=cache_size) if cache_size > 0 else None
+        self.parallel = parallel
+        self.num_workers = num_workers if num_workers is not None else ResourceManager.get_cpu_count()
+        self._executor: Executor | None = None
+
+    def load(self, child_type, path: str, verbose: bool = False):
+        if self.cache is None:
+            return child_type.load(path=path, verbose=verbose)
+        return self.cache.load(child_type=child_type, path=path, verbose=verbose)
+
+    def imap(self, function, args_list):
+        """
+        Yields `function(*args)` for each element of `args_list` in order.
+        At most `num_workers` calls are pending,
+        so the caller can consume (and free) results while the next ones are computed.
+        """
+        if self.parallel is None or self.num_workers <= 1:
+            for args in args_list:
+                yield function(*args)
+            return
+        executor = self._get_executor()
+        futures = deque()
+        try:
+            for args in args_list:
+                if len(futures) >= self.num_workers:
+                    yield futures.popleft().result()
+                futures.append(executor.submit(function, *args))
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.parallel == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.num_workers)
+            else:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    initializer=_init_worker,
+                    initargs=(0 if self.cache is None else self.cache.max_size,),
+                )
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self.cache is not None:
+            self.cache.clear()
+
+
+def get_child_inference() -> ChildInference | None:
+    """Returns the active `ChildInference` session, or None if there is none."""
+    return _session
+
+
+@contextmanager
+def child_inference(cache_size: int = 64, parallel: str | None = None, num_workers: int | None = None):
+    """
+    Activates a `ChildInference` session for all bagged ensembles, for example around the evaluation of a predictor:
+
+        with child_inference(cache_size=128, parallel="thread"):
+            predictor.evaluate(test_data)
+            predictor.leaderboard(test_data)
+
+    Refer to `ChildInference` for the parameters.
+    """
+    global _session
+    previous_session = _session
+    session = ChildInference(cache_size=cache_size, parallel=parallel, num_workers=num_workers)
+    _session = session
+    try:
+        yield session
+    finally:
+        _session = previous_session
+        session.close()
+
+
+def _init_worker(cache_size: int):
+    # Forked workers must not share the state (and locks) of the parent session
+    global _session
+    _session = ChildInference(cache_size=cache_size)
+
+
+def _predict_child(child, child_type, path: str, X, method: str, normalize):
+    """Predicts with a child model, or loads it via the active session first if `child` is None."""
+    if child is None:
+        child = (
+            _session.load(child_type=child_type, path=path)
+            if _session is not None
+            else child_type.load(path=path, verbose=False)
+        )
+    return getattr(child, method)(X=X, preprocess_nonadaptive=False, normalize=normalize)
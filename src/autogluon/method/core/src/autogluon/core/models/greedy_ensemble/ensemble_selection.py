@@ -7,9 +7,12 @@ from typing import List
 
 import numpy as np
 import pandas as pd
+from scipy.special import xlogy
+from sklearn.metrics import accuracy_score
 
-from ...constants import PROBLEM_TYPES
-from ...metrics import log_loss
+from ...constants import BINARY, MULTICLASS, PROBLEM_TYPES, REGRESSION
+from ...metrics import customized_log_loss, log_loss, rmse_func
+from ...metrics.classification_metrics import customized_binary_roc_auc_score
 from ...utils import compute_weighted_metric, get_pred_from_proba
 
 logger = logging.getLogger(__name__)
@@ -106,6 +109,14 @@ class EnsembleSelection(AbstractWeightedEnsemble):
         #         trajectory.append(ensemble_performance)
         #     ensemble_size -= n_best
 
+        batched_regret = _BatchedRegret.create(
+            predictions=predictions,
+            labels=labels,
+            problem_type=self.problem_type,
+            metric=self.metric,
+            sample_weight=sample_weight,
+        )
+
         time_start = time.time()
         round_scores = False
         epsilon = 1e-4
@@ -121,14 +132,24 @@ class EnsembleSelection(AbstractWeightedEnsemble):
                 ensemble_prediction *= (s - 1) / s
                 ensemble_prediction += ensemble[-1] / s
                 weighted_ensemble_prediction[:] = (s / float(s + 1)) * ensemble_prediction
-            for j, pred in enumerate(predictions):
-                fant_ensemble_prediction[:] = weighted_ensemble_prediction + (1.0 / float(s + 1)) * pred
-                if self.problem_type in ["multiclass", "softclass"]:
-                    # Renormalize
-                    fant_ensemble_prediction /= fant_ensemble_prediction.sum(axis=1)[:, np.newaxis]
-                scores[j] = self._calculate_regret(y_true=labels, y_pred_proba=fant_ensemble_prediction, metric=self.metric, sample_weight=sample_weight)
+            if batched_regret is not None:
+                scores[:] = batched_regret(weighted_ensemble_prediction, 1.0 / float(s + 1))
                 if round_scores:
-                    scores[j] = scores[j].round(round_decimals)
+                    scores = scores.round(round_decimals)
+            else:
+                for j, pred in enumerate(predictions):
+                    fant_ensemble_prediction[:] = weighted_ensemble_prediction + (1.0 / float(s + 1)) * pred
+                    if self.problem_type in ["multiclass", "softclass"]:
+                        # Renormalize
+                        fant_ensemble_prediction /= fant_ensemble_prediction.sum(axis=1)[:, np.newaxis]
+                    scores[j] = self._calculate_regret(
+                        y_true=labels,
+                        y_pred_proba=fant_ensemble_prediction,
+                        metric=self.metric,
+                        sample_weight=sample_weight,
+                    )
+                    if round_scores:
+                        scores[j] = scores[j].round(round_decimals)
 
             all_best = np.argwhere(scores == np.nanmin(scores)).flatten()
 
@@ -224,6 +245,121 @@ class EnsembleSelection(AbstractWeightedEnsemble):
         self.weights_ = weights
 
 
+class _BatchedRegret:
+    """
+    Regrets of all candidate ensembles of a round of ensemble selection in one batched NumPy operation,
+    for the most common metrics (log_loss, accuracy, roc_auc and root_mean_squared_error,
+    without sample weights or metric kwargs).
+
+    The predictions are stacked once into (models, n[, classes]) tensors, one per prediction dtype
+    (float32 for most models), and each round scores all candidates with the same element-wise operations
+    as `EnsembleSelection._calculate_regret`, so the scores are identical to the per-candidate loop.
+    The exception is roc_auc, which is computed from rank statistics and is equal up to floating point rounding.
+    Reductions are row-wise, so identical models keep identical scores and the tie-breaking is unchanged.
+    """
+
+    # Upper bound of the float64 candidate block scored at once
+    max_block_bytes = 2**26
+
+    def __init__(self, predictions: List[np.ndarray], labels: np.ndarray, problem_type: str, metric):
+        self.labels = labels
+        self.problem_type = problem_type
+        self.metric = metric
+        self.num_models = len(predictions)
+        self.groups = []
+        for dtype in sorted({pred.dtype for pred in predictions}, key=str):
+            indices = np.array([j for j, pred in enumerate(predictions) if pred.dtype == dtype])
+            self.groups.append((indices, np.stack([predictions[j] for j in indices])))
+        row_bytes = 8 * int(np.prod(predictions[0].shape))
+        self.block_size = max(1, self.max_block_bytes // max(row_bytes, 1))
+        if metric._score_func is customized_binary_roc_auc_score:
+            self.num_pos = int(np.sum(labels == 1))
+            self.num_neg = len(labels) - self.num_pos
+
+    @classmethod
+    def create(
+        cls, predictions: List[np.ndarray], labels: np.ndarray, problem_type: str, metric, sample_weight=None
+    ) -> _BatchedRegret | None:
+        """
+        Returns None if the metric, problem type or inputs are not supported,
+        ensemble selection then scores candidates one by one.
+        """
+        if sample_weight is not None or metric._kwargs or len(predictions) == 0:
+            return None
+        shape = predictions[0].shape
+        if labels.dtype.kind not in "iuf":
+            return None
+        if any(pred.shape != shape or pred.dtype.kind != "f" for pred in predictions):
+            return None
+        is_binary = problem_type == BINARY and len(shape) == 1
+        is_multiclass = problem_type == MULTICLASS and len(shape) == 2
+        score_func = metric._score_func
+        if score_func is customized_log_loss or score_func is accuracy_score:
+            supported = is_binary or is_multiclass
+        elif score_func is customized_binary_roc_auc_score:
+            supported = is_binary and set(np.unique(labels).tolist()) == {0, 1}
+        elif score_func is rmse_func:
+            supported = problem_type == REGRESSION and len(shape) == 1
+        else:
+            supported = False
+        if not supported:
+            return None
+        return cls(predictions=predictions, labels=labels, problem_type=problem_type, metric=metric)
+
+    def __call__(self, weighted_ensemble_prediction: np.ndarray, weight: float) -> np.ndarray:
+        """Regrets of the candidates `weighted_ensemble_prediction + weight * predictions[j]` for all models j."""
+        regrets = np.zeros(self.num_models)
+        for indices, stacked in self.groups:
+            for start in range(0, len(indices), self.block_size):
+                block = slice(start, start + self.block_size)
+                candidates = weighted_ensemble_prediction[np.newaxis] + weight * stacked[block]
+                if self.problem_type == MULTICLASS:
+                    # Renormalize
+                    candidates /= candidates.sum(axis=2)[:, :, np.newaxis]
+                regrets[indices[block]] = self.metric._optimum - self.metric._sign * self._score(candidates)
+        return regrets
+
+    def _score(self, candidates: np.ndarray) -> np.ndarray:
+        score_func = self.metric._score_func
+        if score_func is rmse_func:
+            return np.sqrt(((self.labels - candidates) ** 2).mean(axis=1))
+        if score_func is accuracy_score:
+            # Same decisions as get_pred_from_proba, which expects a single prediction
+            preds = (candidates > 0.5).astype(int) if self.problem_type == BINARY else np.argmax(candidates, axis=2)
+            return (preds == self.labels).mean(axis=1)
+        if score_func is customized_log_loss:
+            if self.problem_type == BINARY:
+                candidates = np.clip(candidates, 1e-15, 1 - 1e-15)
+                return -(self.labels * np.log(candidates) + (1 - self.labels) * np.log(1 - candidates)).mean(axis=1)
+            # sklearn.metrics.log_loss: clip, renormalize and average the negative log-likelihood of the true class
+            eps = np.finfo(candidates.dtype).eps
+            candidates = np.clip(candidates, eps, 1 - eps, out=candidates)
+            labels = self.labels.astype(np.int32)
+            true_proba = np.take_along_axis(candidates, labels[np.newaxis, :, np.newaxis], axis=2)[:, :, 0]
+            return (-xlogy(1, true_proba / candidates.sum(axis=2))).mean(axis=1)
+        return self._roc_auc(candidates)
+
+    def _roc_auc(self, candidates: np.ndarray) -> np.ndarray:
+        # Mann-Whitney statistic from the rank sum of the positives, tied scores share their average rank
+        num_models, n = candidates.shape
+        order = np.argsort(candidates, axis=1)
+        sorted_candidates = np.take_along_axis(candidates, order, axis=1)
+        is_pos = self.labels[order] == 1
+        ranks = np.arange(1, n + 1, dtype=np.float64)[np.newaxis]
+        ties = sorted_candidates[:, 1:] == sorted_candidates[:, :-1]
+        if ties.any():
+            positions = np.arange(n)
+            group_start = np.ones((num_models, n), dtype=bool)
+            group_start[:, 1:] = ~ties
+            group_end = np.ones((num_models, n), dtype=bool)
+            group_end[:, :-1] = ~ties
+            first = np.maximum.accumulate(np.where(group_start, positions, 0), axis=1)
+            last = np.minimum.accumulate(np.where(group_end, positions, n - 1)[:, ::-1], axis=1)[:, ::-1]
+            ranks = (first + last) / 2 + 1
+        rank_sum = np.where(is_pos, ranks, 0).sum(axis=1)
+        return (rank_sum - self.num_pos * (self.num_pos + 1) / 2) / (self.num_pos * self.num_neg)
+
+
 class SimpleWeightedEnsemble(AbstractWeightedEnsemble):
     """Predefined user-weights ensemble"""
 
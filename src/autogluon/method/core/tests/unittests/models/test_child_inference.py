@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from autogluon.core.models import AbstractModel, BaggedEnsembleModel
+from autogluon.core.models.ensemble import child_inference as child_inference_module
+from autogluon.core.models.ensemble.child_inference import ChildModelCache, child_inference, get_child_inference
+
+
+class _LogisticModel(AbstractModel):
+    def _fit(self, X, y, **kwargs):
+        self.model = LogisticRegression(max_iter=200).fit(self.preprocess(X), y)
+
+
+@pytest.fixture(scope="module")
+def bag(tmp_path_factory):
+    rng = np.random.RandomState(0)
+    X = pd.DataFrame(rng.normal(size=(120, 3)), columns=["a", "b", "c"])
+    y = pd.Series((X["a"] + 0.5 * rng.normal(size=120) > 0).astype(int) + (X["b"] > 1).astype(int))
+    model_base = _LogisticModel(
+        path="", name="Logistic", problem_type="multiclass", hyperparameters={"ag.max_memory_usage_ratio": None}
+    )
+    bag = BaggedEnsembleModel(model_base, path=str(tmp_path_factory.mktemp("bag")), name="bag")
+    bag.fit(X=X, y=y, k_fold=4, fold_fitting_strategy="sequential_local")
+    bag.save()
+    return bag, X
+
+
+@pytest.mark.parametrize("parallel", [None, "thread", "process"])
+def test_child_inference_matches_sequential(bag, parallel):
+    bag, X = bag
+    assert bag.low_memory and all(isinstance(child, str) for child in bag.models)
+    expected = bag.predict_proba(X)
+    expected_children = bag.predict_proba_children(X)
+    with child_inference(cache_size=8, parallel=parallel, num_workers=2) as session:
+        assert get_child_inference() is session
+        for _ in range(2):
+            np.testing.assert_array_equal(bag.predict_proba(X), expected)
+        for pred_proba, expected_pred_proba in zip(bag.predict_proba_children(X), expected_children):
+            np.testing.assert_array_equal(pred_proba, expected_pred_proba)
+        if parallel == "process":
+            # Only the first child is loaded in this process, the others in the workers
+            assert len(session.cache) == 1
+        else:
+            assert len(session.cache) == bag.n_children
+            assert session.cache.misses == bag.n_children
+    assert get_child_inference() is None
+
+
+def test_child_model_cache_lru(bag, monkeypatch):
+    bag, _ = bag
+    loads = []
+    load = bag._child_type.load
+    monkeypatch.setattr(
+        bag._child_type,
+        "load",
+        classmethod(lambda cls, path, **kwargs: loads.append(path) or load(path=path, **kwargs)),
+    )
+    cache = ChildModelCache(max_size=2)
+    paths = [bag.create_contexts(os.path.join(bag.path, name)) for name in bag.models[:3]]
+    for path in [paths[0], paths[1], paths[0], paths[2], paths[0], paths[1]]:
+        cache.load(child_type=bag._child_type, path=path)
+    # paths[1] was evicted by paths[2] as the least recently used child
+    assert loads == [paths[0], paths[1], paths[2], paths[1]]
+    assert len(cache) == 2
+    child = cache.load(child_type=bag._child_type, path=paths[0])
+    assert cache.load(child_type=bag._child_type, path=paths[0]) is child
+
+
+def test_child_cache_reloads_saved_child(bag):
+    bag, _ = bag
+    with child_inference(cache_size=8):
+        child = bag.load_child(bag.models[0], cache=True)
+        assert bag.load_child(bag.models[0], cache=True) is child
+        assert bag.load_child(bag.models[0]) is not child
+        child.save()
+        model_file = os.path.join(child.path, child.model_file_name)
+        mtime_ns = os.stat(model_file).st_mtime_ns + 10**9  # independent of the resolution of the file system clock
+        os.utime(model_file, ns=(mtime_ns, mtime_ns))
+        assert bag.load_child(bag.models[0], cache=True) is not child
+
+
+def test_child_inference_invalid_parallel():
+    with pytest.raises(ValueError):
+        with child_inference(parallel="gpu"):
+            pass
+    assert child_inference_module.get_child_inference() is None
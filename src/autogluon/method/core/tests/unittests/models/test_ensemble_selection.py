@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from autogluon.core.constants import BINARY, MULTICLASS, REGRESSION
+from autogluon.core.metrics import accuracy, log_loss, roc_auc, root_mean_squared_error
+from autogluon.core.models.greedy_ensemble import ensemble_selection
+from autogluon.core.models.greedy_ensemble.ensemble_selection import EnsembleSelection, _BatchedRegret
+
+
+def _make_predictions(problem_type, num_models=12, n=300, num_classes=4, seed=0):
+    rng = np.random.RandomState(seed)
+    if problem_type == REGRESSION:
+        labels = rng.normal(size=n)
+        predictions = [labels + rng.normal(scale=rng.uniform(0.5, 2), size=n) for _ in range(num_models)]
+    elif problem_type == BINARY:
+        labels = rng.randint(0, 2, size=n)
+        predictions = [np.clip(labels * 0.3 + rng.uniform(size=n) * 0.7, 0, 1) for _ in range(num_models)]
+        # Coarse predictions create tied scores inside a model
+        predictions[1] = np.round(predictions[1], 1)
+    else:
+        labels = rng.randint(0, num_classes, size=n)
+        predictions = []
+        for _ in range(num_models):
+            logits = rng.normal(size=(n, num_classes)) + 1.5 * np.eye(num_classes)[labels]
+            proba = np.exp(logits)
+            predictions.append(proba / proba.sum(axis=1, keepdims=True))
+    # Duplicated models and a mix of prediction dtypes
+    predictions[2] = predictions[0].copy()
+    predictions = [pred.astype(np.float32) if j % 3 else pred for j, pred in enumerate(predictions)]
+    return predictions, labels
+
+
+def _fit(problem_type, metric, predictions, labels, **kwargs):
+    ensemble = EnsembleSelection(
+        ensemble_size=25, problem_type=problem_type, metric=metric, random_state=np.random.RandomState(0), **kwargs
+    )
+    return ensemble.fit(predictions=list(predictions), labels=labels)
+
+
+@pytest.mark.parametrize(
+    "problem_type,metric",
+    [
+        (BINARY, log_loss),
+        (BINARY, accuracy),
+        (BINARY, roc_auc),
+        (MULTICLASS, log_loss),
+        (MULTICLASS, accuracy),
+        (REGRESSION, root_mean_squared_error),
+    ],
+)
+@pytest.mark.parametrize("tie_breaker", ["random", "second_metric"])
+def test_batched_regret_matches_per_candidate_scoring(monkeypatch, problem_type, metric, tie_breaker):
+    predictions, labels = _make_predictions(problem_type)
+    assert (
+        _BatchedRegret.create(predictions=predictions, labels=labels, problem_type=problem_type, metric=metric)
+        is not None
+    )
+    batched = _fit(problem_type, metric, predictions, labels, tie_breaker=tie_breaker)
+
+    monkeypatch.setattr(ensemble_selection._BatchedRegret, "create", classmethod(lambda cls, **kwargs: None))
+    per_candidate = _fit(problem_type, metric, predictions, labels, tie_breaker=tie_breaker)
+
+    assert batched.indices_ == per_candidate.indices_
+    np.testing.assert_array_equal(batched.weights_, per_candidate.weights_)
+    if metric is roc_auc:
+        np.testing.assert_allclose(batched.trajectory_, per_candidate.trajectory_, rtol=0, atol=1e-12)
+    else:
+        np.testing.assert_array_equal(batched.trajectory_, per_candidate.trajectory_)
+
+
+def test_batched_regret_single_round_scores(monkeypatch):
+    predictions, labels = _make_predictions(MULTICLASS)
+    # The block size is computed on creation
+    monkeypatch.setattr(_BatchedRegret, "max_block_bytes", 1)
+    batched_regret = _BatchedRegret.create(
+        predictions=predictions, labels=labels, problem_type=MULTICLASS, metric=log_loss
+    )
+    assert batched_regret.block_size == 1  # one model per block
+    ensemble = EnsembleSelection(ensemble_size=1, problem_type=MULTICLASS, metric=log_loss)
+    weighted = 0.5 * predictions[3].astype(np.float64)
+    scores = batched_regret(weighted, 0.5)
+    for j, pred in enumerate(predictions):
+        fant = weighted + 0.5 * pred
+        fant /= fant.sum(axis=1)[:, np.newaxis]
+        assert scores[j] == ensemble._calculate_regret(y_true=labels, y_pred_proba=fant, metric=log_loss)
+
+
+def test_batched_regret_unsupported():
+    predictions, labels = _make_predictions(BINARY)
+    weights = np.ones(len(labels))
+    one_class = np.zeros(len(labels), dtype=int)
+    create = _BatchedRegret.create
+    assert (
+        create(predictions=predictions, labels=labels, problem_type=BINARY, metric=log_loss, sample_weight=weights)
+        is None
+    )
+    assert create(predictions=predictions, labels=labels, problem_type=REGRESSION, metric=log_loss) is None
+    assert create(predictions=predictions, labels=one_class, problem_type=BINARY, metric=roc_auc) is None
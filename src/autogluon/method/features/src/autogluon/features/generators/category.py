@@ -1,8 +1,10 @@
 import copy
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pandas as pd
-from pandas import DataFrame
+from pandas import DataFrame, Series
 from pandas.api.types import CategoricalDtype
 
 from src.autogluon.method.common.src.autogluon.common.features.types import (
@@ -60,6 +62,10 @@ class CategoryFeatureGenerator(AbstractFeatureGenerator):
         Valid values:
             None : Keep missing values as is. They will appear as NaN and have no category assigned to them.
             'mode' : Set missing values to the most frequent category in their feature.
+    num_threads : int, default 1
+        The number of threads converting features in parallel during transform.
+        Each feature is converted by a single lookup of its values (or of its categories if it already is a category feature),
+        so threads only help on data with many features and rows.
     **kwargs :
         Refer to :class:`AbstractFeatureGenerator` documentation for details on valid key word arguments.
     """
@@ -72,6 +78,7 @@ class CategoryFeatureGenerator(AbstractFeatureGenerator):
         minimum_cat_count: int = 2,
         maximum_num_cat: int = None,
         fillna: str = None,
+        num_threads: int = 1,
         **kwargs,
     ):
         super().__init__(**kwargs)
@@ -90,16 +97,16 @@ class CategoryFeatureGenerator(AbstractFeatureGenerator):
         self._fillna = fillna
         self._fillna_flag = self._fillna is not None
         self._fillna_map = None
+        self.num_threads = num_threads
 
         if minimize_memory:
             self._post_generators = [CategoryMemoryMinimizeFeatureGenerator()] + self._post_generators
 
     def _fit_transform(self, X: DataFrame, **kwargs) -> (DataFrame, dict):
         if self._stateful_categories:
-            X_out, self.category_map, self._fillna_map = self._generate_category_map(X=X)
-            if self._fillna_map is not None:
-                for column in self._fillna_map:
-                    X_out[column] = X_out[column].fillna(self._fillna_map[column])
+            X_category, self.category_map, self._fillna_map = self._generate_category_map(X=X)
+            # The category features of X are mapped to the fitted categories without looking up the values of X again
+            X_out = self._generate_features_category(X_category)
         else:
             X_out = self._transform(X)
         feature_metadata_out_type_group_map_special = copy.deepcopy(self.feature_metadata_in.type_group_map_special)
@@ -126,23 +133,64 @@ class CategoryFeatureGenerator(AbstractFeatureGenerator):
         if self.features_in:
             X_category = dict()
             if self.category_map is not None:
-                for column, column_map in self.category_map.items():
-                    X_category[column] = pd.Categorical(X[column], categories=column_map)
+                fillna_map = self._fillna_map if self._fillna_map is not None else dict()
+
+                def _generate_feature_category(column):
+                    return self._to_category(
+                        X[column], categories=self.category_map[column], fill_value=fillna_map.get(column, None)
+                    )
+
+                columns = list(self.category_map.keys())
+                if self.num_threads > 1 and len(columns) > 1:
+                    with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
+                        X_category = dict(zip(columns, executor.map(_generate_feature_category, columns)))
+                else:
+                    X_category = {column: _generate_feature_category(column) for column in columns}
                 X_category = DataFrame(X_category, index=X.index)
-                if self._fillna_map is not None:
-                    for column, column_map in self._fillna_map.items():
-                        X_category[column] = X_category[column].fillna(column_map)
         else:
             X_category = DataFrame(index=X.index)
         return X_category
 
-    def _generate_category_map(self, X: DataFrame) -> (DataFrame, dict):
+    @staticmethod
+    def _to_category(series: Series, categories: pd.Index, fill_value=None) -> pd.Categorical:
+        """
+        Equivalent to `pd.Categorical(series, categories=categories).fillna(fill_value)`, but computes the codes in a single lookup.
+        If `series` already is a category feature, only its categories are looked up and its codes are mapped via `take`.
+        Unknown and missing values get the code of `fill_value`, or -1 (NaN) if it is None.
+        """
+        ordered = series.dtype.ordered if isinstance(series.dtype, CategoricalDtype) else False
+        dtype = CategoricalDtype(categories=categories, ordered=ordered)
+        fill_code = -1
+        if fill_value is not None:
+            fill_code = categories.get_indexer_for([fill_value])[0]
+        if isinstance(series.dtype, CategoricalDtype):
+            if fill_code == -1:
+                # pandas already recodes categorical input by a lookup of its categories
+                return pd.Categorical(series, dtype=dtype)
+            codes = series.cat.codes.to_numpy()
+            # The last entry is the code of missing values (code -1 of `series`)
+            code_dtype = codes.dtype if len(categories) < np.iinfo(codes.dtype).max else np.int64
+            code_map = np.append(categories.get_indexer_for(series.cat.categories), -1).astype(code_dtype)
+            code_map[code_map == -1] = fill_code
+            codes = code_map.take(codes)
+        else:
+            codes = categories.get_indexer_for(series.to_numpy())
+            if fill_code != -1:
+                codes[codes == -1] = fill_code
+        return pd.Categorical.from_codes(codes, dtype=dtype)
+
+    def _generate_category_map(self, X: DataFrame) -> (DataFrame, dict, dict):
         if self.features_in:
             fill_nan_map = dict()
             category_map = dict()
             X_category = X.astype("category")
             for column in X_category:
-                rank = X_category[column].value_counts().sort_values(ascending=True)
+                X_column = X_category[column]
+                categories = X_column.cat.categories
+                codes = X_column.cat.codes.to_numpy()
+                counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+                # Same order (also of ties) as `X_column.value_counts().sort_values(ascending=True)`
+                rank = pd.Series(counts, index=categories).sort_values(ascending=False).sort_values(ascending=True)
                 if self._minimum_cat_count is not None:
                     rank = rank[rank >= self._minimum_cat_count]
                 if self._maximum_num_cat is not None:
@@ -155,21 +203,17 @@ class CategoryFeatureGenerator(AbstractFeatureGenerator):
                     category_list = list(rank.index)  # category_list in 'count' order
                     if len(category_list) > 1:
                         if self.cat_order == "original":
-                            original_cat_order = list(X_category[column].cat.categories)
                             set_category_list = set(category_list)
-                            category_list = [cat for cat in original_cat_order if cat in set_category_list]
+                            category_list = [cat for cat in categories if cat in set_category_list]
                         elif self.cat_order == "alphanumeric":
                             category_list.sort()
-                    X_category[column] = X_category[column].astype(
-                        CategoricalDtype(categories=category_list)
-                    )  # TODO: Remove columns if all NaN after this?
-                    X_category[column] = X_category[column].cat.reorder_categories(category_list)
+                    # TODO: Remove columns if all NaN after this?
+                    categories = CategoricalDtype(categories=category_list).categories
                 elif self.cat_order == "alphanumeric":
-                    category_list = list(X_category[column].cat.categories)
+                    category_list = list(categories)
                     category_list.sort()
-                    X_category[column] = X_category[column].astype(CategoricalDtype(categories=category_list))
-                    X_category[column] = X_category[column].cat.reorder_categories(category_list)
-                category_map[column] = copy.deepcopy(X_category[column].cat.categories)
+                    categories = CategoricalDtype(categories=category_list).categories
+                category_map[column] = copy.deepcopy(categories)
                 if self._fillna_flag:
                     if self._fillna == "mode":
                         if len(rank) > 0:
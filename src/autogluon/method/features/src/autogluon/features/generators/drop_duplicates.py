@@ -94,27 +94,18 @@ class DropDuplicatesFeatureGenerator(AbstractFeatureGenerator):
 
     @classmethod
     def _drop_duplicate_features_generic(cls, X: DataFrame, keep: Union[str, bool] = "first"):
-        """Generic duplication dropping method. Much slower than optimized variants, but can handle all data types."""
-        X_columns = list(X.columns)
-        features_to_keep = set(X.T.drop_duplicates(keep=keep).T.columns)
-        features_to_remove = [column for column in X_columns if column not in features_to_keep]
-        return features_to_remove
+        """Generic duplication dropping method. Slower than the optimized variants, but can handle all data types."""
+        return cls._drop_duplicate_columns(X=X, get_values=cls._get_values_generic, keep=keep)
 
     @classmethod
     def _drop_duplicate_features_numeric(cls, X: DataFrame, keep: Union[str, bool] = "first"):
-        X_columns = list(X.columns)
-        feature_sum_map = defaultdict(list)
-        for feature in X_columns:
-            feature_sum_map[round(X[feature].sum(), 2)].append(feature)
-
-        features_to_remove = []
-        for key in feature_sum_map:
-            if len(feature_sum_map[key]) <= 1:
-                continue
-            features_to_keep = set(X[feature_sum_map[key]].T.drop_duplicates(keep=keep).T.columns)
-            features_to_remove += [feature for feature in feature_sum_map[key] if feature not in features_to_keep]
-
-        return features_to_remove
+        """
+        Drops duplicate features with equal values, regardless of the numeric dtype.
+        For example, [4, 3, 4] (int) is considered a duplicate of [4.0, 3.0, 4.0] (float). NaN values are considered equal.
+        """
+        return cls._drop_duplicate_columns(
+            X=X, get_values=cls._get_values_numeric, keep=keep, get_exact_values=cls._get_exact_values_numeric
+        )
 
     @classmethod
     def _drop_duplicate_features_categorical(cls, X: DataFrame, keep: Union[str, bool] = "first"):
@@ -122,41 +113,125 @@ class DropDuplicatesFeatureGenerator(AbstractFeatureGenerator):
         Drops duplicate features if they contain the same information, ignoring the actual values in the features.
         For example, ['a', 'b', 'b'] is considered a duplicate of ['b', 'a', 'a'], but not ['a', 'b', 'a'].
         """
-        X_columns = list(X.columns)
-        mapping_features_val_dict = {}
-        features_unique_count_dict = defaultdict(list)
+        return cls._drop_duplicate_columns(X=X, get_values=cls._get_values_categorical, keep=keep)
+
+    @classmethod
+    def _drop_duplicate_columns(
+        cls,
+        X: DataFrame,
+        get_values,
+        keep: Union[str, bool] = "first",
+        max_block_bytes: int = 2**26,
+        get_exact_values=None,
+    ) -> list:
+        """
+        Returns the columns of X whose values (as returned by `get_values` for a block of columns) equal those of another column.
+
+        Each column is reduced to a position-dependent hash of its values via `pd.util.hash_array`,
+        processed in blocks of columns of at most `max_block_bytes` of hashes.
+        Only columns with equal hashes, which are duplicates or (rarely) hash collisions, have their values compared.
+        If given, `get_exact_values` returns the values to compare as a list of one array per column,
+        for when `get_values` loses precision (e.g. int64 values above 2**53 as float64).
+        """
+        num_columns = len(X.columns)
+        if num_columns <= 1:
+            return []
+        num_rows = len(X)
+        block_size = max(1, max_block_bytes // (8 * max(num_rows, 1)))
+        # Odd random weights, so that the hash of a column depends on the row of each value
+        row_weights = np.random.RandomState(0).randint(0, 2**63, size=num_rows, dtype=np.uint64)
+        row_weights = row_weights * np.uint64(2) + np.uint64(1)
+        column_hashes = np.empty(num_columns, dtype=np.uint64)
+        for start in range(0, num_columns, block_size):
+            values = get_values(X.iloc[:, start : start + block_size])
+            value_hashes = pd.util.hash_array(values.ravel()).reshape(values.shape)
+            block_hashes = (value_hashes * row_weights[:, np.newaxis]).sum(axis=0, dtype=np.uint64)
+            column_hashes[start : start + block_size] = block_hashes
+
+        hash_groups = defaultdict(list)
+        for i, column_hash in enumerate(column_hashes):
+            hash_groups[column_hash].append(i)
+
         features_to_remove = []
-        for feature in X_columns:
-            feature_unique_vals = X[feature].unique()
-            mapping_features_val_dict[feature] = dict(zip(feature_unique_vals, range(len(feature_unique_vals))))
-            features_unique_count_dict[len(feature_unique_vals)].append(feature)
-
-        for feature_unique_count in features_unique_count_dict:
-            # Only need to check features that have same amount of unique values.
-            features_to_check = features_unique_count_dict[feature_unique_count]
-            if len(features_to_check) <= 1:
+        for indices in hash_groups.values():
+            if len(indices) <= 1:
                 continue
-            mapping_features_val_dict_cur = {
-                feature: mapping_features_val_dict[feature] for feature in features_to_check
-            }
-            # Converts ['a', 'd', 'f', 'a'] to [0, 1, 2, 0]
-            # Converts [5, 'a', np.nan, 5] to [0, 1, 2, 0], these would be considered duplicates since they carry the same information.
-
-            # Have to convert to object dtype because category dtype for unknown reasons will refuse to replace NaNs.
-            try:
-                # verify that the option exists (pandas >2.1)
-                pd.get_option("future.no_silent_downcasting")
-            except pd.errors.OptionError:
-                X_cur = X[features_to_check].astype("object").replace(mapping_features_val_dict_cur).astype(np.int64)
+            if get_exact_values is not None:
+                values = get_exact_values(X.iloc[:, indices])
             else:
-                # refer to https://pandas.pydata.org/docs/whatsnew/v2.2.0.html#deprecated-automatic-downcasting
-                with pd.option_context("future.no_silent_downcasting", True):
-                    X_cur = (
-                        X[features_to_check].astype("object").replace(mapping_features_val_dict_cur).astype(np.int64)
-                    )
-            features_to_remove += cls._drop_duplicate_features_numeric(X=X_cur, keep=keep)
+                values = get_values(X.iloc[:, indices])
+                values = [values[:, j] for j in range(len(indices))]
+            # Each duplicate group is a list of positions in `indices`, in column order
+            duplicate_groups = []
+            for j in range(len(indices)):
+                for duplicate_group in duplicate_groups:
+                    if cls._equal_values(values[duplicate_group[0]], values[j]):
+                        duplicate_group.append(j)
+                        break
+                else:
+                    duplicate_groups.append([j])
+            for duplicate_group in duplicate_groups:
+                if len(duplicate_group) <= 1:
+                    continue
+                if keep == "first":
+                    duplicate_group = duplicate_group[1:]
+                elif keep == "last":
+                    duplicate_group = duplicate_group[:-1]
+                features_to_remove += [indices[j] for j in duplicate_group]
+
+        return [X.columns[i] for i in sorted(features_to_remove)]
 
-        return features_to_remove
+    @staticmethod
+    def _get_values_numeric(X: DataFrame) -> np.ndarray:
+        values = X.to_numpy(dtype=np.float64, na_value=np.nan) + 0.0  # Copy, also turns -0.0 into 0.0 to hash equally
+        values[np.isnan(values)] = np.nan  # All NaN bit patterns hash equally
+        return values
+
+    @classmethod
+    def _get_exact_values_numeric(cls, X: DataFrame) -> list:
+        # Integer features without missing values keep an integer dtype, float64 can not represent all int64 values
+        values = []
+        for feature in X.columns:
+            series = X[feature]
+            if series.dtype.kind in "iu" and not series.hasnans:
+                values.append(series.to_numpy(dtype=np.int64 if series.dtype.kind == "i" else np.uint64))
+            else:
+                values.append(cls._get_values_numeric(series.to_frame())[:, 0])
+        return values
+
+    @staticmethod
+    def _get_values_categorical(X: DataFrame) -> np.ndarray:
+        # Converts ['a', 'd', 'f', 'a'] to [0, 1, 2, 0]
+        # Converts [5, 'a', np.nan, 5] to [0, 1, 2, 0], these would be considered duplicates since they carry the same information.
+        codes = np.empty(X.shape, dtype=np.int64)
+        for i, feature in enumerate(X.columns):
+            series = X[feature]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                series_values = series.cat.codes.to_numpy()
+            else:
+                series_values = series.to_numpy()
+            codes[:, i] = pd.factorize(series_values, use_na_sentinel=False)[0]
+        return codes
+
+    @staticmethod
+    def _get_values_generic(X: DataFrame) -> np.ndarray:
+        return X.to_numpy(dtype=object)
+
+    @staticmethod
+    def _equal_values(values_a: np.ndarray, values_b: np.ndarray) -> bool:
+        if values_a.dtype == object:
+            # Treats missing values as equal and, unlike hash_array, does not consider 0 and "0" equal
+            return pd.Series(values_a, dtype=object).equals(pd.Series(values_b, dtype=object))
+        if values_a.dtype.kind in "iu" and values_b.dtype.kind in "iu":
+            if values_a.dtype.kind != values_b.dtype.kind:
+                # No integer dtype holds both int64 and uint64, equal values are non-negative
+                signed, unsigned = (values_a, values_b) if values_a.dtype.kind == "i" else (values_b, values_a)
+                return bool((signed >= 0).all()) and np.array_equal(signed.astype(np.uint64), unsigned)
+            return np.array_equal(values_a, values_b)
+        # Integer features are only compared with float features as float64
+        return np.array_equal(
+            values_a.astype(np.float64, copy=False), values_b.astype(np.float64, copy=False), equal_nan=True
+        )
 
     def _more_tags(self):
         return {"feature_interactions": False}
@@ -5,10 +5,18 @@ import traceback
 import numpy as np
 import pandas as pd
 from pandas import DataFrame, Series
+from scipy.sparse import csr_matrix, hstack, vstack
 from sklearn.feature_selection import SelectKBest, f_classif, f_regression
 
-from src.autogluon.method.common.src.autogluon.common.features.types import S_IMAGE_BYTEARRAY, S_IMAGE_PATH, S_TEXT, S_TEXT_NGRAM
+from src.autogluon.method.common.src.autogluon.common.features.types import (
+    S_IMAGE_BYTEARRAY,
+    S_IMAGE_PATH,
+    S_SPARSE,
+    S_TEXT,
+    S_TEXT_NGRAM,
+)
 from src.autogluon.method.common.src.autogluon.common.utils.lite import disable_if_lite_mode
+from src.autogluon.method.common.src.autogluon.common.utils.pandas_utils import get_csr_matrix
 from src.autogluon.method.common.src.autogluon.common.utils.resource_utils import ResourceManager
 
 from ..vectorizers import downscale_vectorizer, get_ngram_freq, vectorizer_auto_ml_default
@@ -18,7 +26,6 @@ logger = logging.getLogger(__name__)
 
 
 # TODO: Add argument to define the text preprocessing logic
-# TODO: Add argument to output ngrams as a sparse matrix
 # TODO: Add HashingVectorizer support
 # TODO: Documentation
 class TextNgramFeatureGenerator(AbstractFeatureGenerator):
@@ -46,6 +53,15 @@ class TextNgramFeatureGenerator(AbstractFeatureGenerator):
         ngram features will be removed in least frequent to most frequent order.
         Note: For vectorizer_strategy values other than 'combined', the resulting ngrams may use more than this value.
         It is recommended to only increase this value above 0.15 if confident that higher values will not result in out-of-memory errors.
+    sparse : bool, default False
+        If True, the ngrams are output as pandas sparse columns (special type 'sparse') instead of dense columns.
+        The memory of sparse ngrams grows with the count of nonzero ngrams instead of rows * vocabulary size,
+        so max_memory_ratio rarely requires to reduce the vocabulary.
+        LightGBM and XGBoost models convert sparse columns to a CSR matrix without densifying them, CatBoost accepts them directly.
+        Models without sparse support (e.g. NN) will densify the columns.
+    transform_batch_size : int, default 10000
+        Number of rows vectorized at once during inference.
+        Limits the peak memory of the vectorizer and, for dense output, of the intermediate dense arrays.
     **kwargs :
         Refer to :class:`AbstractFeatureGenerator` documentation for details on valid key word arguments.
     """
@@ -57,6 +73,8 @@ class TextNgramFeatureGenerator(AbstractFeatureGenerator):
         max_memory_ratio=0.15,
         prefilter_tokens=False,
         prefilter_token_count=100,
+        sparse=False,
+        transform_batch_size=10000,
         **kwargs,
     ):
         super().__init__(**kwargs)
@@ -80,6 +98,8 @@ class TextNgramFeatureGenerator(AbstractFeatureGenerator):
         self.prefilter_tokens = prefilter_tokens
         self.prefilter_token_count = prefilter_token_count
         self.token_mask = None
+        self.sparse = sparse
+        self.transform_batch_size = transform_batch_size
         self._feature_names_dict = dict()
 
     def _fit_transform(self, X: DataFrame, y: Series = None, problem_type: str = None, **kwargs) -> (DataFrame, dict):
@@ -104,15 +124,16 @@ class TextNgramFeatureGenerator(AbstractFeatureGenerator):
         if self.prefilter_tokens:
             scoring_function = f_classif if problem_type == "binary" else f_regression
             selector = SelectKBest(scoring_function, k=self.prefilter_token_count)
-            selector.fit(X_out, y)
+            selector.fit(get_csr_matrix(X_out) if self.sparse else X_out, y)
             self.token_mask = selector.get_support()
             X_out = X_out[X_out.columns[self.token_mask]]  # select the columns that are most correlated with y
 
         type_family_groups_special = {S_TEXT_NGRAM: list(X_out.columns)}
+        if self.sparse:
+            type_family_groups_special[S_SPARSE] = list(X_out.columns)
         return X_out, type_family_groups_special
 
     def _transform(self, X: DataFrame) -> DataFrame:
-        # TODO: Optimize for inference
         if not self.features_in:
             return DataFrame(index=X.index)
         try:
@@ -229,15 +250,9 @@ class TextNgramFeatureGenerator(AbstractFeatureGenerator):
     def _generate_ngrams(self, X, downsample_ratio: int = None):
         X_nlp_features_combined = []
         for nlp_feature, vectorizer_fit in zip(self.vectorizer_features, self.vectorizers):
-            if nlp_feature == "__nlp__":
-                X_str = X.astype(str)
-                text_data = [". ".join(row) for row in X_str.values]
-            else:
-                nlp_feature_str = X[nlp_feature].astype(str)
-                text_data = nlp_feature_str.values
-            transform_matrix = vectorizer_fit.transform(text_data)
-
             if not self._is_fit:
+                text_data = self._get_text_data(X, nlp_feature)
+                transform_matrix = vectorizer_fit.transform(text_data)
                 transform_matrix = self._adjust_vectorizer_memory_usage(
                     transform_matrix=transform_matrix,
                     text_data=text_data,
@@ -249,14 +264,19 @@ class TextNgramFeatureGenerator(AbstractFeatureGenerator):
                     [f"{nlp_feature}.{x}" for x in nlp_features_names] + [f"{nlp_feature}._total_"]
                 )
                 self._feature_names_dict[nlp_feature] = nlp_features_names_final
-
-            transform_array = transform_matrix.toarray()
-            # This count could technically overflow in absurd situations. Consider making dtype a variable that is computed.
-            nonzero_count = np.count_nonzero(transform_array, axis=1).astype(np.uint16)
-            transform_array = np.append(transform_array, np.expand_dims(nonzero_count, axis=1), axis=1)
-            X_nlp_features = pd.DataFrame(
-                transform_array, columns=self._feature_names_dict[nlp_feature], index=X.index
-            )  # TODO: Consider keeping sparse
+                transform_matrices = [transform_matrix]
+            else:
+                batch_size = self.transform_batch_size if self.transform_batch_size else max(len(X), 1)
+                transform_matrices = [
+                    vectorizer_fit.transform(self._get_text_data(X.iloc[start : start + batch_size], nlp_feature))
+                    for start in range(0, len(X), batch_size)
+                ]
+                if not transform_matrices:
+                    transform_matrices = [vectorizer_fit.transform([])]
+
+            X_nlp_features = self._ngrams_to_df(
+                transform_matrices, columns=self._feature_names_dict[nlp_feature], index=X.index
+            )
             X_nlp_features_combined.append(X_nlp_features)
 
         if X_nlp_features_combined:
@@ -269,14 +289,50 @@ class TextNgramFeatureGenerator(AbstractFeatureGenerator):
 
         return X_nlp_features_combined
 
+    @staticmethod
+    def _get_text_data(X: DataFrame, nlp_feature: str):
+        if nlp_feature == "__nlp__":
+            X_str = X.astype(str)
+            return [". ".join(row) for row in X_str.values]
+        else:
+            return X[nlp_feature].astype(str).values
+
+    def _ngrams_to_df(self, transform_matrices: list, columns, index) -> DataFrame:
+        """Ngram counts of consecutive row batches plus the count of nonzero ngrams per row (the `_total_` feature)."""
+        # This count could technically overflow in absurd situations. Consider making dtype a variable that is computed.
+        dtype = np.result_type(transform_matrices[0].dtype, np.uint16)
+        if self.sparse:
+            transform_matrix = (
+                transform_matrices[0] if len(transform_matrices) == 1 else vstack(transform_matrices, format="csr")
+            )
+            nonzero_count = csr_matrix(transform_matrix.getnnz(axis=1).astype(np.uint16)[:, np.newaxis])
+            transform_matrix = hstack([transform_matrix, nonzero_count], format="csr", dtype=dtype)
+            return pd.DataFrame.sparse.from_spmatrix(transform_matrix, index=index, columns=columns)
+        # Filled batch by batch, so only one batch is dense at a time besides the output
+        transform_array = np.empty((len(index), len(columns)), dtype=dtype)
+        start = 0
+        for transform_matrix in transform_matrices:
+            end = start + transform_matrix.shape[0]
+            transform_array[start:end, :-1] = transform_matrix.toarray()
+            transform_array[start:end, -1] = np.count_nonzero(transform_array[start:end, :-1], axis=1).astype(
+                np.uint16
+            )
+            start = end
+        return pd.DataFrame(transform_array, columns=columns, index=index)
+
     # TODO: REMOVE NEED FOR text_data input!
     def _adjust_vectorizer_memory_usage(
         self, transform_matrix, text_data, vectorizer_fit, downsample_ratio: int = None
     ):
         @disable_if_lite_mode(ret=downsample_ratio)
         def _adjust_per_memory_constraints(downsample_ratio: int):
-            # This assumes that the ngrams eventually turn into int32/float32 downstream
-            predicted_ngrams_memory_usage_bytes = len(text_data) * 4 * (transform_matrix.shape[1] + 1) + 80
+            if self.sparse:
+                # Values and int32 indices of the nonzero ngrams, plus the `_total_` feature of every row
+                itemsize = np.result_type(transform_matrix.dtype, np.uint16).itemsize
+                predicted_ngrams_memory_usage_bytes = (transform_matrix.nnz + len(text_data)) * (itemsize + 4) + 80
+            else:
+                # This assumes that the ngrams eventually turn into int32/float32 downstream
+                predicted_ngrams_memory_usage_bytes = len(text_data) * 4 * (transform_matrix.shape[1] + 1) + 80
             mem_avail = ResourceManager.get_available_virtual_mem()
             mem_rss = ResourceManager.get_memory_rss()
             predicted_rss = mem_rss + predicted_ngrams_memory_usage_bytes
@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 
 from autogluon.features.generators import CategoryFeatureGenerator
 
@@ -69,3 +70,36 @@ def test_category_feature_generator(generator_helper, data_helper):
             assert list(output_data[col].cat.categories) == expected_cat_categories_lst[i]
             assert list(output_data[col]) in expected_cat_values_lst[i]
             assert list(output_data[col].cat.codes) in expected_cat_codes_lst[i]
+
+
+def test_category_feature_generator_unseen_categories():
+    # Given
+    train_data = pd.DataFrame(
+        {
+            "obj": ["a", "b", "a", "c", "c", "c", None, "d"],
+            "cat": pd.Categorical(["x", "y", "y", "z", "z", "x", "z", None]),
+        }
+    )
+    # Categories in a different order, unseen values and missing values
+    test_data = pd.DataFrame(
+        {
+            "obj": ["e", "c", None, "a", "b", "d", "c", "a"],
+            "cat": pd.Categorical(["w", "z", "y", None, "x", "w", "z", "y"], categories=["z", "w", "y", "x"]),
+        }
+    )
+
+    for fillna in [None, "mode"]:
+        generator = CategoryFeatureGenerator(fillna=fillna, minimize_memory=False, num_threads=2)
+
+        # When
+        generator.fit_transform(train_data)
+        output_data = generator.transform(test_data)
+
+        # Therefore
+        for column in ["obj", "cat"]:
+            categories = generator.category_map[column]
+            expected = pd.Categorical(test_data[column], categories=categories)
+            if fillna == "mode":
+                expected = expected.fillna(generator._fillna_map[column])
+            assert output_data[column].array.equals(expected)
+        assert output_data.equals(generator.transform(output_data))
@@ -264,3 +264,54 @@ def test_drop_duplicates_category_edge_cases():
     expected_dropped_7 = ["D"]
     actual_dropped_7 = feature_generator._drop_duplicate_features(X=df, feature_metadata_in=feature_metadata_in)
     assert expected_dropped_7 == actual_dropped_7
+
+
+def test_drop_duplicates_hash_edge_cases():
+    df = pd.DataFrame(
+        {
+            "A": [0.0, 1.0, np.nan, 3.0],
+            "B": [-0.0, 1.0, np.nan, 3.0],
+            "C": [0, 1, 2, 3],
+            "D": ["0", "1", "2", "3"],
+            "E": [0, 1, 2, 3],
+            "F": [0, "1", 2, 3],
+            "G": [0, 1, 2, 3],
+        }
+    )
+    df[["E", "F", "G"]] = df[["E", "F", "G"]].astype("object")
+    feature_metadata_in = FeatureMetadata.from_df(df)
+
+    # -0.0 equals 0.0 and NaN equals NaN. Object values with the same string representation ("0" and 0) are not duplicates
+    expected_dropped = ["B", "G"]
+    actual_dropped = DropDuplicatesFeatureGenerator._drop_duplicate_features(
+        X=df, feature_metadata_in=feature_metadata_in
+    )
+    assert expected_dropped == actual_dropped
+
+    # Columns in blocks of one column give the same result
+    assert ["B"] == DropDuplicatesFeatureGenerator._drop_duplicate_columns(
+        X=df[["A", "B", "C"]], get_values=DropDuplicatesFeatureGenerator._get_values_numeric, max_block_bytes=1
+    )
+    assert ["A", "B"] == DropDuplicatesFeatureGenerator._drop_duplicate_columns(
+        X=df[["A", "B", "C"]], get_values=DropDuplicatesFeatureGenerator._get_values_numeric, keep=False
+    )
+
+
+def test_drop_duplicates_large_integers():
+    df = pd.DataFrame(
+        {
+            "A": [2**53, 1, 5],
+            "B": [2**53 + 1, 1, 5],
+            "C": [2**53 + 1, 1, 5],
+            "D": np.array([2**53 + 1, 1, 5], dtype=np.uint64),
+            "E": [float(2**53), 1.0, 5.0],
+        }
+    )
+    feature_metadata_in = FeatureMetadata.from_df(df)
+
+    # A and B are distinct int64 values that are equal as float64, int features equal float features as float64
+    expected_dropped = ["C", "D", "E"]
+    actual_dropped = DropDuplicatesFeatureGenerator._drop_duplicate_features(
+        X=df, feature_metadata_in=feature_metadata_in
+    )
+    assert expected_dropped == actual_dropped
@@ -1,4 +1,7 @@
+import copy
+
 import numpy as np
+import pandas as pd
 from sklearn.feature_extraction.text import CountVectorizer
 
 from autogluon.common.features.feature_metadata import FeatureMetadata
@@ -90,3 +93,38 @@ def test_text_ngram_feature_generator_categorical_nan(generator_helper, data_hel
     )
 
     assert expected_output_data_feat_total == list(output_data["__nlp__._total_"].values)
+
+
+def test_text_ngram_feature_generator_sparse(generator_helper, data_helper):
+    # Given
+    input_data = data_helper.generate_multi_feature_full()
+
+    toy_vectorizer = CountVectorizer(min_df=2, ngram_range=(1, 3), max_features=1000, dtype=np.uint8)
+
+    # transform_batch_size=4 to transform the 9 rows of the training data in 3 batches
+    generator = TextNgramFeatureGenerator(
+        max_memory_ratio=None, vectorizer=toy_vectorizer, sparse=True, transform_batch_size=4
+    )
+    generator_dense = TextNgramFeatureGenerator(
+        max_memory_ratio=None, vectorizer=copy.deepcopy(toy_vectorizer), transform_batch_size=4
+    )
+
+    expected_feature_metadata_full_sparse = {
+        ("int", ("sparse", "text_ngram")): expected_feature_metadata_full[("int", ("text_ngram",))],
+    }
+
+    # When
+    output_data = generator_helper.fit_transform_assert(
+        input_data=input_data,
+        generator=generator,
+        expected_feature_metadata_in_full=expected_feature_metadata_in_full,
+        expected_feature_metadata_full=expected_feature_metadata_full_sparse,
+    )
+    output_data_dense = generator_dense.fit_transform(input_data)
+
+    # Then
+    assert all(isinstance(dtype, pd.SparseDtype) for dtype in output_data.dtypes)
+    assert expected_output_data_feat_total == list(output_data["__nlp__._total_"].sparse.to_dense().values)
+    pd.testing.assert_frame_equal(output_data.sparse.to_dense(), output_data_dense)
+    pd.testing.assert_frame_equal(generator.transform(input_data.head(5)).sparse.to_dense(), output_data_dense.head(5))
+    pd.testing.assert_frame_equal(generator_dense.transform(input_data.head(5)), output_data_dense.head(5))
@@ -43,6 +43,7 @@ class LGBModel(AbstractModel):
         self._features_internal_map = None
         self._features_internal_list = None
         self._requires_remap = None
+        self._sparse_categories = None  # Categories of the category columns if fit on a CSR matrix due to sparse columns
 
     def _set_default_params(self):
         default_params = get_param_baseline(problem_type=self.problem_type)
@@ -254,6 +255,9 @@ class LGBModel(AbstractModel):
 
     def _predict_proba(self, X, num_cpus=0, **kwargs) -> np.ndarray:
         X = self.preprocess(X, **kwargs)
+        sparse_categories = getattr(self, "_sparse_categories", None)
+        if sparse_categories is not None:
+            X = lgb_utils.to_csr_matrix(X, categories=sparse_categories)
 
         y_pred_proba = self.model.predict(X, num_threads=num_cpus)
         if self.problem_type == QUANTILE:
@@ -311,6 +315,16 @@ class LGBModel(AbstractModel):
         X = self.preprocess(X, is_train=True)
         if X_val is not None:
             X_val = self.preprocess(X_val)
+        feature_name = "auto"
+        categorical_feature = "auto"
+        self._sparse_categories = lgb_utils.get_sparse_categories(X)
+        if self._sparse_categories is not None:
+            # Avoids that LightGBM densifies the sparse columns
+            feature_name = [str(column) for column in X.columns]
+            categorical_feature = [i for i, column in enumerate(X.columns) if column in self._sparse_categories]
+            X = lgb_utils.to_csr_matrix(X, categories=self._sparse_categories)
+            if X_val is not None:
+                X_val = lgb_utils.to_csr_matrix(X_val, categories=self._sparse_categories)
         # TODO: Try creating multiple Datasets for subsets of features, then combining with Dataset.add_features_from(), this might avoid memory spike
 
         y_og = None
@@ -324,7 +338,14 @@ class LGBModel(AbstractModel):
 
         # X, W_train = self.convert_to_weight(X=X)
         dataset_train = construct_dataset(
-            x=X, y=y, location=os.path.join("self.path", "datasets", "train"), params=data_params, save=save, weight=sample_weight
+            x=X,
+            y=y,
+            location=os.path.join("self.path", "datasets", "train"),
+            params=data_params,
+            save=save,
+            weight=sample_weight,
+            feature_name=feature_name,
+            categorical_feature=categorical_feature,
         )
         # dataset_train = construct_dataset_lowest_memory(X=X, y=y, location=self.path + 'datasets/train', params=data_params)
         if X_val is not None:
@@ -337,6 +358,8 @@ class LGBModel(AbstractModel):
                 params=data_params,
                 save=save,
                 weight=sample_weight_val,
+                feature_name=feature_name,
+                categorical_feature=categorical_feature,
             )
             # dataset_val = construct_dataset_lowest_memory(X=X_val, y=y_val, location=self.path + 'datasets/val', reference=dataset_train, params=data_params)
         else:
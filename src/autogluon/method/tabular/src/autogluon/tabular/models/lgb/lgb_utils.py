@@ -7,6 +7,7 @@ import numpy as np
 import pandas as pd
 from pandas import DataFrame, Series
 
+from src.autogluon.method.common.src.autogluon.common.utils.pandas_utils import get_csr_matrix
 from src.autogluon.method.common.src.autogluon.common.utils.try_import import try_import_lightgbm
 from src.autogluon.method.core.src.autogluon.core.constants import BINARY, MULTICLASS, QUANTILE, REGRESSION, SOFTCLASS
 from src.autogluon.method.core.src.autogluon.core.utils.exceptions import TimeLimitExceeded
@@ -98,11 +99,30 @@ def softclass_lgbobj(preds, train_data):
     return grad.flatten("F"), hess.flatten("F")
 
 
-def construct_dataset(x: DataFrame, y: Series, location=None, reference=None, params=None, save=False, weight=None):
+def construct_dataset(
+    x: DataFrame,
+    y: Series,
+    location=None,
+    reference=None,
+    params=None,
+    save=False,
+    weight=None,
+    feature_name="auto",
+    categorical_feature="auto",
+):
     try_import_lightgbm()
     import lightgbm as lgb
 
-    dataset = lgb.Dataset(data=x, label=y, reference=reference, free_raw_data=True, params=params, weight=weight)
+    dataset = lgb.Dataset(
+        data=x,
+        label=y,
+        reference=reference,
+        free_raw_data=True,
+        params=params,
+        weight=weight,
+        feature_name=feature_name,
+        categorical_feature=categorical_feature,
+    )
 
     if save:
         assert location is not None
@@ -117,6 +137,34 @@ def construct_dataset(x: DataFrame, y: Series, location=None, reference=None, pa
     return dataset
 
 
+def get_sparse_categories(X: DataFrame) -> Optional[dict]:
+    """
+    If X has sparse columns (e.g. sparse text ngrams), returns the categories of its category columns
+    and the model is fit on a CSR matrix.
+    Otherwise returns None and the model is fit on the DataFrame, which LightGBM would densify.
+    """
+    if not any(isinstance(dtype, pd.SparseDtype) for dtype in X.dtypes):
+        return None
+    return {
+        column: X[column].cat.categories for column in X.columns if isinstance(X[column].dtype, pd.CategoricalDtype)
+    }
+
+
+def to_csr_matrix(X: DataFrame, categories: dict):
+    """
+    Converts X to a CSR matrix, with the codes of `categories` for the category columns
+    (NaN for missing or unknown categories).
+    This matches how LightGBM encodes category columns of a DataFrame.
+    """
+    if categories:
+        X = X.copy(deep=False)
+        for column, column_categories in categories.items():
+            codes = X[column].cat.set_categories(column_categories).cat.codes.to_numpy().astype(np.float32)
+            codes[codes < 0] = np.nan
+            X[column] = codes
+    return get_csr_matrix(X)
+
+
 def train_lgb_model(early_stopping_callback_kwargs=None, **train_params):
     import lightgbm as lgb
 
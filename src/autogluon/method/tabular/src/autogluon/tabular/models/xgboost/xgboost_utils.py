@@ -1,9 +1,10 @@
 from collections import OrderedDict
 
 import numpy as np
-from scipy.sparse import csr_matrix, hstack
+from scipy.sparse import hstack
 from sklearn.base import BaseEstimator, TransformerMixin
 
+from src.autogluon.method.common.src.autogluon.common.utils.pandas_utils import get_csr_matrix
 from src.autogluon.method.core.src.autogluon.core.constants import BINARY, MULTICLASS, REGRESSION, SOFTCLASS
 
 from ..tabular_nn.utils.categorical_encoders import OneHotMergeRaresHandleUnknownEncoder
@@ -91,7 +92,8 @@ class OheFeatureGenerator(BaseEstimator, TransformerMixin):
         if self.cat_cols:
             X_list.append(self.ohe_encs.transform(X[self.cat_cols]))
         if self.other_cols:
-            X_list.append(csr_matrix(X[self.other_cols]))
+            # Sparse columns (e.g. sparse text ngrams) are not densified
+            X_list.append(get_csr_matrix(X[self.other_cols]))
         return hstack(X_list, format="csr")
 
     def get_feature_names(self):
@@ -4,6 +4,7 @@ import os
 from pathlib import Path
 
 import pandas as pd
+from src.autogluon.method.core.src.autogluon.core.models.ensemble.child_inference import child_inference
 from src.autogluon.method.tabular.src.autogluon.tabular import (TabularDataset, TabularPredictor)
 from sklearn.exceptions import UndefinedMetricWarning
 
@@ -13,6 +14,15 @@ from src.datasets.Splits import get_splits
 warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=UndefinedMetricWarning)
 
+def evaluate(predictor, test_data, args, num_cpus):
+    # Both calls predict with every fold model of every stack layer, so the loaded children are kept for the session
+    parallel = None if args.child_parallel == "none" else args.child_parallel
+    with child_inference(cache_size=args.child_cache, parallel=parallel, num_workers=num_cpus):
+        eval_dict = predictor.evaluate(test_data)
+        leaderboard = predictor.leaderboard(test_data)
+    return eval_dict, leaderboard
+
+
 def main(args):
     folder = args.method
     path = f'src/datasets/feature_engineered_datasets/' + folder
@@ -102,8 +112,7 @@ def main(args):
                                                  eval_metric="root_mean_squared_error").fit(
                         train_data=train_data, time_limit=time_limit, num_cpus=num_cpus, presets="best_quality",
                         memory_limit=memory_limit)
-                    eval_dict = predictor.evaluate(test_data)
-                    leaderboard = predictor.leaderboard(test_data)
+                    eval_dict, leaderboard = evaluate(predictor, test_data, args, num_cpus)
                 elif task_hint == 'binary-classification':
                     try:
                         task_hint = 'binary'
@@ -119,8 +128,7 @@ def main(args):
                                                      eval_metric="None").fit(
                             train_data=train_data, time_limit=time_limit, num_cpus=num_cpus, presets="best_quality",
                             memory_limit=memory_limit)
-                    eval_dict = predictor.evaluate(test_data)
-                    leaderboard = predictor.leaderboard(test_data)
+                    eval_dict, leaderboard = evaluate(predictor, test_data, args, num_cpus)
                 elif task_hint == 'multiclass-classification':
                     task_hint = 'multiclass'
                     print("Multiclass Classification")
@@ -128,8 +136,7 @@ def main(args):
                                                  eval_metric="log_loss").fit(
                         train_data=train_data, time_limit=time_limit, num_cpus=num_cpus, presets="best_quality",
                         memory_limit=memory_limit)
-                    eval_dict = predictor.evaluate(test_data)
-                    leaderboard = predictor.leaderboard(test_data)
+                    eval_dict, leaderboard = evaluate(predictor, test_data, args, num_cpus)
                 print("Write leaderboard + Append eval_df")
                 path_leaderboard = f"src/autogluon/results/leaderboard/leaderboard_{task_hint}_{dataset}_{method}_{fold}.parquet"
                 leaderboard.to_parquet(Path(path_leaderboard))
@@ -144,6 +151,11 @@ def main(args):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Run autogluon')
     parser.add_argument('--method', type=str, required=True, help='Feature engineering method to use')
+    # Off by default: cached fold models and concurrently predicting folds hold many models in memory at once
+    parser.add_argument('--child_cache', type=int, default=0,
+                        help='Fold models kept in memory during evaluation (0: loaded from disk per prediction)')
+    parser.add_argument('--child_parallel', type=str, default='none', choices=['none', 'thread', 'process'],
+                        help='How the fold models of a bagged model predict during evaluation')
     args = parser.parse_args()
     main(args)
 
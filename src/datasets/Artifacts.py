@@ -0,0 +1,153 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+# Feature-engineered train/test frames shared by the AMLTK and the feature engineering (-> AutoGluon) pipelines
+ARTIFACT_DIR = Path(os.environ.get("FE_ARTIFACT_DIR", "src/datasets/feature_engineered_datasets/artifacts"))
+
+# Hits and misses of this process, every access is also appended to access.jsonl for all processes
+ARTIFACT_STATS = {"hits": 0, "misses": 0, "writes": 0}
+
+
+def config_hash(config) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+@lru_cache(maxsize=None)
+def code_version(fe_function) -> str:
+    """Hash of all python files in the package of the feature engineering function, changes with every code edit."""
+    package_dir = Path(inspect.getfile(fe_function)).parent
+    sha = hashlib.sha256()
+    for path in sorted(package_dir.rglob("*.py")):
+        sha.update(path.relative_to(package_dir).as_posix().encode())
+        sha.update(path.read_bytes())
+    return sha.hexdigest()[:12]
+
+
+def artifact_key(openml_task_id, split, method, config, fe_function) -> str:
+    # Key on the function instead of the method label, the pipelines name some methods differently
+    # (e.g. "cfs", "correlationBasedFS" and "correlationbased")
+    return f"{openml_task_id}_{split}_{fe_function.__name__}_{config_hash(config)}_{code_version(fe_function)}"
+
+
+def _artifact_path(key) -> Path:
+    return ARTIFACT_DIR / key
+
+
+def _append_jsonl(path, record):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Single small appends with O_APPEND do not interleave between processes
+    with open(path, "a") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+
+def load_features(openml_task_id, split, method, config, fe_function) -> tuple[
+    pd.DataFrame,
+    pd.DataFrame,
+    dict
+] | None:
+    key = artifact_key(openml_task_id, split, method, config, fe_function)
+    path = _artifact_path(key)
+    hit = (path / "meta.json").is_file()
+    ARTIFACT_STATS["hits" if hit else "misses"] += 1
+    _append_jsonl(ARTIFACT_DIR / "access.jsonl", {"event": "hit" if hit else "miss", "key": key, "time": time.time()})
+    if not hit:
+        return None
+    meta = json.loads((path / "meta.json").read_text())
+    train_x = pd.read_parquet(path / "train_x.parquet")
+    test_x = pd.read_parquet(path / "test_x.parquet")
+    return train_x, test_x, meta
+
+
+def save_features(openml_task_id, split, method, config, fe_function, train_x, test_x, execution_time) -> Path:
+    """Write the artifact into a temporary directory and rename it into place, readers never see partial files.
+
+    If another job stored the same key in the meantime its artifact is kept and ours is discarded.
+    """
+    key = artifact_key(openml_task_id, split, method, config, fe_function)
+    path = _artifact_path(key)
+    tmp_path = ARTIFACT_DIR / f".{key}.{os.getpid()}.tmp"
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "key": key,
+        "openml_task_id": openml_task_id,
+        "split": split,
+        "method": method,
+        "function": fe_function.__name__,
+        "config": config,
+        "code_version": code_version(fe_function),
+        "execution_time": execution_time,
+        "train_shape": list(train_x.shape),
+        "test_shape": list(test_x.shape),
+        "created": time.time(),
+    }
+    train_x.to_parquet(tmp_path / "train_x.parquet")
+    test_x.to_parquet(tmp_path / "test_x.parquet")
+    (tmp_path / "meta.json").write_text(json.dumps(meta, indent=2, default=str))
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return path
+    ARTIFACT_STATS["writes"] += 1
+    _append_jsonl(ARTIFACT_DIR / "manifest.jsonl", meta)
+    return path
+
+
+def load_first_features(openml_task_id, split, method, configs, fe_function) -> tuple[
+    dict,
+    tuple[pd.DataFrame, pd.DataFrame, dict]
+] | None:
+    """The first of the alternative configurations of a method with stored features, and those features."""
+    for config in configs:
+        cached = load_features(openml_task_id, split, method, config, fe_function)
+        if cached is not None:
+            return config, cached
+    return None
+
+
+def get_or_compute_features(openml_task_id, split, method, configs, fe_function, compute, retry_on=()) -> tuple[
+    pd.DataFrame,
+    pd.DataFrame
+]:
+    """Return the stored features of one of ``configs`` or compute and store them.
+
+    ``compute(config)`` returns train_x, test_x. The configurations are tried in order while it raises one of
+    ``retry_on``, the features are stored under the configuration that produced them.
+    """
+    first = load_first_features(openml_task_id, split, method, configs, fe_function)
+    if first is not None:
+        print(f"Use stored features of {method} for task {openml_task_id}, split {split}")
+        _, (train_x, test_x, _) = first
+        return train_x, test_x
+    for i, config in enumerate(configs):
+        start_time = time.time()
+        try:
+            train_x, test_x = compute(config)
+        except retry_on:
+            if i == len(configs) - 1:
+                raise
+            continue
+        execution_time = time.time() - start_time
+        save_features(openml_task_id, split, method, config, fe_function, train_x, test_x, execution_time)
+        return train_x, test_x
+
+
+def get_artifact_stats() -> dict:
+    """Hit/miss counts over all processes that used the artifact store."""
+    stats = {"hits": 0, "misses": 0}
+    access_log = ARTIFACT_DIR / "access.jsonl"
+    if access_log.is_file():
+        with open(access_log) as f:
+            for line in f:
+                stats["hits" if json.loads(line)["event"] == "hit" else "misses"] += 1
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
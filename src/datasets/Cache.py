@@ -0,0 +1,160 @@
+import argparse
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Pre-populate this directory once (e.g. on the login node) and point all array jobs at it, then
+# no compute node has to touch the OpenML cache directory or re-parse ARFF files again.
+DATASET_CACHE_DIR = Path(os.environ.get("FE_DATASET_CACHE_DIR", "src/datasets/cache"))
+# Set FE_DATASET_OFFLINE=1 to fail instead of downloading a task that is missing from the cache.
+DATASET_CACHE_OFFLINE = os.environ.get("FE_DATASET_OFFLINE", "0") == "1"
+
+
+def _task_dir(openml_task_id, cache_dir) -> Path:
+    return Path(cache_dir) / str(openml_task_id)
+
+
+def _atomic_write(path, write_fn):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    write_fn(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_npz(path, arrays):
+    # Write through a file object, np.savez would otherwise append ".npz" to the temporary name.
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def _file_checksum(path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def cache_openml_task(openml_task_id, cache_dir=None) -> dict:
+    """Download an OpenML task once and store it as an uncompressed Arrow file plus a fold-index sidecar.
+
+    The data file is named after its sha256 checksum, so a changed dataset version never overwrites the files other
+    jobs may currently have memory-mapped. ``meta.json`` is written last and points to the current data file.
+    """
+    import openml
+
+    cache_dir = DATASET_CACHE_DIR if cache_dir is None else Path(cache_dir)
+    task_dir = _task_dir(openml_task_id, cache_dir)
+    task_dir.mkdir(parents=True, exist_ok=True)
+
+    task = openml.tasks.get_task(
+        openml_task_id,
+        download_splits=True,
+        download_data=True,
+        download_qualities=True,
+        download_features_meta_data=True,
+    )
+    X, y = task.get_X_and_y(dataset_format="dataframe")  # type: ignore
+    target = y.name if y.name is not None else "target"
+    df = X.reset_index(drop=True)
+    df[target] = y.reset_index(drop=True)
+
+    tmp_data_path = task_dir / f".data.{os.getpid()}.tmp"
+    feather.write_feather(df, tmp_data_path, compression="uncompressed")
+    checksum = _file_checksum(tmp_data_path)
+    data_path = task_dir / f"{checksum}.arrow"
+    os.replace(tmp_data_path, data_path)
+
+    n_repeats, n_folds, _ = task.get_split_dimensions()
+    folds = {}
+    for fold in range(n_folds):
+        train_idx, test_idx = task.get_train_test_split_indices(fold=fold)
+        folds[f"train_{fold}"] = np.asarray(train_idx, dtype=np.int64)
+        folds[f"test_{fold}"] = np.asarray(test_idx, dtype=np.int64)
+    folds_path = task_dir / f"{checksum}_folds.npz"
+    _atomic_write(folds_path, lambda p: _write_npz(p, folds))
+
+    meta = {
+        "task_id": int(openml_task_id),
+        "name": task.get_dataset().name,
+        "task_type": str(task.task_type),
+        "target": target,
+        "n_rows": int(len(df)),
+        "n_features": int(X.shape[1]),
+        "n_folds": int(n_folds),
+        "n_repeats": int(n_repeats),
+        "checksum": checksum,
+        "data_file": data_path.name,
+        "folds_file": folds_path.name,
+    }
+    _atomic_write(task_dir / "meta.json", lambda p: p.write_text(json.dumps(meta, indent=2)))
+    return meta
+
+
+def get_cache_meta(openml_task_id, cache_dir=None) -> dict:
+    """Return the cache metadata of a task, populating the cache from OpenML first if needed (unless offline)."""
+    cache_dir = DATASET_CACHE_DIR if cache_dir is None else Path(cache_dir)
+    meta_path = _task_dir(openml_task_id, cache_dir) / "meta.json"
+    if not meta_path.is_file():
+        if DATASET_CACHE_OFFLINE:
+            raise FileNotFoundError(f"Task {openml_task_id} is not in the dataset cache {cache_dir} (offline mode)")
+        return cache_openml_task(openml_task_id, cache_dir)
+    return json.loads(meta_path.read_text())
+
+
+@lru_cache(maxsize=8)
+def _open_table(data_path) -> pa.Table:
+    # Zero-copy: the columns stay backed by the page cache and are only paged in when a fold touches them.
+    return pa.ipc.open_file(pa.memory_map(str(data_path), "r")).read_all()
+
+
+@lru_cache(maxsize=8)
+def _open_folds(folds_path) -> dict:
+    with np.load(folds_path) as folds:
+        return {key: folds[key] for key in folds.files}
+
+
+def verify_cached_task(openml_task_id, cache_dir=None) -> bool:
+    cache_dir = DATASET_CACHE_DIR if cache_dir is None else Path(cache_dir)
+    meta = get_cache_meta(openml_task_id, cache_dir)
+    return _file_checksum(_task_dir(openml_task_id, cache_dir) / meta["data_file"]) == meta["checksum"]
+
+
+def _take(table, idx, target) -> tuple[pd.DataFrame, pd.Series]:
+    df = table.take(pa.array(idx)).to_pandas()
+    # Keep the positional index labels of the original OpenML frame, later concats align on them.
+    df.index = pd.Index(idx)
+    y = df.pop(target)
+    return df, y
+
+
+def load_cached_fold(openml_task_id, fold, cache_dir=None) -> tuple[
+    pd.DataFrame,
+    pd.Series,
+    pd.DataFrame,
+    pd.Series,
+    dict
+]:
+    cache_dir = DATASET_CACHE_DIR if cache_dir is None else Path(cache_dir)
+    meta = get_cache_meta(openml_task_id, cache_dir)
+    task_dir = _task_dir(openml_task_id, cache_dir)
+    table = _open_table(task_dir / meta["data_file"])
+    folds = _open_folds(task_dir / meta["folds_file"])
+    train_x, train_y = _take(table, folds[f"train_{fold}"], meta["target"])
+    test_x, test_y = _take(table, folds[f"test_{fold}"], meta["target"])
+    return train_x, train_y, test_x, test_y, meta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Populate the local dataset cache from OpenML")
+    parser.add_argument("--task_ids", type=int, nargs="+", required=True, help="OpenML task ids to cache")
+    parser.add_argument("--cache_dir", type=str, default=str(DATASET_CACHE_DIR), help="Cache directory")
+    args = parser.parse_args()
+    for task_id in args.task_ids:
+        print(cache_openml_task(task_id, args.cache_dir))
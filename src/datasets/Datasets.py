@@ -1,8 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
-import openml
 from sklearn.impute import SimpleImputer
 
+from src.datasets.Cache import get_cache_meta, load_cached_fold
+
 
 def get_openml_dataset(
         openml_task_id: int,
@@ -13,17 +16,7 @@ def get_openml_dataset(
     pd.DataFrame,
     pd.DataFrame,
 ]:
-    task = openml.tasks.get_task(
-        openml_task_id,
-        download_splits=True,
-        download_data=True,
-        download_qualities=True,
-        download_features_meta_data=True,
-    )
-    train_idx, test_idx = task.get_train_test_split_indices(fold=fold)
-    X, y = task.get_X_and_y(dataset_format="dataframe")  # type: ignore
-    train_x, train_y = X.iloc[train_idx], y.iloc[train_idx]
-    test_x, test_y = X.iloc[test_idx], y.iloc[test_idx]
+    train_x, train_y, test_x, test_y, _ = load_cached_fold(openml_task_id, fold)
     return train_x, train_y, test_x, test_y
 
 
@@ -35,23 +28,69 @@ def get_amlb_dataset(openml_task_id, split) -> tuple[
     str,
     str
 ]:
-    task = openml.tasks.get_task(openml_task_id)
-    train_idx, test_idx = task.get_train_test_split_indices(fold=split)
-    name = task.get_dataset().name
-    print(task.task_type)
-    if task.task_type == "Supervised Classification":
+    train_x, train_y, test_x, test_y, meta = load_cached_fold(openml_task_id, split)
+    name = meta["name"]
+    print(meta["task_type"])
+    if meta["task_type"] == "Supervised Classification":
         task_hint = "binary-classification"
-    elif task.task_type == "Clustering":
+    elif meta["task_type"] == "Clustering":
         task_hint = "multi-classification"
     else:
         task_hint = "regression"
-    X, y = task.get_X_and_y(dataset_format="dataframe")
-    train_x, train_y = X.iloc[train_idx], y.iloc[train_idx]
-    test_x, test_y = X.iloc[test_idx], y.iloc[test_idx]
     return train_x, train_y, test_x, test_y, name, task_hint
 
 
-def get_dataset(option) -> tuple[
+# All Datasets from the AutoML Benchmark with a number of 1000-5000 samples, keyed by option
+# Tags: "amltk" = used in the AMLTK benchmark, "small" = p < 50, "wide" = p >= 150
+DATASET_COLUMNS = ("name", "task_hint", "openml_task_id", "n", "p", "tags")
+DATASETS = {
+    #### REGRESSION ####
+    1: ("abalone_dataset", "regression", 359944, 4177, 9, ("amltk", "small")),  # abalone
+    2: ("house_prices_nominal_dataset", "regression", 359951, 1460, 80, ()),  # house prices nominal
+    3: ("mercedes_dataset", "regression", 233215, 4209, 377, ("wide",)),  # Mercedes Benz Greener Manufacturing
+    4: ("mip_dataset", "regression", 360945, 1090, 145, ()),  # MIP-2016-regression
+    5: ("moneyball_dataset", "regression", 167210, 1232, 15, ("amltk", "small")),  # moneyball
+    6: ("quake_dataset", "regression", 359930, 2178, 4, ("small",)),  # quake
+    7: ("santander_dataset", "regression", 233214, 4459, 4992, ("wide",)),  # Santander transaction value
+    8: ("sat11_dataset", "regression", 359948, 4440, 117, ()),  # SAT11-HAND-runtime-regression
+    9: ("socmob_dataset", "regression", 359932, 1156, 6, ("small",)),  # socmob
+    10: ("space_ga_dataset", "regression", 359933, 3107, 7, ("small",)),  # space ga
+    11: ("us_crime_dataset", "regression", 359945, 1994, 127, ()),  # us crime
+    #### CLASSIFICATION ####
+    12: ("ada_dataset", "classification", 190411, 4147, 49, ("small",)),  # ada
+    13: ("amazon_commerce_reviews_dataset", "classification", 10090, 1500, 10001, ("wide",)),  # amazon-commerce-reviews
+    14: ("australian_dataset", "classification", 146818, 690, 15, ("amltk", "small")),  # australian dataset
+    15: ("bioresponse_dataset", "classification", 359967, 3751, 1777, ("amltk", "wide")),  # bioresponse - too many features
+    16: ("blood_transfusion_service_center_dataset", "classification", 359955, 748, 5, ("small",)),  # blood transfusion service center dataset
+    17: ("car_dataset", "classification", 359960, 1728, 7, ("amltk", "small")),  # car
+    18: ("churn_dataset", "classification", 359968, 5000, 21, ("amltk", "small")),  # churn
+    19: ("cmc_dataset", "classification", 359959, 1473, 10, ("small",)),  # cmc
+    20: ("cnae-9_dataset", "classification", 359957, 1080, 857, ("wide",)),  # cnae-9
+    21: ("credit_g_dataset", "classification", 168757, 1000, 21, ("amltk", "small")),  # credit g dataset
+    22: ("dna_dataset", "classification", 359964, 3186, 181, ("amltk", "wide")),  # dna
+    23: ("gina_dataset", "classification", 189922, 3153, 971, ("amltk", "wide")),  # gina
+    24: ("internet_advertisements_dataset", "classification", 359966, 3279, 1559, ("amltk", "wide")),  # Internet-Advertisements
+    25: ("jasmine_dataset", "classification", 168911, 2984, 145, ()),  # jasmine
+    26: ("kc1_dataset", "classification", 359962, 2109, 22, ("small",)),  # kc1
+    27: ("kr_vs_kp_dataset", "classification", 359965, 3196, 37, ("amltk", "small")),  # kr-vs-kp
+    28: ("madeline_dataset", "classification", 190392, 3140, 260, ("amltk", "wide")),  # madeline
+    29: ("mfeat_factors_dataset", "classification", 359961, 2000, 217, ("amltk", "wide")),  # mfeat-factors
+    30: ("ozone_level_dataset", "classification", 190137, 2534, 73, ()),  # ozone-level-8hr
+    31: ("pc4_dataset", "classification", 359958, 1458, 38, ("amltk", "small")),  # pc4
+    32: ("qsar_biodeg_dataset", "classification", 359956, 1055, 42, ("small",)),  # qsar-biodeg
+    33: ("segment_dataset", "classification", 359963, 2310, 20, ("small",)),  # segment
+    34: ("steel_plates_fault_dataset", "classification", 168784, 1941, 28, ("small",)),  # steel-plates-fault
+    35: ("wilt_dataset", "classification", 146820, 4839, 6, ("amltk", "small")),  # wilt
+    36: ("wine_quality_white_dataset", "classification", 359974, 4898, 12, ("amltk", "small")),  # wine-quality-white
+    37: ("yeast_dataset", "classification", 2073, 1484, 9, ("small",)),  # yeast
+}
+
+
+def get_dataset_info(option) -> dict:
+    return dict(zip(DATASET_COLUMNS, DATASETS[option]))
+
+
+def get_dataset(option, outer_fold_number=0) -> tuple[
     pd.DataFrame,
     pd.DataFrame,
     pd.DataFrame | pd.Series,
@@ -59,307 +98,40 @@ def get_dataset(option) -> tuple[
     str,
     str
 ]:
+    info = get_dataset_info(option)
+    train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=info["openml_task_id"], fold=outer_fold_number)
+    return train_x, train_y, test_x, test_y, info["task_hint"], info["name"]
 
-    """All Datasets from the AutoML Benchmark with a number of 1000-5000 samples"""
-    #### REGRESSION ####
-    # abalone (n = 4177, p = 9) (yes)
-    if option == 1:
-        name = "abalone_dataset"
-        task_hint = "regression"
-        openml_task_id = 359944
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # house prices nominal (n = 1460, p = 80) (no)
-    elif option == 2:
-        name = "house_prices_nominal_dataset"
-        task_hint = "regression"
-        openml_task_id = 359951
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # Mercedes Benz Greener Manufacturing (n = 4209, p = 377) (no)
-    elif option == 3:
-        name = "mercedes_dataset"
-        task_hint = "regression"
-        openml_task_id = 233215
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # MIP-2016-regression (n = 1090, p = 145) (no)
-    elif option == 4:
-        name = "mip_dataset"
-        task_hint = "regression"
-        openml_task_id = 360945
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # moneyball (n = 1232, p = 15) (yes)
-    elif option == 5:
-        name = "moneyball_dataset"
-        task_hint = "regression"
-        openml_task_id = 167210
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # quake (n = 2178, p = 4) (no)
-    elif option == 6:
-        name = "quake_dataset"
-        task_hint = "regression"
-        openml_task_id = 359930
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # Santander transaction value (n = 4459, p = 4992) (no)
-    elif option == 7:
-        name = "santander_dataset"
-        task_hint = "regression"
-        openml_task_id = 233214
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # SAT11-HAND-runtime-regression (n = 4440, p = 117) (no)
-    elif option == 8:
-        name = "sat11_dataset"
-        task_hint = "regression"
-        openml_task_id = 359948
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # socmob (n = 1156, p = 6) (no)
-    elif option == 9:
-        name = "socmob_dataset"
-        task_hint = "regression"
-        openml_task_id = 359932
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # space ga (n = 3107, p = 7) (no)
-    elif option == 10:
-        name = "space_ga_dataset"
-        task_hint = "regression"
-        openml_task_id = 359933
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # us crime (n = 1994, p = 127) (no)
-    elif option == 11:
-        name = "us_crime_dataset"
-        task_hint = "regression"
-        openml_task_id = 359945
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
 
-    #### CLASSIFICATION ####
-    # ada (n = 4147, p = 49) (no)
-    elif option == 12:
-        name = "ada_dataset"
-        task_hint = "classification"
-        openml_task_id = 190411
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # amazon-commerce-reviews (n = 1500, p = 10001) (no)
-    elif option == 13:
-        name = "amazon_commerce_reviews_dataset"
-        task_hint = "classification"
-        openml_task_id = 10090
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # australian dataset (n = 690, p = 15) (yes)
-    elif option == 14:
-        name = "australian_dataset"
-        task_hint = "classification"
-        openml_task_id = 146818
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # bioresponse (n = 3751, p = 1777) (yes, too many features)
-    elif option == 15:
-        name = "bioresponse_dataset"
-        task_hint = "classification"
-        openml_task_id = 359967
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # blood transfusion service center dataset (n = 748, p = 5) (yes)
-    elif option == 16:
-        name = "blood_transfusion_service_center_dataset"
-        task_hint = "classification"
-        openml_task_id = 359955
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # car (n = 1728, p = 7) (yes)
-    elif option == 17:
-        name = "car_dataset"
-        task_hint = "classification"
-        openml_task_id = 359960
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # churn (n = 5000, p = 21) (yes)
-    elif option == 18:
-        name = "churn_dataset"
-        task_hint = "classification"
-        openml_task_id = 359968
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # cmc (n = 1473, p = 10) (no)
-    elif option == 19:
-        name = "cmc_dataset"
-        task_hint = "classification"
-        openml_task_id = 359959
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # cnae-9 (n = 1080, p = 857) (no)
-    elif option == 20:
-        name = "cnae-9_dataset"
-        task_hint = "classification"
-        openml_task_id = 359957
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # credit g dataset (n = 1000, p = 21) (yes)
-    elif option == 21:
-        name = "credit_g_dataset"
-        task_hint = "classification"
-        openml_task_id = 168757
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # dna (n = 3186, p = 181) (yes)
-    elif option == 22:
-        name = "dna_dataset"
-        task_hint = "classification"
-        openml_task_id = 359964
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # gina (n = 3153, p = 971) (yes)
-    elif option == 23:
-        name = "gina_dataset"
-        task_hint = "classification"
-        openml_task_id = 189922
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # Internet-Advertisements (n = 3279, p = 1559) (yes)
-    elif option == 24:
-        name = "internet_advertisements_dataset"
-        task_hint = "classification"
-        openml_task_id = 359966
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # jasmine (n = 2984, p = 145) (no)
-    elif option == 25:
-        name = "jasmine_dataset"
-        task_hint = "classification"
-        openml_task_id = 168911
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # kc1 (n = 2109, p = 22) (no)
-    elif option == 26:
-        name = "kc1_dataset"
-        task_hint = "classification"
-        openml_task_id = 359962
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # kr-vs-kp (n = 3196, p = 37) (yes)
-    elif option == 27:
-        name = "kr_vs_kp_dataset"
-        task_hint = "classification"
-        openml_task_id = 359965
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # madeline (n = 3140, p = 260) (yes)
-    elif option == 28:
-        name = "madeline_dataset"
-        task_hint = "classification"
-        openml_task_id = 190392
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # mfeat-factors (n = 2000, p = 217) (yes)
-    elif option == 29:
-        name = "mfeat_factors_dataset"
-        task_hint = "classification"
-        openml_task_id = 359961
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # ozone-level-8hr (n = 2534, p = 73) (no)
-    elif option == 30:
-        name = "ozone_level_dataset"
-        task_hint = "classification"
-        openml_task_id = 190137
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # pc4 (n = 1458, p = 38) (yes)
-    elif option == 31:
-        name = "pc4_dataset"
-        task_hint = "classification"
-        openml_task_id = 359958
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # qsar-biodeg (n = 1055, p = 42) (no)
-    elif option == 32:
-        name = "qsar_biodeg_dataset"
-        task_hint = "classification"
-        openml_task_id = 359956
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # segment (n = 2310, p = 20) (no)
-    elif option == 33:
-        name = "segment_dataset"
-        task_hint = "classification"
-        openml_task_id = 359963
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # steel-plates-fault (n = 1941, p = 28) (no)
-    elif option == 34:
-        name = "steel_plates_fault_dataset"
-        task_hint = "classification"
-        openml_task_id = 168784
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # wilt (n = 4839, p = 6) (yes)
-    elif option == 35:
-        name = "wilt_dataset"
-        task_hint = "classification"
-        openml_task_id = 146820
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # wine-quality-white (n = 4898, p = 12) (yes)
-    elif option == 36:
-        name = "wine_quality_white_dataset"
-        task_hint = "classification"
-        openml_task_id = 359974
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
-    # yeast (n = 1484, p = 9) (no)
-    elif option == 37:
-        name = "yeast_dataset"
-        task_hint = "classification"
-        openml_task_id = 2073
-        outer_fold_number = 0
-        train_x, train_y, test_x, test_y = get_openml_dataset(openml_task_id=openml_task_id, fold=outer_fold_number)
-        return train_x, train_y, test_x, test_y, task_hint, name
+def get_suite(*tags, task_hint=None) -> list[int]:
+    """Options carrying all given tags, largest (n * p) first so that long jobs are scheduled before short ones."""
+    infos = {option: get_dataset_info(option) for option in DATASETS}
+    options = [
+        option for option, info in infos.items()
+        if set(tags) <= set(info["tags"]) and (task_hint is None or info["task_hint"] == task_hint)
+    ]
+    return sorted(options, key=lambda option: infos[option]["n"] * infos[option]["p"], reverse=True)
+
+
+class DatasetView:
+    """Handle on one registered dataset whose folds are only sliced out of the dataset cache when requested.
+
+    Every call returns fresh frames, the feature engineering methods modify their inputs in place.
+    """
+
+    def __init__(self, option):
+        self.option = option
+        self.info = get_dataset_info(option)
+
+    def fold(self, outer_fold_number=0):
+        return get_dataset(self.option, outer_fold_number)
+
+
+def prefetch_datasets(options, n_workers=8) -> dict[int, DatasetView]:
+    """Populate the dataset cache for all options concurrently and return lazy views on them."""
+    with ThreadPoolExecutor(max_workers=n_workers) as ex:
+        list(ex.map(lambda option: get_cache_meta(get_dataset_info(option)["openml_task_id"]), options))
+    return {option: DatasetView(option) for option in options}
 
 
 def preprocess_data(train_x, test_x) -> (pd.DataFrame, pd.DataFrame):
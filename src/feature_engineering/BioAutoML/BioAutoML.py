@@ -1,5 +1,8 @@
 # https://github.com/Bonidia/BioAutoML
 
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
 import lightgbm as lgb
@@ -8,14 +11,29 @@ from catboost import CatBoostClassifier
 from hyperopt import hp, Trials, fmin, tpe, STATUS_OK
 from sklearn.ensemble import AdaBoostClassifier, RandomForestClassifier
 from sklearn.metrics import f1_score, balanced_accuracy_score
-from sklearn.model_selection import StratifiedKFold, cross_val_score, KFold
-from sklearn.metrics import make_scorer
+from sklearn.model_selection import StratifiedKFold, KFold
+
+
+# Parameters of the search space the objective depends on. The descriptor flags (NAC, DNC, ...) select groups of
+# biological sequence descriptors, the tabular features are always used as a whole.
+OBJECTIVE_PARAMETERS = ("Classifier",)
+N_FOLDS = 10
+FOLD_SEED = 63
+
+# Objective of the pool workers, set once per worker by the initializer
+_worker_objective = None
+
+
+def _init_worker(objective):
+    global _worker_objective
+    _worker_objective = objective
 
 
-global global_train_y
+def _score_fold(classifier, fold):
+    return _worker_objective.score_fold(classifier, fold)
 
 
-def get_bioautoml_features(train_x, train_y, test_x, estimations, continuous) -> tuple[
+def get_bioautoml_features(train_x, train_y, test_x, estimations, continuous, n_jobs=1) -> tuple[
     pd.DataFrame,
     pd.DataFrame
 ]:
@@ -27,19 +45,16 @@ def get_bioautoml_features(train_x, train_y, test_x, estimations, continuous) ->
     for column in train_y.select_dtypes(include=['object', 'category']).columns:
         train_y[column], uniques = pd.factorize(train_y[column])
 
-    train_x, test_x = feature_engineering(estimations, train_x, train_y.values.ravel(), test_x, continuous)
+    train_x, test_x = feature_engineering(estimations, train_x, train_y.values.ravel(), test_x, continuous, n_jobs)
     return train_x, test_x
 
 
-def feature_engineering(estimations, train, train_labels, test, continuous):
+def feature_engineering(estimations, train, train_labels, test, continuous, n_jobs=1):
     """Automated Feature Engineering - Bayesian Optimization"""
 
-    global df_x, labels_y
-
     print('Automated Feature Engineering - Bayesian Optimization')
 
     df_x = train
-    labels_y = train_labels
     df_test = test
 
     param = {'NAC': [0, 1], 'DNC': [0, 1],
@@ -62,12 +77,17 @@ def feature_engineering(estimations, train, train_labels, test, continuous):
              'Tsallis': hp.choice('Tsallis', [0, 1]),
              'Classifier': hp.choice('Classifier', [0, 1, 2])}
 
+    objective = CVObjective(df_x, train_labels, continuous, n_jobs=n_jobs)
     trials = Trials()
-    best_tuning = fmin(fn=lambda space: objective_rf(space, continuous),
-                       space=space,
-                       algo=tpe.suggest,
-                       max_evals=estimations,
-                       trials=trials)
+    try:
+        best_tuning = fmin(fn=objective,
+                           space=space,
+                           algo=tpe.suggest,
+                           max_evals=estimations,
+                           trials=trials)
+    finally:
+        objective.close()
+    print(f"{len(trials.trials)} trials, {len(objective.results)} cross-validations")
 
     index = range(len(df_x.columns.tolist()))
 
@@ -79,46 +99,101 @@ def feature_engineering(estimations, train, train_labels, test, continuous):
 
     return btrain, btest
 
-def objective_rf(space, continuous):
-    fasta_label_train = 2
-    n_cpu = 1
-
-    """Automated Feature Engineering - Objective Function - Bayesian Optimization"""
 
-    index = range(len(df_x.columns.tolist()))
+class CVObjective:
+    """Objective of the search: the mean CV score of the classifier on the training data, minimized as its negative.
 
-    x = df_x.iloc[:, index]
+    The folds are drawn once with a fixed seed, so a configuration always gets the same score and the result is
+    memoized on the parameters in OBJECTIVE_PARAMETERS. The folds of a cross-validation are fitted on n_jobs worker
+    processes, LightGBM trains on subsets of one binned dataset.
+    """
 
-    if int(space['Classifier']) == 0:
-        if fasta_label_train > 2:
-            model = AdaBoostClassifier(random_state=63)
+    def __init__(self, x, labels, continuous, n_jobs=1, fasta_label_train=2):
+        self.x = np.ascontiguousarray(x, dtype=np.float32)
+        self.classes, self.y = np.unique(labels, return_inverse=True)
+        self.fasta_label_train = fasta_label_train
+        self.n_jobs = n_jobs
+        print("continuous")
+        if continuous:
+            print("KFold")
+            kfold = KFold(n_splits=N_FOLDS, shuffle=True, random_state=FOLD_SEED)
+        else:
+            print("StratifiedKFold")
+            kfold = StratifiedKFold(n_splits=N_FOLDS, shuffle=True, random_state=FOLD_SEED)
+        self.folds = list(kfold.split(self.x, self.y))
+        self.results = {}
+        self._binned = None
+        self._pool = None
+
+    def __getstate__(self):
+        # Workers build their own binned dataset and pool
+        return {**self.__dict__, "_binned": None, "_pool": None}
+
+    def __call__(self, space):
+        key = tuple(int(space[name]) for name in OBJECTIVE_PARAMETERS)
+        if key not in self.results:
+            self.results[key] = self.cross_validate(int(space['Classifier']))
+        return {'loss': -self.results[key], 'status': STATUS_OK}
+
+    def cross_validate(self, classifier) -> float:
+        if self.n_jobs == 1:
+            scores = [self.score_fold(classifier, fold) for fold in range(len(self.folds))]
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.n_jobs, initializer=_init_worker, initargs=(self,))
+            scores = list(self._pool.map(_score_fold, [classifier] * len(self.folds), range(len(self.folds))))
+        return float(np.mean(scores))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def get_model(self, classifier):
+        n_cpu = 1
+        if classifier == 0:
+            if self.fasta_label_train > 2:
+                return AdaBoostClassifier(random_state=63)
+            return CatBoostClassifier(n_estimators=500,
+                                      thread_count=n_cpu, nan_mode='Max',
+                                      logging_level='Silent', random_state=63)
+        elif classifier == 1:
+            return RandomForestClassifier(n_estimators=500, n_jobs=n_cpu, random_state=63)
+        return lgb.LGBMClassifier(n_estimators=500, n_jobs=n_cpu, random_state=63)
+
+    def score(self, y_true, y_pred) -> float:
+        if self.fasta_label_train > 2:
+            return f1_score(y_true, y_pred, average='weighted')
+        return balanced_accuracy_score(y_true, y_pred)
+
+    def score_fold(self, classifier, fold) -> float:
+        train_index, test_index = self.folds[fold]
+        model = self.get_model(classifier)
+        if isinstance(model, lgb.LGBMClassifier):
+            y_pred = self._fit_predict_binned(model, train_index, test_index)
         else:
-            model = CatBoostClassifier(n_estimators=500,
-                                       thread_count=n_cpu, nan_mode='Max',
-                                       logging_level='Silent', random_state=63)
-    elif int(space['Classifier']) == 1:
-        model = RandomForestClassifier(n_estimators=500, n_jobs=n_cpu, random_state=63)
-    else:
-        model = lgb.LGBMClassifier(n_estimators=500, n_jobs=n_cpu, random_state=63)
-
-    if fasta_label_train > 2:
-        score = make_scorer(f1_score, average='weighted')
-    else:
-        score = make_scorer(balanced_accuracy_score)
-
-    print("continuous")
-    if continuous:
-        print("KFold")
-        kfold = KFold(n_splits=10, shuffle=True)
-    else:
-        print("StratifiedKFold")
-        kfold = StratifiedKFold(n_splits=10, shuffle=True)
-
-    metric = cross_val_score(model,
-                             x,
-                             labels_y,
-                             cv=kfold,
-                             scoring=score,
-                             n_jobs=n_cpu).mean()
-
-    return {'loss': -metric, 'status': STATUS_OK}
+            model.fit(self.x[train_index], self.y[train_index])
+            y_pred = np.ravel(model.predict(self.x[test_index]))
+        return self.score(self.y[test_index], y_pred)
+
+    def _lightgbm_params(self, model) -> dict:
+        # Core API parameters of the sklearn estimator, the remaining sklearn names are aliases LightGBM understands
+        params = {key: value for key, value in model.get_params().items()
+                  if value is not None and key not in ('class_weight', 'importance_type', 'objective', 'n_estimators')}
+        params['objective'] = 'multiclass' if len(self.classes) > 2 else 'binary'
+        if len(self.classes) > 2:
+            params['num_class'] = len(self.classes)
+        params.setdefault('verbose', -1)
+        return params
+
+    def _fit_predict_binned(self, model, train_index, test_index) -> np.ndarray:
+        params = self._lightgbm_params(model)
+        if self._binned is None:
+            # Bin all training rows once, the folds reuse its bin boundaries
+            self._binned = lgb.Dataset(self.x, self.y, params=params, free_raw_data=False).construct()
+        booster = lgb.train(params, self._binned.subset(train_index, params=params),
+                            num_boost_round=model.get_params()['n_estimators'])
+        proba = booster.predict(self.x[test_index])
+        if proba.ndim == 1:
+            return (proba > 0.5).astype(int)
+        return np.argmax(proba, axis=1)
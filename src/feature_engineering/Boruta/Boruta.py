@@ -3,15 +3,21 @@ from src.datasets.Datasets import preprocess_data
 from src.feature_engineering.Boruta.method import BorutaPy
 
 import pandas as pd
+from lightgbm import LGBMClassifier
 from sklearn.ensemble import RandomForestClassifier
 
 
-def get_boruta_features(train_x, train_y, test_x) -> tuple[
+def get_boruta_features(train_x, train_y, test_x, hist_gbm=False, n_jobs=1) -> tuple[
     pd.DataFrame,
     pd.DataFrame
 ]:
-    rf = RandomForestClassifier(n_jobs=-1, class_weight='balanced', max_depth=5)
-    feat_selector = BorutaPy(rf, n_estimators="auto", verbose=2)
+    if hist_gbm:
+        # Histogram GBM on the real + shadow layout binned once, instead of ~1000 forest trees per round
+        gbm = LGBMClassifier(n_jobs=-1, class_weight='balanced', max_depth=5, verbose=-1)
+        feat_selector = BorutaPy(gbm, n_estimators=100, verbose=2, binned=True, n_jobs=n_jobs)
+    else:
+        rf = RandomForestClassifier(n_jobs=-1, class_weight='balanced', max_depth=5)
+        feat_selector = BorutaPy(rf, n_estimators="auto", verbose=2, n_jobs=n_jobs)
 
     train_x, test_x = preprocess_data(train_x, test_x)
 
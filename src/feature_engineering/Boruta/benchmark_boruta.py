@@ -0,0 +1,73 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from src.datasets.Datasets import get_dataset, preprocess_data
+from src.feature_engineering.Boruta.method import BorutaPy
+
+
+def prepare(option) -> tuple[np.ndarray, np.ndarray, str]:
+    """The training matrix get_boruta_features passes to BorutaPy."""
+    train_x, train_y, test_x, _, _, name = get_dataset(option)
+    train_x, _ = preprocess_data(train_x, test_x)
+    for column in train_x.select_dtypes(include=['object', 'category']).columns:
+        train_x[column], _ = pd.factorize(train_x[column])
+    train_y = pd.Series(pd.factorize(pd.Series(np.asarray(train_y).ravel()))[0])
+    return train_x.values, train_y.values, name
+
+
+def decisions(boruta) -> np.ndarray:
+    """1 confirmed, 2 tentative (kept by the rough fix), 3 rejected"""
+    return np.where(boruta.support_, 1, np.where(boruta.support_weak_, 2, 3))
+
+
+def run(X, y, n_jobs, batch_size, seed, max_iter) -> dict:
+    rf = RandomForestClassifier(n_jobs=1, class_weight='balanced', max_depth=5)
+    boruta = BorutaPy(rf, n_estimators="auto", random_state=seed, max_iter=max_iter, n_jobs=n_jobs,
+                      batch_size=batch_size)
+    start = time.perf_counter()
+    boruta.fit(X, y)
+    return {"seconds": time.perf_counter() - start, "rounds": len(boruta.importance_history_) - 1,
+            "decisions": decisions(boruta)}
+
+
+def main(args):
+    if args.datasets:
+        data = [prepare(option) for option in args.datasets]
+    else:
+        X, y = make_classification(n_samples=args.n_rows, n_features=args.n_features,
+                                   n_informative=args.n_informative, random_state=0)
+        data = [(X, y, "synthetic")]
+    results = []
+    for X, y, name in data:
+        reference = run(X, y, 1, None, args.seed, args.max_iter)
+        # Agreement of two serial runs with different seeds, the level parallel runs can be compared to
+        configurations = [("serial, other seed", 1, None, args.seed + 1)]
+        configurations += [(f"n_jobs={args.n_jobs}, batch={batch}", args.n_jobs, batch, args.seed)
+                           for batch in args.batch_sizes]
+        results.append({"dataset": name, "mode": "serial", "seconds": reference["seconds"],
+                        "rounds": reference["rounds"], "agreement": 1.0})
+        for label, n_jobs, batch, seed in configurations:
+            result = run(X, y, n_jobs, batch, seed, args.max_iter)
+            results.append({"dataset": name, "mode": label, "seconds": result["seconds"], "rounds": result["rounds"],
+                            "agreement": np.mean(result["decisions"] == reference["decisions"])})
+            print(results[-1])
+    print(pd.DataFrame(results).to_string())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Wall time and decision agreement of parallel Boruta rounds')
+    parser.add_argument('--datasets', type=int, nargs='*', help='Dataset options (default: a synthetic dataset)')
+    parser.add_argument('--n_rows', type=int, default=1000, help='Rows of the synthetic dataset')
+    parser.add_argument('--n_features', type=int, default=50, help='Features of the synthetic dataset')
+    parser.add_argument('--n_informative', type=int, default=10, help='Informative features of the synthetic dataset')
+    parser.add_argument('--n_jobs', type=int, default=4, help='Processes of the parallel runs')
+    parser.add_argument('--batch_sizes', type=int, nargs='*', default=[4, 8], help='Rounds per batch')
+    parser.add_argument('--max_iter', type=int, default=100, help='Maximal Boruta iterations')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the reference run')
+    args = parser.parse_args()
+    main(args)
@@ -9,12 +9,39 @@ License: BSD 3 clause
 """
 
 from __future__ import print_function, division
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import scipy as sp
 from sklearn.utils import check_random_state, check_X_y
+from sklearn.utils.class_weight import compute_sample_weight
 from sklearn.base import TransformerMixin, BaseEstimator
+from sklearn.ensemble._forest import BaseForest
 import warnings
 
+# BorutaPy copy of a worker process, set once by the pool initializer, it
+# keeps its own real + shadow buffer over all rounds the worker computes
+_worker_boruta = None
+
+
+def _init_worker(boruta, X, y):
+    global _worker_boruta
+    _worker_boruta = boruta
+    _worker_boruta._X, _worker_boruta._y = X, y
+    # the rounds run in parallel, each one single threaded
+    if 'n_jobs' in boruta.estimator.get_params():
+        boruta.estimator.set_params(n_jobs=1)
+    _worker_boruta.random_state = check_random_state(0)
+    _worker_boruta._init_buffer(X, y)
+
+
+def _shadow_round(dec_reg, n_estimators, seed):
+    boruta = _worker_boruta
+    if n_estimators is not None:
+        boruta.estimator.set_params(n_estimators=n_estimators)
+    boruta.estimator.set_params(random_state=seed)
+    boruta.random_state = check_random_state(seed)
+    return boruta._add_shadows_get_imps(boruta._X, boruta._y, dec_reg)
+
 
 class BorutaPy(BaseEstimator, TransformerMixin):
     """
@@ -125,6 +152,25 @@ class BorutaPy(BaseEstimator, TransformerMixin):
         Ignored if `early_stopping` is False. The maximum amount of
         iterations without confirming a tentative feature. 
 
+    binned : bool, default = False
+        Histogram-GBM mode, only for LightGBM estimators. The real and
+        shadow features keep a fixed layout (rejected ones are set to NaN
+        and never split on), whose bin boundaries LightGBM computes once
+        on a reference Dataset. Every iteration reuses these boundaries
+        instead of searching them again, but still maps the whole real and
+        shadow matrix to its bins, and trains with the LightGBM core API.
+
+    n_jobs : int, default = 1
+        If larger than 1, the shadow rounds run on a pool of n_jobs
+        processes, batch_size rounds at once with independent seeds on the
+        features active at the start of the batch. Their hits are tested
+        round by round as usual, and the selection stops as soon as no
+        tentative feature can be accepted or rejected in the remaining
+        iterations.
+
+    batch_size : int, default = None
+        Rounds per batch if n_jobs > 1, by default n_jobs.
+
     Attributes
     ----------
 
@@ -192,7 +238,8 @@ class BorutaPy(BaseEstimator, TransformerMixin):
 
     def __init__(self, estimator, n_estimators=1000, perc=100, alpha=0.05,
                  two_step=True, max_iter=100, random_state=None, verbose=0,
-                 early_stopping=False, n_iter_no_change=20):
+                 early_stopping=False, n_iter_no_change=20, binned=False,
+                 n_jobs=1, batch_size=None):
         self.estimator = estimator
         self.n_estimators = n_estimators
         self.perc = perc
@@ -203,6 +250,9 @@ class BorutaPy(BaseEstimator, TransformerMixin):
         self.verbose = verbose
         self.early_stopping = early_stopping
         self.n_iter_no_change = n_iter_no_change
+        self.binned = binned
+        self.n_jobs = n_jobs
+        self.batch_size = batch_size
         self.__version__ = '0.3'
         self._is_lightgbm = 'lightgbm' in str(type(self.estimator))
 
@@ -320,66 +370,106 @@ class BorutaPy(BaseEstimator, TransformerMixin):
         # counts how many times a given feature was more important than
         # the best of the shadow features
         hit_reg = np.zeros(n_feat, dtype=np.int64)
-        # these record the history of the iterations
-        imp_history = np.zeros(n_feat, dtype=np.float64)
+        # these record the history of the iterations, preallocated for all
+        # iterations, the first row stays zeros
+        imp_history = np.zeros((max(self.max_iter, 1), n_feat), dtype=np.float64)
+        n_history = 1
         sha_max_history = []
 
         # set n_estimators
         if self.n_estimators != 'auto':
             self.estimator.set_params(n_estimators=self.n_estimators)
 
-        # main feature selection loop
-        while np.any(dec_reg == 0) and _iter < self.max_iter:
-            # find optimal number of trees and depth
-            if self.n_estimators == 'auto':
-                # number of features that aren't rejected
-                not_rejected = np.where(dec_reg >= 0)[0].shape[0]
-                n_tree = self._get_tree_num(not_rejected)
-                self.estimator.set_params(n_estimators=n_tree)
-
-            # make sure we start with a new tree in each iteration
-            if self._is_lightgbm:
-                self.estimator.set_params(random_state=self.random_state.randint(0, 10000))
-            else:
-                self.estimator.set_params(random_state=self.random_state)
-
-            # add shadow attributes, shuffle them and train estimator, get imps
-            cur_imp = self._add_shadows_get_imps(X, y, dec_reg)
-
-            # get the threshold of shadow importances we will use for rejection
-            imp_sha_max = np.percentile(cur_imp[1], self.perc)
-
-            # record importance history
-            sha_max_history.append(imp_sha_max)
-            imp_history = np.vstack((imp_history, cur_imp[0]))
-
-            # register which feature is more imp than the max of shadows
-            hit_reg = self._assign_hits(hit_reg, cur_imp, imp_sha_max)
-
-            # based on hit_reg we check if a feature is doing better than
-            # expected by chance
-            dec_reg = self._do_tests(dec_reg, hit_reg, _iter)
-
-            # print out confirmed features
-            if self.verbose > 0 and _iter < self.max_iter:
-                self._print_results(dec_reg, _iter, 0)
-            if _iter < self.max_iter:
-                _iter += 1
-                
-            # early stopping
-            if early_stopping:
-                if _last_dec_reg is not None and (_last_dec_reg == dec_reg).all():
-                    _same_iters += 1
-                    if self.verbose > 0:
-                        print(
-                            f"Early stopping: {_same_iters} out "
-                            f"of {self.n_iter_no_change}"
-                        )
+        if self.n_jobs > 1:
+            # the workers get the data once and keep their own buffers
+            pool = ProcessPoolExecutor(self.n_jobs, initializer=_init_worker, initargs=(self, X, y))
+            batch_size = self.n_jobs if self.batch_size is None else self.batch_size
+        else:
+            # real + shadow matrix reused by all iterations
+            pool = None
+            self._init_buffer(X, y)
+
+        try:
+            # main feature selection loop
+            stop = False
+            while np.any(dec_reg == 0) and _iter < self.max_iter and not stop:
+                # find optimal number of trees and depth
+                n_tree = None
+                if self.n_estimators == 'auto':
+                    # number of features that aren't rejected
+                    not_rejected = np.where(dec_reg >= 0)[0].shape[0]
+                    n_tree = self._get_tree_num(not_rejected)
+                    self.estimator.set_params(n_estimators=n_tree)
+
+                if pool is None:
+                    # make sure we start with a new tree in each iteration
+                    if self._is_lightgbm:
+                        self.estimator.set_params(random_state=self.random_state.randint(0, 10000))
+                    else:
+                        self.estimator.set_params(random_state=self.random_state)
+
+                    # add shadow attributes, shuffle them and train estimator, get imps
+                    round_imps = [self._add_shadows_get_imps(X, y, dec_reg)]
                 else:
-                    _same_iters = 1
-                    _last_dec_reg = dec_reg.copy()
-                if _same_iters > self.n_iter_no_change:
-                    break
+                    # independent rounds on the features active now, in parallel
+                    n_rounds = min(batch_size, self.max_iter - _iter)
+                    seeds = self.random_state.randint(0, 10000 if self._is_lightgbm else 2 ** 31 - 1, size=n_rounds)
+                    round_imps = pool.map(_shadow_round, [dec_reg.copy()] * n_rounds, [n_tree] * n_rounds, seeds)
+
+                for cur_imp in round_imps:
+                    if not np.any(dec_reg == 0):
+                        break
+                    # features rejected by an earlier round of the batch are
+                    # not active anymore
+                    cur_imp[0][dec_reg < 0] = np.nan
+
+                    # get the threshold of shadow importances we will use for rejection
+                    imp_sha_max = np.percentile(cur_imp[1], self.perc)
+
+                    # record importance history
+                    sha_max_history.append(imp_sha_max)
+                    imp_history[n_history] = cur_imp[0]
+                    n_history += 1
+
+                    # register which feature is more imp than the max of shadows
+                    hit_reg = self._assign_hits(hit_reg, cur_imp, imp_sha_max)
+
+                    # based on hit_reg we check if a feature is doing better than
+                    # expected by chance
+                    dec_reg = self._do_tests(dec_reg, hit_reg, _iter)
+                    if pool is not None and self._decisions_settled(dec_reg, hit_reg, _iter):
+                        if self.verbose > 0:
+                            print(f"No decision possible in the remaining iterations after {_iter}")
+                        stop = True
+
+                    # print out confirmed features
+                    if self.verbose > 0 and _iter < self.max_iter:
+                        self._print_results(dec_reg, _iter, 0)
+                    if _iter < self.max_iter:
+                        _iter += 1
+
+                    # early stopping
+                    if early_stopping:
+                        if _last_dec_reg is not None and (_last_dec_reg == dec_reg).all():
+                            _same_iters += 1
+                            if self.verbose > 0:
+                                print(
+                                    f"Early stopping: {_same_iters} out "
+                                    f"of {self.n_iter_no_change}"
+                                )
+                        else:
+                            _same_iters = 1
+                            _last_dec_reg = dec_reg.copy()
+                        if _same_iters > self.n_iter_no_change:
+                            stop = True
+                    if stop:
+                        break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        imp_history = imp_history[:n_history]
+        self._free_buffer()
 
         # we automatically apply R package's rough fix for tentative ones
         confirmed = np.where(dec_reg == 1)[0]
@@ -483,24 +573,64 @@ class BorutaPy(BaseEstimator, TransformerMixin):
                              'are currently supported in BorutaPy.')
         return imp
 
-    def _get_shuffle(self, seq):
-        self.random_state.shuffle(seq)
-        return seq
+    @staticmethod
+    def _n_shadow_copies(n_feat):
+        # make sure there's at least 5 columns in the shadow matrix
+        n_copies = 1
+        while n_feat * n_copies < 5:
+            n_copies *= 2
+        return n_copies
+
+    def _init_buffer(self, X, y):
+        """Allocate the real + shadow matrix once per fit. Forests train on
+        float32 anyway, a Fortran ordered float32 buffer is used as is by
+        their tree builders."""
+        n_sample, n_feat = X.shape
+        self._n_copies = self._n_shadow_copies(n_feat)
+        if isinstance(self.estimator, BaseForest):
+            dtype = np.float32
+        elif X.dtype.kind in 'biuf':
+            dtype = np.result_type(X.dtype, np.float32)
+        else:
+            dtype = np.float64
+        # widest matrix of all iterations, fewer than 8 features get up to 8
+        # shadows to reach at least 5
+        width = max(n_feat * (1 + self._n_copies), n_feat + max(n_feat, 8))
+        self._buffer = np.empty((n_sample, width), dtype=dtype, order='F')
+        self._binned_reference = None
+        if self.binned:
+            if not self._is_lightgbm:
+                raise ValueError('binned=True needs a LightGBM estimator.')
+            self._init_binned(X, y)
+
+    def _free_buffer(self):
+        self._buffer = None
+        self._binned_reference = None
+
+    def _shuffled_columns(self, x):
+        # independent permutation of every column: argsort of random keys
+        perm = np.argsort(self.random_state.random_sample(x.shape), axis=0)
+        return np.take_along_axis(x, perm, axis=0)
 
     def _add_shadows_get_imps(self, X, y, dec_reg):
         # find features that are tentative still
         x_cur_ind = np.where(dec_reg >= 0)[0]
-        x_cur = np.copy(X[:, x_cur_ind])
-        x_cur_w = x_cur.shape[1]
-        # deep copy the matrix for the shadow matrix
-        x_sha = np.copy(x_cur)
-        # make sure there's at least 5 columns in the shadow matrix for
-        while (x_sha.shape[1] < 5):
-            x_sha = np.hstack((x_sha, x_sha))
-        # shuffle xSha
-        x_sha = np.apply_along_axis(self._get_shuffle, 0, x_sha)
+        x_cur_w = x_cur_ind.shape[0]
+        if self._binned_reference is not None:
+            if x_cur_w * self._n_copies >= 5:
+                return self._add_shadows_get_imps_binned(X, dec_reg, x_cur_ind)
+            # too few shadows left in the fixed layout, the active set only
+            # shrinks, continue with the estimator on the overwritten buffer
+            self._binned_reference = None
+        n_copies = self._n_shadow_copies(x_cur_w)
+        # real features and their shuffled copies, written into the buffer
+        x_all = self._buffer[:, :x_cur_w * (1 + n_copies)]
+        x_cur = x_all[:, :x_cur_w]
+        x_cur[:] = X[:, x_cur_ind]
+        for i in range(1, n_copies + 1):
+            x_all[:, i * x_cur_w:(i + 1) * x_cur_w] = self._shuffled_columns(x_cur)
         # get importance of the merged matrix
-        imp = self._get_imp(np.hstack((x_cur, x_sha)), y)
+        imp = self._get_imp(x_all, y)
         # separate importances of real and shadow features
         imp_sha = imp[x_cur_w:]
         imp_real = np.zeros(X.shape[1])
@@ -508,6 +638,72 @@ class BorutaPy(BaseEstimator, TransformerMixin):
         imp_real[x_cur_ind] = imp[:x_cur_w]
         return imp_real, imp_sha
 
+    def _get_lightgbm_params(self):
+        """Core API parameters of the LightGBM sklearn estimator, the
+        remaining sklearn names are aliases LightGBM understands"""
+        params = {key: value for key, value in self.estimator.get_params().items()
+                  if value is not None and key not in ('class_weight', 'importance_type', 'objective',
+                                                       'n_estimators')}
+        params['objective'] = self._binned_objective
+        if self._binned_num_class > 2:
+            params['num_class'] = self._binned_num_class
+        params.setdefault('verbose', -1)
+        return params
+
+    def _init_binned(self, X, y):
+        """Labels, weights and the binned reference dataset of the fixed
+        layout: all features followed by _n_copies copies as shadows. Shadows
+        are permutations of their feature, so they share its bins."""
+        import lightgbm as lgb
+
+        n_feat = X.shape[1]
+        self._binned_objective = self.estimator.get_params()['objective']
+        self._binned_num_class = 0
+        if isinstance(self.estimator, lgb.LGBMClassifier):
+            classes = np.unique(y)
+            self._binned_label = np.searchsorted(classes, y)
+            self._binned_num_class = len(classes)
+            if self._binned_objective is None:
+                self._binned_objective = 'multiclass' if len(classes) > 2 else 'binary'
+        else:
+            self._binned_label = y
+            if self._binned_objective is None:
+                self._binned_objective = 'regression'
+        class_weight = self.estimator.get_params().get('class_weight')
+        self._binned_weight = None if class_weight is None else compute_sample_weight(class_weight, y)
+
+        for i in range(1 + self._n_copies):
+            self._buffer[:, i * n_feat:(i + 1) * n_feat] = X
+        self._binned_reference = lgb.Dataset(
+            self._buffer[:, :n_feat * (1 + self._n_copies)], self._binned_label, weight=self._binned_weight,
+            params=self._get_lightgbm_params()).construct()
+
+    def _add_shadows_get_imps_binned(self, X, dec_reg, x_cur_ind):
+        import lightgbm as lgb
+
+        n_feat = X.shape[1]
+        x_rej_ind = np.where(dec_reg < 0)[0]
+        x_cur = X[:, x_cur_ind]
+        # rejected features and their shadows are constant, no split uses them
+        self._buffer[:, x_rej_ind] = np.nan
+        shadow_ind = []
+        for i in range(1, self._n_copies + 1):
+            self._buffer[:, i * n_feat + x_rej_ind] = np.nan
+            self._buffer[:, i * n_feat + x_cur_ind] = self._shuffled_columns(x_cur)
+            shadow_ind.append(i * n_feat + x_cur_ind)
+
+        params = self._get_lightgbm_params()
+        train_set = lgb.Dataset(self._buffer[:, :n_feat * (1 + self._n_copies)], self._binned_label, weight=self._binned_weight,
+                                reference=self._binned_reference, params=params)
+        booster = lgb.train(params, train_set, num_boost_round=self.estimator.get_params()['n_estimators'])
+        imp = booster.feature_importance(importance_type=self.estimator.get_params()['importance_type'])
+        # separate importances of real and shadow features
+        imp_sha = imp[np.concatenate(shadow_ind)]
+        imp_real = np.zeros(n_feat)
+        imp_real[:] = np.nan
+        imp_real[x_cur_ind] = imp[x_cur_ind]
+        return imp_real, imp_sha
+
     def _assign_hits(self, hit_reg, cur_imp, imp_sha_max):
         # register hits for features that did better than the best of shadows
         cur_imp_no_nan = cur_imp[0]
@@ -552,6 +748,29 @@ class BorutaPy(BaseEstimator, TransformerMixin):
         dec_reg[active_features[to_reject]] = -1
         return dec_reg
 
+    def _decisions_settled(self, dec_reg, hit_reg, _iter):
+        """
+        True if no tentative feature can be accepted or rejected in any test
+        up to max_iter, even if it is a hit in all (or none) of the remaining
+        rounds. Only the Bonferroni bound is checked, the FDR step of the
+        two step correction can only make a decision harder.
+        """
+        tentative = np.where(dec_reg == 0)[0]
+        iters = np.arange(_iter + 1, self.max_iter)
+        if tentative.shape[0] == 0 or iters.shape[0] == 0:
+            return True
+        if self.two_step:
+            threshold = self.alpha / iters
+        else:
+            threshold = np.full(iters.shape[0], self.alpha / float(len(dec_reg)))
+        hits = hit_reg[tentative][:, None]
+        # best case for acceptance: a hit in every remaining round
+        max_hits = hits + (iters - _iter)[None, :]
+        can_accept = sp.stats.binom.sf(max_hits - 1, iters, .5) <= threshold
+        # best case for rejection: no further hit
+        can_reject = sp.stats.binom.cdf(hits, iters, .5) <= threshold
+        return not (can_accept.any() or can_reject.any())
+
     def _fdrcorrection(self, pvals, alpha=0.05):
         """
         Benjamini/Hochberg p-value correction for false discovery rate, from
@@ -0,0 +1,46 @@
+# Configurations of the feature engineering methods of the AMLTK and the feature engineering (-> AutoGluon) pipelines.
+# Each pipeline keeps the configurations of its benchmark. The configuration is part of the key in the feature artifact
+# store, so the pipelines only share the features of a method where its configuration is the same in both.
+#
+# Every method has a list of alternative configurations that are tried in order while the method fails, its features
+# are stored under the configuration that produced them.
+#
+# Shareable are the features of the first outer split: the feature engineering pipeline computes them for its split 0,
+# the AMLTK pipeline (which repeats the optimization on split 0) for all repetitions of deterministic methods and for
+# the first repetition of the others. Later repetitions of stochastic methods are stored per repetition and only reused
+# by the AMLTK pipeline itself.
+#
+# Shared with these configurations: autofeat (2 engineering steps), autogluon, bioautoml (when the feature engineering
+# pipeline falls back to a continuous target), boruta, correlationBasedFS, featurewiz, h2o, macfe and openfe.
+# Not shared: mafese and mljar (500 vs 50 features), autofeat with the AMLTK fallback of 1 step and bioautoml with a
+# discrete target. featuretools only runs in the feature engineering pipeline.
+AMLTK_CONFIGS = {
+    # One feature engineering step less if autofeat fails (e.g. runs out of memory)
+    "autofeat": [{"feat_eng_steps": 2, "feat_sel_steps": 5}, {"feat_eng_steps": 1, "feat_sel_steps": 5}],
+    "autogluon": [{}],
+    "bioautoml": [{"estimations": 50, "continuous": True}],
+    "boruta": [{}],
+    "correlationBasedFS": [{}],
+    "featurewiz": [{}],
+    "h2o": [{}],
+    "macfe": [{}],
+    "mafese": [{"num_features": 500}],
+    "mljar": [{"num_features": 500}],
+    "openfe": [{"n_jobs": 1}],
+}
+
+FE_CONFIGS = {
+    "autofeat": [{"feat_eng_steps": 2, "feat_sel_steps": 5}],
+    "autogluon": [{}],
+    # With a continuous target if the stratified folds fail
+    "bioautoml": [{"estimations": 50, "continuous": False}, {"estimations": 50, "continuous": True}],
+    "boruta": [{}],
+    "correlationBasedFS": [{}],
+    "featuretools": [{}],
+    "featurewiz": [{}],
+    "h2o": [{}],
+    "macfe": [{}],
+    "mafese": [{"num_features": 50}],
+    "mljar": [{"num_features": 50}],
+    "openfe": [{"n_jobs": 1}],
+}
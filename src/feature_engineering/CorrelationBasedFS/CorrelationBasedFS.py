@@ -3,11 +3,16 @@
 import pandas as pd
 from scipy.io import arff
 
+from src.datasets.Artifacts import ARTIFACT_DIR
 from src.datasets.Datasets import preprocess_data
 from src.feature_engineering.CorrelationBasedFS.MUFS import MUFS
 
 
-def get_correlationbased_features(train_x, train_y, test_x) -> tuple[
+# Label and pair SUs per training matrix, a new selection on the same data (e.g. another threshold) reuses them
+statistics_dir = ARTIFACT_DIR / "mufs_statistics"
+
+
+def get_correlationbased_features(train_x, train_y, test_x, n_jobs=1) -> tuple[
     pd.DataFrame,
     pd.DataFrame
 ]:
@@ -23,7 +28,7 @@ def get_correlationbased_features(train_x, train_y, test_x) -> tuple[
     float_array_of_targets = train_y.to_numpy().astype("float64")
     float_array_of_targets = float_array_of_targets[:, 0]
 
-    mufs = MUFS(discrete=False)
+    mufs = MUFS(discrete=False, n_jobs=n_jobs, statistics_dir=statistics_dir)
     cfs_f = mufs.cfs(float_array_of_features, float_array_of_targets).get_results()
     fcbf_f = mufs.fcbf(float_array_of_features, float_array_of_targets, 1e-3).get_results()
     print(cfs_f)
@@ -1,10 +1,112 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
 from itertools import combinations
 from math import sqrt
-from src.feature_engineering.CorrelationBasedFS.Metrics import Metrics
+from pathlib import Path
+from src.datasets.Artifacts import code_version
+from src.feature_engineering.CorrelationBasedFS.Metrics import SymmetricalUncertaintyEngine
 from sys import float_info
 
 import numpy as np
 
+# Engine of a worker process, set once by the pool initializer, its per-column
+# statistics are reused by all batches the worker computes
+_worker_engine = None
+
+
+def _init_worker(X, y, discrete, entropies):
+    global _worker_engine
+    _worker_engine = SymmetricalUncertaintyEngine(X, y, discrete, entropies=entropies)
+
+
+def _su_labels(features):
+    return _worker_engine.su_labels(features)
+
+
+def _su_pairs(pairs):
+    return _worker_engine.su_pairs(pairs)
+
+
+class SUStatistics:
+    """Symmetrical uncertainties of one dataset, shared by cfs, fcbf and iwss
+    and by later selections on the same data (e.g. with another threshold)
+
+    Parameters
+    ----------
+    fingerprint : str
+        hash of the data, see SUStatistics.compute_fingerprint
+    num_features : int
+        number of features of the data
+    """
+
+    def __init__(self, fingerprint, num_features):
+        self.fingerprint = fingerprint
+        # SU of every feature and the labels, None until computed
+        self.su_labels = None
+        # Dense pair SU matrix, filled lazily. The continuous estimator
+        # normalizes with the entropy of the first feature, so the matrix is
+        # oriented: su_features[a, b] is SU(a, b) as used by the searches.
+        self.su_features = np.zeros((num_features, num_features), dtype=np.float32)
+        self.su_computed = np.zeros((num_features, num_features), dtype=bool)
+        # Differential and discrete marginal entropies, NaN until computed
+        self.entropies = np.full((2, num_features), np.nan)
+        # Computed something that is not saved yet
+        self.modified = False
+
+    @staticmethod
+    def compute_fingerprint(X, y, discrete) -> str:
+        """Hash of the data and of everything the SU values depend on,
+        including the code of this package (the code version of its feature artifacts)"""
+        sha = hashlib.sha256()
+        sha.update(f"{code_version(MUFS)}_{discrete}_{X.shape}_{X.dtype}_{y.dtype}".encode())
+        sha.update(np.ascontiguousarray(X).tobytes())
+        sha.update(np.ascontiguousarray(y).tobytes())
+        return sha.hexdigest()[:16]
+
+    def save(self, path):
+        """Write the statistics to path (compressed .npz), readers never see partial files
+
+        Only the computed pairs are stored, as flat indices into the pair matrix and their SU
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+        num_features = self.su_features.shape[0]
+        pairs = np.flatnonzero(self.su_computed)
+        np.savez_compressed(
+            tmp_path,
+            fingerprint=self.fingerprint,
+            num_features=num_features,
+            su_labels=np.array([]) if self.su_labels is None else self.su_labels,
+            has_su_labels=self.su_labels is not None,
+            pairs=pairs.astype(np.uint32 if num_features ** 2 <= 2 ** 32 else np.uint64),
+            su_pairs=self.su_features.ravel()[pairs],
+            entropies=self.entropies,
+        )
+        os.replace(tmp_path, path)
+        self.modified = False
+
+    @staticmethod
+    def load(path):
+        """Read statistics written by SUStatistics.save
+
+        Returns
+        -------
+        SUStatistics
+            the statistics stored in path
+        """
+        with np.load(path) as stored:
+            statistics = SUStatistics(str(stored["fingerprint"]), int(stored["num_features"]))
+            if stored["has_su_labels"]:
+                statistics.su_labels = stored["su_labels"]
+            pairs = stored["pairs"]
+            statistics.su_features.ravel()[pairs] = stored["su_pairs"]
+            statistics.su_computed.ravel()[pairs] = True
+            statistics.entropies = stored["entropies"]
+        return statistics
+
+
 class MUFS:
     """Compute Fast Fast Correlation Based Filter
     Yu, L. and Liu, H.; Feature Selection for High-Dimensional Data: A Fast
@@ -23,21 +125,20 @@ class MUFS:
     discrete: boolean
         If the features are continuous or discrete. It always supose discrete
         labels.
+    n_jobs: int
+        The number of processes computing missing feature pairs
+    statistics_dir: str or Path
+        If set, the statistics of every dataset are stored in and reused from
+        <statistics_dir>/<fingerprint>.npz
     """
 
-    def __init__(self, max_features=None, discrete=True):
+    def __init__(self, max_features=None, discrete=True, n_jobs=1, statistics_dir=None):
         self.max_features = max_features
         self._discrete = discrete
-        self.symmetrical_uncertainty = (
-            Metrics.symmetrical_uncertainty
-            if discrete
-            else Metrics.symmetrical_unc_continuous
-        )
-        self.symmetrical_uncertainty_features = (
-            Metrics.symmetrical_uncertainty
-            if discrete
-            else Metrics.symmetrical_unc_continuous_features
-        )
+        self.n_jobs = n_jobs
+        self.statistics_dir = statistics_dir
+        self._statistics = None
+        self._pool = None
         self._fitted = False
 
     @staticmethod
@@ -57,6 +158,7 @@ class MUFS:
         y : np.array
             vector of labels
         """
+        self._shutdown_pool()
         self.X_ = X
         self.y_ = y
         if self.max_features is None:
@@ -65,10 +167,39 @@ class MUFS:
             self._max_features = self.max_features
         self._result = None
         self._scores = []
-        self._su_labels = None
-        self._su_features = {}
+        # Keep the statistics of the previous call if the data is the same
+        fingerprint = SUStatistics.compute_fingerprint(X, y, self._discrete)
+        if self._statistics is None or self._statistics.fingerprint != fingerprint:
+            self._statistics = self._load_statistics(fingerprint, X.shape[1])
+        self._engine = SymmetricalUncertaintyEngine(
+            X, y, self._discrete, entropies=self._statistics.entropies
+        )
         self._fitted = True
 
+    def _statistics_path(self, fingerprint):
+        return Path(self.statistics_dir) / f"{fingerprint}.npz"
+
+    def _load_statistics(self, fingerprint, num_features):
+        if self.statistics_dir is not None and self._statistics_path(fingerprint).is_file():
+            return SUStatistics.load(self._statistics_path(fingerprint))
+        return SUStatistics(fingerprint, num_features)
+
+    def _finish(self):
+        """Release the workers and store new statistics at the end of a search"""
+        self._shutdown_pool()
+        if self.statistics_dir is not None and self._statistics.modified:
+            self._statistics.save(self._statistics_path(self._statistics.fingerprint))
+
+    def get_statistics(self):
+        """Return the statistics of the data of the last call if any
+
+        Returns
+        -------
+        SUStatistics
+            the label SUs, marginal entropies and pair SUs computed so far
+        """
+        return self._statistics if self._fitted else None
+
     def _compute_su_labels(self):
         """Compute symmetrical uncertainty between each feature of the dataset
         and the labels and store it to use in future calls
@@ -78,14 +209,14 @@ class MUFS:
         list
             vector with sym. un. of every feature and the labels
         """
-        if self._su_labels is None:
+        if self._statistics.su_labels is None:
             num_features = self.X_.shape[1]
-            self._su_labels = np.zeros(num_features)
-            for col in range(num_features):
-                self._su_labels[col] = self.symmetrical_uncertainty(
-                    self.X_[:, col], self.y_
-                )
-        return self._su_labels
+            self._statistics.su_labels = np.array(
+                self._map(_su_labels, self._engine.su_labels, list(range(num_features))),
+                dtype=np.float64,
+            )
+            self._statistics.modified = True
+        return self._statistics.su_labels
 
     def _compute_su_features(self, feature_a, feature_b):
         """Compute symmetrical uncertainty between two features and stores it
@@ -103,13 +234,56 @@ class MUFS:
         float
             The symmetrical uncertainty of the two features
         """
-        if (feature_a, feature_b) not in self._su_features:
-            self._su_features[
-                (feature_a, feature_b)
-            ] = self.symmetrical_uncertainty_features(
-                self.X_[:, feature_a], self.X_[:, feature_b]
-            )
-        return self._su_features[(feature_a, feature_b)]
+        return self._compute_su_pairs([feature_a], [feature_b])[0]
+
+    def _compute_su_pairs(self, features_a, features_b):
+        """Compute the symmetrical uncertainty of many pairs of features at
+        once, only the pairs not computed before, in parallel if n_jobs > 1
+
+        Parameters
+        ----------
+        features_a : list
+            indices of the first features of the pairs
+        features_b : list
+            indices of the second features of the pairs
+
+        Returns
+        -------
+        np.array
+            The symmetrical uncertainty of every pair
+        """
+        features_a = np.asarray(features_a, dtype=int)
+        features_b = np.asarray(features_b, dtype=int)
+        statistics = self._statistics
+        missing = ~statistics.su_computed[features_a, features_b]
+        if missing.any():
+            pairs = list(dict.fromkeys(zip(features_a[missing].tolist(), features_b[missing].tolist())))
+            values = self._map(_su_pairs, self._engine.su_pairs, pairs)
+            rows, cols = zip(*pairs)
+            statistics.su_features[rows, cols] = values
+            statistics.su_computed[rows, cols] = True
+            statistics.modified = True
+        return statistics.su_features[features_a, features_b].astype(np.float64)
+
+    def _map(self, worker_function, function, items):
+        """Compute a batch in this process or in chunks on the process pool"""
+        if self.n_jobs > 1 and len(items) >= 2 * self.n_jobs:
+            if self._pool is None:
+                # One pool per search, the workers receive the data only once
+                self._pool = ProcessPoolExecutor(
+                    self.n_jobs,
+                    initializer=_init_worker,
+                    initargs=(self.X_, self.y_, self._discrete, self._statistics.entropies),
+                )
+            length = int(np.ceil(len(items) / self.n_jobs / 4))
+            chunks = [items[i:i + length] for i in range(0, len(items), length)]
+            return [value for chunk in self._pool.map(worker_function, chunks) for value in chunk]
+        return function(items)
+
+    def _shutdown_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def _compute_merit(self, features):
         """Compute the merit function for cfs algorithms
@@ -127,13 +301,12 @@ class MUFS:
             The merit of the feature set passed
         """
         # lgtm has already recognized that this is a false positive
-        rcf = self._su_labels[
+        rcf = self._statistics.su_labels[
             features  # lgtm [py/hash-unhashable-value]
         ].sum()
-        rff = 0.0
+        pairs = list(combinations(features, 2))
+        rff = self._compute_su_pairs([a for a, _ in pairs], [b for _, b in pairs]).sum()
         k = len(features)
-        for pair in list(combinations(features, 2)):
-            rff += self._compute_su_features(*pair)
         return rcf / sqrt(k + (k**2 - k) * rff)
 
     def cfs(self, X, y):
@@ -162,27 +335,38 @@ class MUFS:
         first_candidate = feature_order.pop(0)
         candidates.append(first_candidate)
         self._scores.append(s_list[first_candidate])
+        # Running sums of the merit of the candidates, the merit of adding
+        # feature_order[i] only needs rff_new[i], the sum of its pair SUs with
+        # the candidates, which grows by one column per selected feature
+        rcf = s_list[first_candidate]
+        rff = 0.0
+        rff_new = np.zeros(len(feature_order))
         while continue_condition:
-            merit = -float_info.min
-            id_selected = None
-            for idx, feature in enumerate(feature_order):
-                candidates.append(feature)
-                merit_new = self._compute_merit(candidates)
-                if merit_new > merit:
-                    id_selected = idx
-                    merit = merit_new
-                candidates.pop()
-            if id_selected is None:
+            rff_new += self._compute_su_pairs(
+                [candidates[-1]] * len(feature_order), feature_order
+            )
+            k = len(candidates) + 1
+            merits = (rcf + s_list[feature_order]) / np.sqrt(
+                k + (k**2 - k) * (rff + rff_new)
+            )
+            valid = merits > -float_info.min
+            if not valid.any():
                 # No more features to add all merits are nan because of
                 # constant features
                 break
+            # First feature with the best merit, as the sequential search
+            id_selected = int(np.where(valid, merits, -np.inf).argmax())
             candidates.append(feature_order[id_selected])
-            self._scores.append(merit)
+            self._scores.append(merits[id_selected])
+            rcf += s_list[feature_order[id_selected]]
+            rff += rff_new[id_selected]
             del feature_order[id_selected]
+            rff_new = np.delete(rff_new, id_selected)
             continue_condition = self._cfs_continue_condition(
                 feature_order, candidates
             )
         self._result = candidates
+        self._finish()
         return self
 
     def _cfs_continue_condition(self, feature_order, candidates):
@@ -234,7 +418,9 @@ class MUFS:
         if threshold < 1e-7:
             raise ValueError("Threshold cannot be less than 1e-7")
         self._initialize(X, y)
-        s_list = self._compute_su_labels()
+        # Copy, removed features are marked in s_list and the label SUs are
+        # shared with the other searches
+        s_list = self._compute_su_labels().copy()
         feature_order = (-s_list).argsort()
         feature_dup = feature_order.copy().tolist()
         self._result = []
@@ -247,16 +433,18 @@ class MUFS:
                 continue
             if s_list[index_p] < threshold:
                 break
-            # Remove redundant features
-            for index_q in feature_dup:
-                su_pq = self._compute_su_features(index_p, index_q)
-                if su_pq >= s_list[index_q]:
-                    # remove feature from list
-                    s_list[index_q] = 0.0
+            # Remove redundant features. Features already removed or below
+            # the threshold are never selected, their pairs are not needed
+            index_q = np.asarray(feature_dup, dtype=int)
+            index_q = index_q[(s_list[index_q] != 0.0) & (s_list[index_q] >= threshold)]
+            su_pq = self._compute_su_pairs([index_p] * len(index_q), index_q)
+            # remove features from list
+            s_list[index_q[su_pq >= s_list[index_q]]] = 0.0
             self._result.append(index_p)
             self._scores.append(s_list[index_p])
             if len(self._result) == self._max_features:
                 break
+        self._finish()
         return self
 
     def get_results(self):
@@ -318,13 +506,24 @@ class MUFS:
         candidates.append(features.pop(0))
         merit = self._compute_merit(candidates)
         self._scores.append(merit)
+        # Running sums of the merit of the candidates
+        rcf = s_list[candidates].sum()
+        rff = self._compute_su_features(*candidates)
         for feature in features:
+            rff_new = rff + self._compute_su_pairs(
+                candidates, [feature] * len(candidates)
+            ).sum()
             candidates.append(feature)
-            merit_new = self._compute_merit(candidates)
+            k = len(candidates)
+            merit_new = (rcf + s_list[feature]) / sqrt(
+                k + (k**2 - k) * rff_new
+            )
             delta = abs(merit - merit_new) / merit if merit != 0.0 else 0.0
             if merit_new > merit or delta < threshold:
                 if merit_new > merit:
                     merit = merit_new
+                rcf += s_list[feature]
+                rff = rff_new
                 self._scores.append(merit_new)
             else:
                 candidates.pop()
@@ -332,4 +531,5 @@ class MUFS:
             if len(candidates) == self._max_features:
                 break
         self._result = candidates
-        return self
\ No newline at end of file
+        self._finish()
+        return self
@@ -1,6 +1,7 @@
 from math import log
 import numpy as np
 
+from scipy.spatial import cKDTree
 from scipy.special import digamma, gamma, psi
 from sklearn.neighbors import BallTree, KDTree
 from sklearn.neighbors import NearestNeighbors
@@ -397,3 +398,202 @@ class Metrics:
         return Metrics.entropy(y, base) - Metrics.conditional_entropy(
             x, y, base
         )
+
+
+class SymmetricalUncertaintyEngine:
+    """Symmetrical uncertainty of the columns of X, with each other and with
+    the labels y, for many pairs at once. For continuous features it computes
+    the estimators of Metrics.symmetrical_unc_continuous(_features) from
+    per-column statistics that are built once and cached:
+
+    - the sorted column, every 1-D neighbour count of the Kraskov and Ross
+      estimators becomes two searchsorted calls instead of a KDTree/BallTree
+    - the differential entropy with k = n - 1, in 1-D the distance to the
+      farthest point, O(n) instead of a full kNN with k = n - 1
+    - the discrete entropy of the column
+
+    Only the 2-D chebyshev kNN of a feature pair is computed per pair.
+
+    Parameters
+    ----------
+    X : np.array
+        array of features
+    y : np.array
+        vector of labels
+    discrete : boolean
+        If the features are discrete, Metrics.symmetrical_uncertainty is used
+    n_neighbors : int
+        Number of nearest neighbors of the mutual information estimators
+    entropies : np.array, optional
+        (2, n_features) array of differential and discrete entropies of the
+        columns, NaN if not computed yet. Filled in place, so it can be shared
+        with (and persisted by) the caller.
+    """
+
+    def __init__(self, X, y, discrete=False, n_neighbors=3, entropies=None):
+        self.X = X
+        self.y = y
+        self.discrete = discrete
+        self.n_neighbors = n_neighbors
+        self.entropies = (
+            np.full((2, X.shape[1]), np.nan) if entropies is None else entropies
+        )
+        self._sorted = {}
+        self._label_entropy = None
+
+    def _sorted_column(self, a):
+        if a not in self._sorted:
+            self._sorted[a] = np.sort(self.X[:, a])
+        return self._sorted[a]
+
+    def differential_entropy(self, a):
+        """Metrics.differential_entropy(x, k=len(x) - 1) of column a"""
+        if np.isnan(self.entropies[0, a]):
+            x = self.X[:, a]
+            s = self._sorted_column(a)
+            # The (n-1)-th neighbour of a point (itself included) is the
+            # farthest point, one of the two extremes
+            r = np.maximum(x - s[0], s[-1] - x)
+            n = len(x)
+            volume_unit_ball = (np.pi ** 0.5) / gamma(0.5 + 1)
+            self.entropies[0, a] = (
+                np.mean(np.log(r + np.finfo(x.dtype).eps))
+                + np.log(volume_unit_ball)
+                + psi(n)
+                - psi(n - 1)
+            )
+        return self.entropies[0, a]
+
+    def entropy(self, a):
+        if np.isnan(self.entropies[1, a]):
+            self.entropies[1, a] = Metrics.entropy(self.X[:, a])
+        return self.entropies[1, a]
+
+    def label_entropy(self):
+        if self._label_entropy is None:
+            self._label_entropy = Metrics.entropy(self.y)
+        return self._label_entropy
+
+    @staticmethod
+    def _count_within(s, x, radius):
+        """Number of values of the sorted array s within radius of each x,
+        i.e. |s_j - x| <= radius as the KDTree evaluates it. The bounds
+        x +- radius are rounded, so the boundary values are checked with the
+        exact distances (the radius is just below a neighbour distance and
+        x + radius often rounds onto that neighbour). A boundary moves over
+        a whole run of tied values at once."""
+        n = len(s)
+        hi = np.searchsorted(s, x + radius, side="right")
+        lo = np.searchsorted(s, x - radius, side="left")
+        while True:
+            below_hi = s[np.maximum(hi - 1, 0)]
+            at_hi = s[np.minimum(hi, n - 1)]
+            at_lo = s[np.minimum(lo, n - 1)]
+            below_lo = s[np.maximum(lo - 1, 0)]
+            shrink_hi = (hi > 0) & (below_hi - x > radius)
+            grow_hi = (hi < n) & (at_hi - x <= radius)
+            grow_lo = (lo < n) & (x - at_lo > radius)
+            shrink_lo = (lo > 0) & (x - below_lo <= radius)
+            if not (shrink_hi.any() or grow_hi.any() or grow_lo.any() or shrink_lo.any()):
+                break
+            hi = np.where(shrink_hi, np.searchsorted(s, below_hi, side="left"), hi)
+            hi = np.where(grow_hi, np.searchsorted(s, at_hi, side="right"), hi)
+            lo = np.where(grow_lo, np.searchsorted(s, at_lo, side="right"), lo)
+            lo = np.where(shrink_lo, np.searchsorted(s, below_lo, side="left"), lo)
+        return (hi - lo).astype(float)
+
+    @staticmethod
+    def _kth_neighbor_distance(x, k):
+        """Distance of every point to its k-th nearest neighbour in 1-D (not
+        counting itself), the neighbours are among the k points on each side
+        in sorted order"""
+        order = np.argsort(x, kind="stable")
+        s = x[order]
+        n = len(s)
+        distances = np.full((n, 2 * k), np.inf)
+        for j in range(1, k + 1):
+            distances[j:, j - 1] = s[j:] - s[:-j]
+            distances[:-j, k + j - 1] = s[j:] - s[:-j]
+        kth = np.partition(distances, k - 1, axis=1)[:, k - 1]
+        result = np.empty(n)
+        result[order] = kth
+        return result
+
+    def mutual_information_cc(self, a, b):
+        """Metrics._compute_mi_cc of columns a and b"""
+        x = self.X[:, a]
+        y = self.X[:, b]
+        n_samples = len(x)
+        xy = np.column_stack((x, y))
+        # k + 1 neighbours, the point itself is its first neighbour
+        radius = cKDTree(xy).query(xy, k=self.n_neighbors + 1, p=np.inf)[0][:, -1]
+        radius = np.nextafter(radius, 0)
+        nx = self._count_within(self._sorted_column(a), x, radius) - 1.0
+        ny = self._count_within(self._sorted_column(b), y, radius) - 1.0
+        mi = (
+            digamma(n_samples)
+            + digamma(self.n_neighbors)
+            - np.mean(digamma(nx + 1))
+            - np.mean(digamma(ny + 1))
+        )
+        return max(0, mi)
+
+    def mutual_information_cd(self, a):
+        """Metrics._compute_mi_cd of column a and the labels"""
+        c = self.X[:, a]
+        d = self.y
+        n_samples = c.shape[0]
+        radius = np.empty(n_samples)
+        label_counts = np.empty(n_samples)
+        k_all = np.empty(n_samples)
+        for label in np.unique(d):
+            mask = d == label
+            count = np.sum(mask)
+            if count > 1:
+                k = min(self.n_neighbors, count - 1)
+                radius[mask] = np.nextafter(self._kth_neighbor_distance(c[mask], k), 0)
+                k_all[mask] = k
+            label_counts[mask] = count
+        # Ignore points with unique labels.
+        mask = label_counts > 1
+        n_samples = np.sum(mask)
+        if n_samples == 0:
+            return 0.0
+        c = c[mask]
+        s = self._sorted_column(a) if mask.all() else np.sort(c)
+        m_all = self._count_within(s, c, radius[mask]) - 1.0
+        mi = (
+            digamma(n_samples)
+            + np.mean(digamma(k_all[mask]))
+            - np.mean(digamma(label_counts[mask]))
+            - np.mean(digamma(m_all + 1))
+        )
+        return max(0.0, mi)
+
+    def su_label(self, a):
+        """Symmetrical uncertainty of column a and the labels"""
+        if self.discrete:
+            return Metrics.symmetrical_uncertainty(self.X[:, a], self.y)
+        return (
+            2.0
+            * self.mutual_information_cd(a)
+            / (self.differential_entropy(a) + self.label_entropy())
+        )
+
+    def su_pair(self, a, b):
+        """Symmetrical uncertainty of columns a and b, normalized with the
+        differential entropy of a and the entropy of b as
+        Metrics.symmetrical_unc_continuous_features"""
+        if self.discrete:
+            return Metrics.symmetrical_uncertainty(self.X[:, a], self.X[:, b])
+        return (
+            2.0
+            * self.mutual_information_cc(a, b)
+            / (self.differential_entropy(a) + self.entropy(b))
+        )
+
+    def su_labels(self, features):
+        return [self.su_label(a) for a in features]
+
+    def su_pairs(self, pairs):
+        return [self.su_pair(a, b) for a, b in pairs]
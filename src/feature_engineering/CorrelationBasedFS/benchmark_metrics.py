@@ -0,0 +1,57 @@
+import argparse
+import time
+
+import numpy as np
+
+from src.feature_engineering.CorrelationBasedFS.Metrics import Metrics, SymmetricalUncertaintyEngine
+
+
+def make_data(n_rows, n_features, seed=0) -> tuple[np.ndarray, np.ndarray]:
+    """Correlated continuous features plus rounded (tied) and discrete ones, and a binary label."""
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(n_rows, 10))
+    X = latent @ rng.normal(size=(10, n_features)) + 0.5 * rng.normal(size=(n_rows, n_features))
+    X[:, 1::4] = np.round(X[:, 1::4])
+    X[:, 2::4] = rng.integers(0, 5, size=(n_rows, len(range(2, n_features, 4))))
+    y = (latent[:, 0] + rng.normal(size=n_rows) > 0).astype(float)
+    return X, y
+
+
+def main(args):
+    X, y = make_data(args.n_rows, args.n_features)
+    rng = np.random.default_rng(1)
+    pairs = [tuple(rng.choice(args.n_features, 2, replace=False)) for _ in range(args.n_pairs)]
+    features = rng.choice(args.n_features, args.n_labels, replace=False)
+
+    start = time.perf_counter()
+    old_pairs = [Metrics.symmetrical_unc_continuous_features(X[:, a], X[:, b]) for a, b in pairs]
+    old_labels = [Metrics.symmetrical_unc_continuous(X[:, a], y) for a in features]
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine = SymmetricalUncertaintyEngine(X, y)
+    new_pairs = engine.su_pairs(pairs)
+    new_labels = engine.su_labels(features)
+    new_time = time.perf_counter() - start
+
+    max_diff = max(np.max(np.abs(np.subtract(old_pairs, new_pairs))),
+                   np.max(np.abs(np.subtract(old_labels, new_labels))))
+    n_all_pairs = args.n_features * (args.n_features - 1)
+    per_pair_old, per_pair_new = old_time / (args.n_pairs + args.n_labels), new_time / (args.n_pairs + args.n_labels)
+    print(f"{args.n_rows} rows: per pair {1000 * per_pair_old:.1f} ms -> {1000 * per_pair_new:.2f} ms "
+          f"({per_pair_old / per_pair_new:.0f}x), max abs difference {max_diff:.2e}")
+    print(f"All {n_all_pairs} ordered pairs of {args.n_features} features on one core: "
+          f"{per_pair_old * n_all_pairs / 3600:.1f} h -> {per_pair_new * n_all_pairs / 60:.1f} min")
+    if max_diff > args.tolerance:
+        raise AssertionError(f"Engine differs from the per-pair estimator by {max_diff}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the batched SU engine to the per-pair estimators of Metrics')
+    parser.add_argument('--n_rows', type=int, default=5000, help='Rows of the synthetic dataset')
+    parser.add_argument('--n_features', type=int, default=1000, help='Features of the synthetic dataset')
+    parser.add_argument('--n_pairs', type=int, default=20, help='Feature pairs compared')
+    parser.add_argument('--n_labels', type=int, default=5, help='Feature-label SUs compared')
+    parser.add_argument('--tolerance', type=float, default=1e-9, help='Maximal absolute difference')
+    args = parser.parse_args()
+    main(args)
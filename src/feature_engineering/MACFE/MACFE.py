@@ -1,13 +1,16 @@
 # https://github.com/fuyuanlyu/AutoFS-in-CTR/tree/main/LPFS
-import pickle
 import os
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
 from causalnex.structure import DAGClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 
-from src.feature_engineering.MACFE.method.transform import transform_unary, transform_binary, transform_scaler
+from src.feature_engineering.MACFE.method.metafeatures import get_metafeatures_dataset, get_histogram
+from src.feature_engineering.MACFE.method.transform import transform_unary, transform_binary, transform_scaler, \
+    get_TRM_index
 
 
 def get_macfe_features(train_x, train_y, test_x, test_y, name) -> tuple[
@@ -26,11 +29,13 @@ def get_macfe_features(train_x, train_y, test_x, test_y, name) -> tuple[
 
     print("Original Dim: ", df_train.shape[1] - 1)
     TRM_dataset, TRM_binary_dataset, TRM_scaler = get_TRMs()
+    # The s-selections are nested, their frames share histograms and constructed columns
+    cache = ConstructionCache()
 
     df_fe = pd.DataFrame()
     df_selected_list = feature_selection(df_original, s_list)
     for s, df_selected in zip(s_list, df_selected_list):
-        df_engineered_list = feature_construction(df_selected, d_list, TRM_dataset, TRM_binary_dataset)
+        df_engineered_list = feature_construction(df_selected, d_list, TRM_dataset, TRM_binary_dataset, cache)
         print("Evaluation...")
         for d, df_engineered in zip(d_list, df_engineered_list):
             df_fe = pd.concat([df_selected, df_engineered], axis=1)
@@ -41,22 +46,79 @@ def get_macfe_features(train_x, train_y, test_x, test_y, name) -> tuple[
     return train_x, test_x
 
 
-def feature_construction(df_original, d_list, TRM_dataset, TRM_binary_dataset):
+class ColumnBuffer:
+    """float32 feature matrix that grows in place by whole columns, the capacity doubles when it is full"""
+
+    def __init__(self, X):
+        n_rows, n_columns = X.shape
+        self._data = np.empty((n_rows, 2 * max(n_columns, 1)), dtype='float32', order='F')
+        self._data[:, :n_columns] = X
+        self.size = n_columns
+
+    def append(self, columns):
+        n_new = columns.shape[1]
+        if self.size + n_new > self._data.shape[1]:
+            data = np.empty((len(self._data), 2 * (self.size + n_new)), dtype='float32', order='F')
+            data[:, :self.size] = self._data[:, :self.size]
+            self._data = data
+        self._data[:, self.size:self.size + n_new] = columns
+        self.size += n_new
+
+    @property
+    def values(self):
+        return self._data[:, :self.size]
+
+
+class ConstructionCache:
+    """Histograms and transformed values by column name. The name of a constructed column determines its values,
+    so one cache serves the frames of all depths and of all nested s-selections of a dataset."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.values = {}
+
+    def histogram_matrix(self, X, column_names):
+        missing = [i for i, name in enumerate(column_names) if name not in self.histograms]
+        if missing:
+            for i, histogram in zip(missing, get_histogram({'X': X[:, missing]})):
+                self.histograms[column_names[i]] = histogram
+        return np.array([self.histograms[name] for name in column_names])
+
+
+def feature_construction(df_original, d_list, TRM_dataset, TRM_binary_dataset, cache=None):
+    """Grow the frame depth by depth. Only the original frame is preprocessed, the columns added at a depth are
+    appended to a float32 buffer and only their histograms are computed."""
     df_engineered_list = []
     print("Construction...")
-    df_engineered = df_original.copy(deep=True)
+    cache = ConstructionCache() if cache is None else cache
+
+    X, y = preprocess_dataset(df_original)
+    column_names = df_original.columns.tolist()[:-1]
+    n_original = len(column_names)
+    buffer = ColumnBuffer(X.values)
 
     max_d = max(d_list)
 
     for d_i in range(1, max_d + 1):
-        df_engineered = _feature_construction_step(df_engineered, TRM_dataset, TRM_binary_dataset)
-        # Drop Original Features from engineered ones
-        df_engineered_d = df_engineered.drop(df_original.columns, axis=1)
+        X_d = buffer.values
+        # Meta-features of the whole frame change with every depth, the histograms of the columns do not
+        mf = get_metafeatures_dataset({'X': X_d, 'y': y, 'dataset_name': 'test'})
+        encoding = mf, cache.histogram_matrix(X_d, column_names)
+        X_new_unary, _column_names_unary = transform_unary(
+            X_d, y, column_names, TRM_dataset, encoding, cache.values)
+        X_new_binary, _column_names_binary = transform_binary(
+            X_d, y, column_names, TRM_binary_dataset, encoding, cache.values)
+
+        for X_new, new_column_names in [(X_new_unary, _column_names_unary), (X_new_binary, _column_names_binary)]:
+            if X_new is not None:
+                buffer.append(X_new)
+                column_names = column_names + new_column_names
 
         if (d_i in d_list):
             print(f"d:{d_i} done.")
-            # Add df to the testing list if current d in in d_list
-            df_engineered_list.append(df_engineered_d)
+            # Add the engineered features (without the original ones) if current d is in d_list
+            df_engineered_list.append(pd.DataFrame(
+                buffer.values[:, n_original:].copy(), columns=column_names[n_original:], index=df_original.index))
 
     return df_engineered_list
 
@@ -132,53 +194,11 @@ def preprocess_dataset(df):
     return X_raw, y_raw
 
 
+@lru_cache(maxsize=None)
 def get_TRMs():
-    with open("src/feature_engineering/MACFE/data/TRM_set.pkl", 'rb') as f:
-        TRM_set = pickle.load(f)
-    TRM_dataset = list()
-    for i in range(len(TRM_set)):
-        TRM_dataset.append(
-            np.append(TRM_set[i]['encoding'].ravel(), TRM_set[i]['top_t_index']))
-    TRM_dataset = np.array(TRM_dataset)
-
-    with open('src/feature_engineering/MACFE/data/TRM_binary_set_maxf1f2.pkl', 'rb') as f:
-        TRM_binary_set = pickle.load(f)
-    TRM_binary_dataset = list()
-    for i in range(len(TRM_binary_set)):
-        TRM_binary_dataset.append(
-            np.append(TRM_binary_set[i]['encoding'].ravel(), TRM_binary_set[i]['top_t_index']))
-    TRM_binary_dataset = np.array(TRM_binary_dataset)
-
-    with open('src/feature_engineering/MACFE/data/TRM_scaler_set.pkl', 'rb') as f:
-        TRM_scaler_set = pickle.load(f)
-    TRM_scaler_dataset = list()
-    for i in range(len(TRM_scaler_set)):
-        TRM_scaler_dataset.append(
-            np.append(TRM_scaler_set[i]['encoding'].ravel(), TRM_scaler_set[i]['top_t_index']))
-    TRM_scaler_dataset = np.array(TRM_scaler_dataset)
-
+    """Fitted nearest neighbour indexes of the unary, binary and scaler TRMs, built once per process"""
+    TRM_dataset = get_TRM_index("src/feature_engineering/MACFE/data/TRM_set.pkl")
+    TRM_binary_dataset = get_TRM_index("src/feature_engineering/MACFE/data/TRM_binary_set_maxf1f2.pkl")
+    TRM_scaler_dataset = get_TRM_index("src/feature_engineering/MACFE/data/TRM_scaler_set.pkl")
     return TRM_dataset, TRM_binary_dataset, TRM_scaler_dataset
 
-
-def _feature_construction_step(df, TRM_dataset, TRM_binary_dataset):
-    X, y = preprocess_dataset(df)
-    _column_names = df.columns.tolist()[:-1].copy()
-
-    X_new_unary, _column_names_unary = transform_unary(X.values, y, _column_names, TRM_dataset)
-    X_new_binary, _column_names_binary = transform_binary(X.values, y, _column_names, TRM_binary_dataset)
-
-    # New DF with novel features
-    df_e = df.copy()
-    df_e = df_e.drop(['class'], axis=1)
-
-    if (X_new_unary is not None):
-        df_unary = pd.DataFrame(X_new_unary, columns=_column_names_unary)
-        df_e = pd.concat([df_e, df_unary], axis=1)
-
-    if (X_new_binary is not None):
-        df_binary = pd.DataFrame(X_new_binary, columns=_column_names_binary)
-        df_e = pd.concat([df_e, df_binary], axis=1)
-
-    df_e['class'] = y
-
-    return df_e
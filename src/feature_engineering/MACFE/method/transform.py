@@ -1,3 +1,8 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
 import numpy as np
 from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler
 from src.feature_engineering.MACFE.method.metafeatures import get_metafeatures_dataset, get_histogram
@@ -11,6 +16,53 @@ trans_symbols = ['log', 'sqrt', 'sqr', 'round', 'freq', 'tanh', 'sig', 'z', 'rec
 
 operations = ['+', '-', '*', '/', '%']
 
+# Pair encodings per batched kneighbors call, bounds the memory of the query matrix
+pair_block = 50_000
+
+
+class TRMIndex:
+    """Ball tree over the encodings of a transformation recommendation matrix (TRM), each row of the TRM is an
+    encoding followed by the index of the best transformation"""
+
+    def __init__(self, TRM, checksum=None):
+        self.TRM = TRM
+        self.checksum = checksum
+        self.nbrs = NearestNeighbors(n_neighbors=1, algorithm='ball_tree', metric='euclidean', n_jobs=-1).fit(
+            TRM[:, :-1])
+
+    def recommend(self, encodings):
+        """Transformation index of the nearest TRM encoding of every row of encodings"""
+        indices = self.nbrs.kneighbors(encodings, return_distance=False)[:, 0]
+        return self.TRM[indices, -1].astype(int)
+
+
+def _file_checksum(path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def get_TRM_index(path) -> TRMIndex:
+    """Read a TRM pickle and fit its ball tree. The fitted index is stored next to the pickle
+    (<name>.index.pkl) and reused as long as the TRM pickle is unchanged."""
+    path = Path(path)
+    index_path = path.with_suffix(".index.pkl")
+    checksum = _file_checksum(path)
+    if index_path.is_file():
+        with open(index_path, 'rb') as f:
+            index = pickle.load(f)
+        if index.checksum == checksum:
+            return index
+
+    with open(path, 'rb') as f:
+        TRM_set = pickle.load(f)
+    TRM = np.array([np.append(t['encoding'].ravel(), t['top_t_index']) for t in TRM_set])
+    index = TRMIndex(TRM, checksum)
+
+    tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(index, f)
+    os.replace(tmp_path, index_path)
+    return index
+
 
 def preprocess_dataset(df):
     # Preprocess data
@@ -31,18 +83,23 @@ def preprocess_dataset(df):
     return X_raw, y_raw
 
 
-def get_dataset_unary_encoding(X, y):
+def get_dataset_encoding(X, y):
+    """Meta-features of the dataset and histograms of its features, computed once per frame and shared by the
+    unary, binary and scaler transformations"""
     ds = {
         'X': X,
         'y': y,
         'dataset_name': 'test'
     }
+    return get_metafeatures_dataset(ds), np.array(get_histogram(ds))
+
 
-    mf, hist = get_metafeatures_dataset(ds), get_histogram(ds)
+def get_dataset_unary_encoding(X, y, encoding=None):
+    mf, hist = get_dataset_encoding(X, y) if encoding is None else encoding
 
     ds_encodings = []
 
-    for f_i in range(len(ds['X'].T)):
+    for f_i in range(len(X.T)):
         encoding = np.concatenate((mf, hist[f_i]), axis=0)
         ds_encodings.append(encoding)
 
@@ -51,26 +108,22 @@ def get_dataset_unary_encoding(X, y):
     return ds_encodings
 
 
-def transform_unary(X, y, column_names, TRM_dataset):
+def transform_unary(X, y, column_names, TRM_index, encoding=None, cache=None):
     new_column_names = []
     new_features = []
 
     # Get the encodings of all the features in dataset
-    ds_encodings = get_dataset_unary_encoding(X, y)
+    ds_encodings = get_dataset_unary_encoding(X, y, encoding)
 
     # check for NaN values
     if (np.isnan(ds_encodings).any() or np.isinf(ds_encodings).any()):
         ds_encodings = np.nan_to_num(ds_encodings)
 
     # Get 1 neighbor for each feature
-    nbrs = NearestNeighbors(n_neighbors=1, algorithm='ball_tree', metric='euclidean', n_jobs=-1).fit(
-        TRM_dataset[:, :-1])
-    indices = nbrs.kneighbors(ds_encodings, return_distance=False)
+    t_indices = TRM_index.recommend(ds_encodings)
 
     # Iterate in t indices
-    for neigh_index, f_index in zip(indices, range(len(X.T))):
-
-        t_index = int(TRM_dataset[neigh_index, -1])
+    for t_index, f_index in zip(t_indices, range(len(X.T))):
 
         if t_index == len(Unary_transformations):
             # No suitable transformation found
@@ -81,9 +134,17 @@ def transform_unary(X, y, column_names, TRM_dataset):
         if (new_column_name in new_column_names or new_column_name in column_names):
             continue
 
-        success, t_values = Unary_transformations[t_index](X[:, f_index])
-
-        if success and not np.isnan(t_values).any():
+        # The name determines the values, cache holds the result (None if unusable) of earlier frames
+        if cache is not None and new_column_name in cache:
+            t_values = cache[new_column_name]
+        else:
+            success, t_values = Unary_transformations[t_index](X[:, f_index])
+            if not success or np.isnan(t_values).any():
+                t_values = None
+            if cache is not None:
+                cache[new_column_name] = t_values
+
+        if t_values is not None:
             new_features.append(t_values)
             new_column_names.append(new_column_name)
 
@@ -94,31 +155,28 @@ def transform_unary(X, y, column_names, TRM_dataset):
         return None, None
 
 
-def transform_binary(X, y, column_names, TRM_binary_dataset):
-    ds = {
-        'X': X,
-        'y': y,
-        'dataset_name': 'test'
-    }
-
+def transform_binary(X, y, column_names, TRM_binary_index, encoding=None, cache=None):
     new_column_names = []
     new_features = []
 
-    nbrs = NearestNeighbors(n_neighbors=1, algorithm='ball_tree', metric='euclidean', n_jobs=-1).fit(
-        TRM_binary_dataset[:, :-1])
-
     # Get the encodings of all the features in dataset
-    mf, hist = get_metafeatures_dataset(ds), get_histogram(ds)
-
-    for f_i in range(len(X.T)):
-        for f_j in range(f_i + 1, len(X.T)):
+    mf, hist = get_dataset_encoding(X, y) if encoding is None else encoding
 
-            encoding = np.concatenate((mf, hist[f_i], hist[f_j]), axis=0)
+    # Get 1 neighbor for every pair (f_i, f_j), f_i < f_j in the order of the loop below, in batched queries
+    n_features = len(X.T)
+    pairs_i, pairs_j = np.triu_indices(n_features, k=1)
+    pair_t_indices = np.empty(len(pairs_i), dtype=int)
+    for start in range(0, len(pairs_i), pair_block):
+        block_i, block_j = pairs_i[start:start + pair_block], pairs_j[start:start + pair_block]
+        encodings = np.hstack((np.broadcast_to(mf, (len(block_i), len(mf))), hist[block_i], hist[block_j]))
+        pair_t_indices[start:start + pair_block] = TRM_binary_index.recommend(encodings)
+    # Position of the first pair of every f_i
+    pair_starts = np.concatenate(([0], np.cumsum(np.arange(n_features - 1, 0, -1))))
 
-            # Get 1 neighbor for each feature
-            neigh_index = nbrs.kneighbors([encoding], return_distance=False)
+    for f_i in range(n_features):
+        for f_j in range(f_i + 1, n_features):
 
-            t_index = int(TRM_binary_dataset[neigh_index, -1])
+            t_index = pair_t_indices[pair_starts[f_i] + f_j - f_i - 1]
 
             if t_index == len(Binary_transformations):
                 # No suitable transformation found
@@ -129,10 +187,17 @@ def transform_binary(X, y, column_names, TRM_binary_dataset):
             if (new_col_name in new_column_names or new_col_name in column_names):
                 continue
 
-            t_f = Binary_transformations[t_index](X[:, f_i], X[:, f_j])
-
-            # if we made the transformation, then we check if there is any NaN or Inf value
-            if (np.isnan(t_f).any() or np.isinf(t_f).any()):
+            if cache is not None and new_col_name in cache:
+                t_f = cache[new_col_name]
+            else:
+                t_f = Binary_transformations[t_index](X[:, f_i], X[:, f_j])
+                # if we made the transformation, then we check if there is any NaN or Inf value
+                if (np.isnan(t_f).any() or np.isinf(t_f).any()):
+                    t_f = None
+                if cache is not None:
+                    cache[new_col_name] = t_f
+
+            if t_f is None:
                 continue
 
             new_features.append(t_f)
@@ -146,28 +211,18 @@ def transform_binary(X, y, column_names, TRM_binary_dataset):
         return None, None
 
 
-def transform_scaler(X, y, column_names, TRM_scaler):
-    ds = {
-        'X': X,
-        'y': y,
-        'dataset_name': 'test'
-    }
-
+def transform_scaler(X, y, column_names, TRM_scaler_index, encoding=None):
     scalers = [RobustScaler, StandardScaler, MinMaxScaler]
 
     # Get the encoding of current dataset
-    ds_encoding = get_metafeatures_dataset(ds)
+    ds_encoding = get_dataset_encoding(X, y)[0] if encoding is None else encoding[0]
 
     # check for NaN values
     if (np.isnan(ds_encoding).any() or np.isinf(ds_encoding).any()):
         ds_encoding = np.nan_to_num(ds_encoding)
 
-    # get similar dataset
-    nbrs = NearestNeighbors(n_neighbors=1, algorithm='ball_tree', metric='euclidean', n_jobs=-1).fit(TRM_scaler[:, :-1])
-    neigh_index = nbrs.kneighbors([ds_encoding], return_distance=False)[0]
-
-    # get scaler index
-    t_index = int(TRM_scaler[neigh_index, -1])
+    # get similar dataset and its scaler index
+    t_index = TRM_scaler_index.recommend([ds_encoding])[0]
 
     # apply scaling
     scaler = scalers[t_index]()
@@ -0,0 +1,92 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering.OpenFE.method.FeatureGenerator import FNode, Node
+
+# Operators that map a per-group statistic back onto the rows
+lookup_operators = ["freq", "GroupByThenMin", "GroupByThenMax", "GroupByThenMean", "GroupByThenMedian",
+                    "GroupByThenStd", "GroupByThenNUnique", "CombineThenFreq"]
+
+
+def _legacy_lookup(table, keys):
+    table.loc[np.nan] = np.nan
+    return keys.apply(lambda x: table.loc[x])
+
+
+def legacy_calculate(op, data) -> pd.Series:
+    """Per-row ``.apply(lambda x: temp.loc[x])`` implementation of the operators before vectorization."""
+    d1, d2 = data["num"], data["cat"]
+    if op == "freq":
+        new_data = _legacy_lookup(d2.value_counts(), d2)
+    elif op == "GroupByThenNUnique":
+        new_data = _legacy_lookup(data["cat2"].groupby(d2).nunique(), d2)
+    elif op == "CombineThenFreq":
+        temp = data["cat2"].astype(str) + '_' + d2.astype(str)
+        temp[data["cat2"].isna() | d2.isna()] = np.nan
+        new_data = _legacy_lookup(temp.value_counts(), temp)
+    else:
+        how = op[len("GroupByThen"):].lower()
+        new_data = _legacy_lookup(getattr(d1.groupby(d2), how)(), d2)
+    return new_data.astype('float')
+
+
+def vectorized_calculate(op, data) -> pd.Series:
+    if op == "freq":
+        node = Node(op, [FNode("cat")])
+    elif op in ["GroupByThenNUnique", "CombineThenFreq"]:
+        node = Node(op, [FNode("cat2"), FNode("cat")])
+    else:
+        node = Node(op, [FNode("num"), FNode("cat")])
+    return node.calculate(data)
+
+
+def make_data(n_rows, n_groups, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    num = rng.normal(size=n_rows)
+    num[rng.random(n_rows) < 0.05] = np.nan
+    cat = rng.integers(0, n_groups, n_rows).astype(float)
+    cat[rng.random(n_rows) < 0.05] = np.nan
+    cat2 = rng.integers(0, 10, n_rows).astype(float)
+    cat2[rng.random(n_rows) < 0.05] = np.nan
+    # Shuffled index labels, the operators must keep them
+    return pd.DataFrame({"num": num, "cat": cat, "cat2": cat2}, index=rng.permutation(n_rows) + 1000)
+
+
+def _time(fn, repeat) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args):
+    data = make_data(args.n_rows, args.n_groups)
+    print(f"{'operator':<20} {'legacy [ms]':>12} {'vectorized [ms]':>16} {'speedup':>8}  identical")
+    all_identical = True
+    for op in lookup_operators:
+        legacy = legacy_calculate(op, data)
+        vectorized = vectorized_calculate(op, data)
+        # Bit-identical: same index, same NaN positions and the same float64 bit patterns
+        identical = legacy.index.equals(vectorized.index) and np.array_equal(
+            legacy.to_numpy().view(np.int64), vectorized.to_numpy().view(np.int64))
+        all_identical &= identical
+        t_legacy = _time(lambda: legacy_calculate(op, data), args.repeat)
+        t_vectorized = _time(lambda: vectorized_calculate(op, data), args.repeat)
+        print(f"{op:<20} {1000 * t_legacy:>12.2f} {1000 * t_vectorized:>16.2f} "
+              f"{t_legacy / t_vectorized:>7.1f}x  {identical}")
+    if not all_identical:
+        raise AssertionError("Vectorized operators differ from the legacy implementation")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the vectorized OpenFE group operators to the per-row lookup')
+    parser.add_argument('--n_rows', type=int, default=5000, help='Rows of the synthetic dataset')
+    parser.add_argument('--n_groups', type=int, default=50, help='Distinct values of the grouping column')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best is reported)')
+    args = parser.parse_args()
+    main(args)
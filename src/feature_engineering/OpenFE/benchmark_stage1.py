@@ -0,0 +1,102 @@
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import spearmanr
+
+from src.datasets.Datasets import get_dataset, get_suite
+from src.feature_engineering.OpenFE.method import OpenFE
+from src.feature_engineering.OpenFE.method.FeatureGenerator import ColumnCache
+from src.feature_engineering.OpenFE.method.openfe import _subsample
+
+
+def prepare(train_x, train_y, seed=1) -> tuple[OpenFE, list]:
+    """The steps of OpenFE.fit before stage1, without writing the shared blocks."""
+    openfe = OpenFE()
+    openfe.data = train_x.copy()
+    openfe.label = pd.DataFrame(train_y)
+    openfe.metric = None
+    openfe.stage1_metric = 'predictive'
+    openfe.feature_boosting = False
+    openfe.n_jobs = 1
+    openfe.seed = seed
+    openfe.verbose = False
+    openfe.data_to_dataframe()
+    openfe.task = openfe.get_task(None)
+    openfe.process_label()
+    openfe.metric = openfe.get_metric(None)
+    openfe.categorical_features = openfe.get_categorical_features(None)
+    candidate_features = openfe.get_candidate_features(None)
+    openfe.train_index, openfe.val_index = openfe.get_index(None, None)
+    openfe.init_scores = openfe.get_init_score(None)
+    return openfe, candidate_features
+
+
+def compare(openfe, candidate_features, n_data_blocks, top) -> dict:
+    """Score the candidates on the first data block of successive halving with both evaluators."""
+    train_idx = _subsample(openfe.train_index, n_data_blocks)[0]
+    val_idx = _subsample(openfe.val_index, n_data_blocks)[0]
+    data_temp = openfe.data.loc[train_idx + val_idx]
+    train_y, val_y = openfe.label.loc[train_idx], openfe.label.loc[val_idx]
+    train_init, val_init = openfe.init_scores.loc[train_idx], openfe.init_scores.loc[val_idx]
+    init_metric = openfe.get_init_metric(val_init, val_y)
+
+    cache = ColumnCache()
+    legacy_scores, block_scores = [], []
+    legacy_time, block_time = 0.0, 0.0
+    start = time.perf_counter()
+    block = openfe.get_evaluation_block(train_y, val_y, train_init, val_init)
+    block_time += time.perf_counter() - start
+    for candidate_feature in candidate_features:
+        candidate_feature.calculate(data_temp, is_root=True, cache=cache)
+        start = time.perf_counter()
+        legacy_scores.append(openfe._evaluate(candidate_feature, train_y, val_y, train_init, val_init, init_metric))
+        legacy_time += time.perf_counter() - start
+        start = time.perf_counter()
+        block_scores.append(openfe._evaluate_in_block(candidate_feature, block, init_metric))
+        block_time += time.perf_counter() - start
+        candidate_feature.delete()
+
+    legacy_scores, block_scores = np.array(legacy_scores), np.array(block_scores)
+    n_top = max(1, int(len(candidate_features) * top))
+    legacy_top = set(np.argsort(-legacy_scores, kind='stable')[:n_top])
+    block_top = set(np.argsort(-block_scores, kind='stable')[:n_top])
+    return {
+        "candidates": len(candidate_features),
+        "legacy_s": legacy_time,
+        "block_s": block_time,
+        "speedup": legacy_time / block_time,
+        "max_abs_diff": float(np.max(np.abs(legacy_scores - block_scores))),
+        "spearman": spearmanr(legacy_scores, block_scores).correlation,
+        "top_overlap": len(legacy_top & block_top) / n_top,
+    }
+
+
+def main(args):
+    options = args.datasets if args.datasets else sorted(get_suite("amltk"))
+    results = {}
+    for option in options:
+        train_x, train_y, _, _, _, name = get_dataset(option)
+        openfe, candidate_features = prepare(train_x, train_y)
+        random.seed(args.seed)
+        if len(candidate_features) > args.max_candidates:
+            candidate_features = random.sample(candidate_features, args.max_candidates)
+        results[name] = compare(openfe, candidate_features, args.n_data_blocks, args.top)
+        print(name, results[name])
+    results = pd.DataFrame(results).T
+    print(results.to_string())
+    print(f"Overall speedup {results['legacy_s'].sum() / results['block_s'].sum():.2f}x, "
+          f"min spearman {results['spearman'].min():.4f}, min top overlap {results['top_overlap'].min():.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the batched stage1 evaluation of OpenFE to the sklearn path')
+    parser.add_argument('--datasets', type=int, nargs='*', help='Dataset options (default: the "amltk" suite)')
+    parser.add_argument('--n_data_blocks', type=int, default=8, help='Data blocks of successive feature-wise halving')
+    parser.add_argument('--max_candidates', type=int, default=1000, help='Candidates sampled per dataset')
+    parser.add_argument('--top', type=float, default=0.1, help='Fraction of best candidates compared for overlap')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the candidate sample')
+    args = parser.parse_args()
+    main(args)
@@ -1,4 +1,5 @@
 from cmath import nan
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 
@@ -16,6 +17,83 @@ cal_all_operators = ["freq",
                      "Combine", "CombineThenFreq", "GroupByThenNUnique"]
 
 
+def _group_codes(d):
+    # Factorized group ids, missing keys get -1 (they form no group, their rows map to NaN)
+    codes, uniques = pd.factorize(d)
+    return codes, len(uniques)
+
+
+def _take_by_codes(table, codes, index):
+    new_data = np.full(len(codes), np.nan)
+    mask = codes >= 0
+    new_data[mask] = table[codes[mask]]
+    return pd.Series(new_data, index=index)
+
+
+def _cached_group_codes(node, d, cache):
+    # GroupByThen*(f, cat), GroupByThenNUnique(g, cat) and freq(cat) all share the factorization of cat
+    if cache is None:
+        return _group_codes(d)
+    key = ('factorize', node.key())
+    codes = cache.get(key)
+    if codes is None:
+        codes = _group_codes(d)
+        cache.put(key, codes)
+    return codes
+
+
+def _freq(d, codes=None):
+    codes, n_groups = _group_codes(d) if codes is None else codes
+    counts = np.bincount(codes[codes >= 0], minlength=n_groups).astype("float64")
+    return _take_by_codes(counts, codes, d.index)
+
+
+def _groupby_then(d1, d2, how, codes=None):
+    codes, n_groups = _group_codes(d2) if codes is None else codes
+    mask = codes >= 0
+    values = pd.Series(np.asarray(d1)[mask])
+    table = values.groupby(codes[mask]).agg(how).reindex(np.arange(n_groups)).to_numpy(dtype="float64")
+    return _take_by_codes(table, codes, d2.index)
+
+
+def _nbytes(value):
+    if isinstance(value, tuple):
+        return value[0].nbytes
+    return value.nbytes
+
+
+class ColumnCache(object):
+    """ Bounded LRU cache of the columns calculated on one data block, keyed by the structure of the
+    expression (see Node.key). Candidates that share a subexpression, e.g. GroupByThenMean(f1,cat) under
+    '+', '*' and '/', calculate it only once per block.
+    """
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.columns = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.columns.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.columns.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        size = _nbytes(value)
+        if key in self.columns or size > self.max_bytes:
+            return
+        self.columns[key] = value
+        self.n_bytes += size
+        while self.n_bytes > self.max_bytes:
+            _, evicted = self.columns.popitem(last=False)
+            self.n_bytes -= _nbytes(evicted)
+
+
 class Node(object):
     def __init__(self, op, children):
         self.name = op
@@ -39,9 +117,20 @@ class Node(object):
         for child in self.children:
             child.f_delete()
 
-    def calculate(self, data, is_root=False):
+    def key(self):
+        # Equal keys mean equal expressions, independent of which (deep-copied) tree object holds them
+        return (self.name,) + tuple(child.key() for child in self.children)
+
+    def calculate(self, data, is_root=False, cache=None):
+        if cache is not None:
+            key = self.key()
+            new_data = cache.get(key)
+            if new_data is not None:
+                if is_root:
+                    self.data = new_data
+                return new_data
         if self.name in all_operators+num_operators:
-            d = self.children[0].calculate(data)
+            d = self.children[0].calculate(data, cache=cache)
             if self.name == "abs":
                 new_data = d.abs()
             elif self.name == "log":
@@ -53,9 +142,7 @@ class Node(object):
             elif self.name == "sigmoid":
                 new_data = 1 / (1 + np.exp(-d))
             elif self.name == "freq":
-                value_counts = d.value_counts()
-                value_counts.loc[np.nan] = np.nan
-                new_data = d.apply(lambda x: value_counts.loc[x])
+                new_data = _freq(d, _cached_group_codes(self.children[0], d, cache))
             elif self.name == "round":
                 new_data = np.floor(d)
             elif self.name == "residual":
@@ -63,8 +150,8 @@ class Node(object):
             else:
                 raise NotImplementedError(f"Unrecognized operator {self.name}.")
         elif self.name in num_num_operators:
-            d1 = self.children[0].calculate(data)
-            d2 = self.children[1].calculate(data)
+            d1 = self.children[0].calculate(data, cache=cache)
+            d2 = self.children[1].calculate(data, cache=cache)
             if self.name == "max":
                 new_data = np.maximum(d1, d2)
             elif self.name == "min":
@@ -78,28 +165,21 @@ class Node(object):
             elif self.name == "/":
                 new_data = d1 / d2.replace(0, np.nan)
         else:
-            d1 = self.children[0].calculate(data)
-            d2 = self.children[1].calculate(data)
+            d1 = self.children[0].calculate(data, cache=cache)
+            d2 = self.children[1].calculate(data, cache=cache)
+            if self.name in ["GroupByThenMin", "GroupByThenMax", "GroupByThenMean", "GroupByThenMedian",
+                             "GroupByThenStd", "GroupByThenNUnique"]:
+                codes = _cached_group_codes(self.children[1], d2, cache)
             if self.name == "GroupByThenMin":
-                temp = d1.groupby(d2).min()
-                temp.loc[np.nan] = np.nan
-                new_data = d2.apply(lambda x: temp.loc[x])
+                new_data = _groupby_then(d1, d2, "min", codes)
             elif self.name == "GroupByThenMax":
-                temp = d1.groupby(d2).max()
-                temp.loc[np.nan] = np.nan
-                new_data = d2.apply(lambda x: temp.loc[x])
+                new_data = _groupby_then(d1, d2, "max", codes)
             elif self.name == "GroupByThenMean":
-                temp = d1.groupby(d2).mean()
-                temp.loc[np.nan] = np.nan
-                new_data = d2.apply(lambda x: temp.loc[x])
+                new_data = _groupby_then(d1, d2, "mean", codes)
             elif self.name == "GroupByThenMedian":
-                temp = d1.groupby(d2).median()
-                temp.loc[np.nan] = np.nan
-                new_data = d2.apply(lambda x: temp.loc[x])
+                new_data = _groupby_then(d1, d2, "median", codes)
             elif self.name == "GroupByThenStd":
-                temp = d1.groupby(d2).std()
-                temp.loc[np.nan] = np.nan
-                new_data = d2.apply(lambda x: temp.loc[x])
+                new_data = _groupby_then(d1, d2, "std", codes)
             elif self.name == 'GroupByThenRank':
                 new_data = d1.groupby(d2).rank(ascending=True, pct=True)
             elif self.name == "GroupByThenFreq":
@@ -109,9 +189,7 @@ class Node(object):
                     return x.apply(lambda x: value_counts.loc[x])
                 new_data = d1.groupby(d2).apply(_f)
             elif self.name == "GroupByThenNUnique":
-                nunique = d1.groupby(d2).nunique()
-                nunique.loc[np.nan] = np.nan
-                new_data = d2.apply(lambda x: nunique.loc[x])
+                new_data = _groupby_then(d1, d2, "nunique", codes)
             elif self.name == "Combine":
                 temp = d1.astype(str) + '_' + d2.astype(str)
                 temp[d1.isna() | d2.isna()] = np.nan
@@ -120,9 +198,7 @@ class Node(object):
             elif self.name == "CombineThenFreq":
                 temp = d1.astype(str) + '_' + d2.astype(str)
                 temp[d1.isna() | d2.isna()] = np.nan
-                value_counts = temp.value_counts()
-                value_counts.loc[np.nan] = np.nan
-                new_data = temp.apply(lambda x: value_counts.loc[x])
+                new_data = _freq(temp)
             else:
                 raise NotImplementedError(f"Unrecognized operator {self.name}.")
         if self.name == 'Combine':
@@ -131,6 +207,8 @@ class Node(object):
             new_data = new_data.astype('float')
         if is_root:
             self.data = new_data
+        if cache is not None:
+            cache.put(key, new_data)
         return new_data
 
 
@@ -150,6 +228,9 @@ class FNode(object):
     def get_fnode(self):
         return [self.name]
 
-    def calculate(self, data):
+    def key(self):
+        return self.name
+
+    def calculate(self, data, is_root=False, cache=None):
         self.data = data[self.name]
         return self.data
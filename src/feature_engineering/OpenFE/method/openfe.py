@@ -8,7 +8,8 @@ from .FeatureGenerator import *
 import random
 from concurrent.futures import ProcessPoolExecutor
 import traceback
-from .utils import tree_to_formula, check_xor, formula_to_tree
+from .utils import tree_to_formula, check_xor, formula_to_tree, save_block, attach_blocks, read_block, \
+    make_block_dir, remove_block_dir
 from sklearn.inspection import permutation_importance
 from sklearn.feature_selection import mutual_info_regression, mutual_info_classif
 from sklearn.metrics import mean_squared_error, log_loss, roc_auc_score
@@ -249,8 +250,8 @@ class OpenFE:
         n_repeats: int, optional (default=1)
             The number of repeats in permutation. Only useful when stage2_metric is set to 'permutation'.
 
-        tmp_save_path: str, optional (default='./openfe_tmp_data.feather')
-            Temporary path to save data for multiprocessing.
+        The data and labels for multiprocessing are saved to a new temporary directory in the working
+        directory per call, which is removed at the end.
 
         n_jobs: int, optional (default=1)
             The number of processes used for feature calculation and evaluation.
@@ -285,7 +286,9 @@ class OpenFE:
         self.stage2_params = stage2_params
         self.is_stage1 = is_stage1
         self.n_repeats = n_repeats
-        self.tmp_save_path = './openfe_tmp_data_xx_' + str(name) + '.feather'
+        self.tmp_dir = make_block_dir(name)
+        self.tmp_save_path = os.path.join(self.tmp_dir, 'data.feather')
+        self.tmp_label_path = os.path.join(self.tmp_dir, 'label.feather')
         self.n_jobs = n_jobs
         self.seed = seed
         self.verbose = verbose
@@ -300,6 +303,7 @@ class OpenFE:
         self.candidate_features_list = self.get_candidate_features(candidate_features_list)
         self.train_index, self.val_index = self.get_index(train_index, val_index)
         self.init_scores = self.get_init_score(init_scores)
+        self.save_label_block()
 
         self.myprint(f"The number of candidate features is {len(self.candidate_features_list)}")
         self.myprint("Start stage I selection.")
@@ -310,10 +314,18 @@ class OpenFE:
         self.new_features_list = [feature for feature, _ in self.new_features_scores_list]
         for node, score in self.new_features_scores_list:
             node.delete()
-        os.remove(self.tmp_save_path)
+        remove_block_dir(self.tmp_dir)
         gc.collect()
         return self.new_features_list
 
+    def __getstate__(self):
+        # Every submit to a worker pickles self. The workers read data, labels and init scores from the
+        # memory-mapped blocks, so leave the large inputs out of the pickle.
+        state = self.__dict__.copy()
+        for key in ['data', 'label', 'init_scores', 'candidate_features_list']:
+            state.pop(key, None)
+        return state
+
     def myprint(self, s):
         if self.verbose:
             print(s)
@@ -331,7 +343,22 @@ class OpenFE:
 
     def process_and_save_data(self):
         self.data.index.name = 'openfe_index'
-        self.data.reset_index().to_feather(self.tmp_save_path)
+        save_block(self.data, self.tmp_save_path)
+
+    def save_label_block(self):
+        self.label_columns = list(self.label.columns)
+        self.init_score_columns = list(self.init_scores.columns)
+        block = pd.concat([self.label.set_axis(['label'], axis=1),
+                           self.init_scores.set_axis(['init_%d' % i for i in range(self.init_scores.shape[1])], axis=1)],
+                          axis=1)
+        block.index.name = 'openfe_index'
+        save_block(block, self.tmp_label_path)
+
+    def read_labels(self, index):
+        block = read_block(self.tmp_label_path, index=index)
+        label = block[['label']].set_axis(self.label_columns, axis=1)
+        init_scores = block.drop(columns='label').set_axis(self.init_score_columns, axis=1)
+        return label, init_scores
 
     def get_index(self, train_index, val_index):
         if train_index is None or val_index is None:
@@ -640,20 +667,77 @@ class OpenFE:
             print(traceback.format_exc())
             exit()
 
+    def get_evaluation_block(self, train_y, val_y, train_init, val_init):
+        """ Labels, init scores and LightGBM parameters for the 'predictive' stage1 metric, prepared once per data
+        block instead of by the sklearn wrapper for every candidate feature. The parameters are the ones
+        LGBMClassifier/LGBMRegressor pass in _evaluate, so both paths give the same scores.
+        """
+        params = {"num_iterations": 100, "num_leaves": 16, "seed": 1, "deterministic": True,
+                  "num_threads": 1, "verbosity": -1}
+        if self.task == 'classification':
+            classes = np.unique(train_y.values.ravel())
+            if len(classes) > 2:
+                params.update({"objective": "multiclass", "num_class": len(classes)})
+            else:
+                params.update({"objective": "binary"})
+            train_label = np.searchsorted(classes, train_y.values.ravel())
+            val_label = np.searchsorted(classes, val_y.values.ravel())
+        else:
+            params.update({"objective": "regression"})
+            train_label = train_y.values.ravel()
+            val_label = val_y.values.ravel()
+        if self.metric is not None:
+            params.update({"metric": self.metric})
+        return {"params": params,
+                "n_train": len(train_label),
+                "train_label": train_label,
+                "val_label": val_label,
+                "train_init": train_init.values if train_init.shape[1] > 1 else train_init.values.ravel(),
+                "val_init": val_init.values if val_init.shape[1] > 1 else val_init.values.ravel()}
+
+    def _evaluate_in_block(self, candidate_feature, block, init_metric):
+        """ The 'predictive' stage1 metric of _evaluate, on numpy arrays and the LightGBM core API. The candidate was
+        calculated on a data block with the rows in train_idx + val_idx order.
+        """
+        try:
+            if str(candidate_feature.data.dtype) == 'category':
+                # Same encoding as the sklearn wrapper applies to pandas categoricals
+                values = candidate_feature.data.cat.codes.values.astype('float64')
+                values[values == -1] = np.nan
+                categorical_feature = [0]
+            else:
+                values = candidate_feature.data.values.astype('float64')
+                categorical_feature = 'auto'
+            n_train = block["n_train"]
+            train_set = lgb.Dataset(values[:n_train, None], block["train_label"], init_score=block["train_init"],
+                                    categorical_feature=categorical_feature, params=block["params"])
+            val_set = lgb.Dataset(values[n_train:, None], block["val_label"], init_score=block["val_init"],
+                                  reference=train_set)
+            # Only the best score is needed, skip the model_to_string round trip that frees the training data
+            gbm = lgb.train(block["params"], train_set, valid_sets=[val_set], keep_training_booster=True,
+                            callbacks=[lgb.early_stopping(3, verbose=False)])
+            key = list(gbm.best_score['valid_0'].keys())[0]
+            if self.metric in ['auc']:
+                score = gbm.best_score['valid_0'][key] - init_metric
+            else:
+                score = init_metric - gbm.best_score['valid_0'][key]
+            return score
+        except:
+            print(traceback.format_exc())
+            exit()
+
     def _calculate_multiprocess(self, candidate_features, train_idx, val_idx):
         try:
             results = []
-            base_features = {'openfe_index'}
+            base_features = set()
             for candidate_feature in candidate_features:
                 base_features |= set(candidate_feature.get_fnode())
 
-            data = pd.read_feather(self.tmp_save_path, columns=list(base_features)).set_index('openfe_index')
-            data_temp = data.loc[train_idx + val_idx]
-            del data
-            gc.collect()
+            data_temp = read_block(self.tmp_save_path, columns=list(base_features), index=train_idx + val_idx)
+            cache = ColumnCache()
 
             for candidate_feature in candidate_features:
-                candidate_feature.calculate(data_temp, is_root=True)
+                candidate_feature.calculate(data_temp, is_root=True, cache=cache)
                 candidate_feature.f_delete()
                 results.append(candidate_feature)
             return results
@@ -668,7 +752,8 @@ class OpenFE:
         random.shuffle(candidate_features)
         # for f in candidate_features:
         #     f.delete()
-        with ProcessPoolExecutor(max_workers=self.n_jobs) as ex:
+        with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=attach_blocks,
+                                 initargs=(self.tmp_save_path, self.tmp_label_path)) as ex:
             with tqdm(total=n) as progress:
                 for i in range(n):
                     if i == (n - 1):
@@ -689,23 +774,24 @@ class OpenFE:
     def _calculate_and_evaluate_multiprocess(self, candidate_features, train_idx, val_idx):
         try:
             results = []
-            base_features = {'openfe_index'}
+            base_features = set()
             for candidate_feature in candidate_features:
                 base_features |= set(candidate_feature.get_fnode())
 
-            data = pd.read_feather(self.tmp_save_path, columns=list(base_features)).set_index('openfe_index')
-            data_temp = data.loc[train_idx + val_idx]
-            del data
-            gc.collect()
+            data_temp = read_block(self.tmp_save_path, columns=list(base_features), index=train_idx + val_idx)
+            cache = ColumnCache()
 
-            train_y = self.label.loc[train_idx]
-            val_y = self.label.loc[val_idx]
-            train_init = self.init_scores.loc[train_idx]
-            val_init = self.init_scores.loc[val_idx]
+            train_y, train_init = self.read_labels(train_idx)
+            val_y, val_init = self.read_labels(val_idx)
             init_metric = self.get_init_metric(val_init, val_y)
+            if self.stage1_metric == 'predictive':
+                block = self.get_evaluation_block(train_y, val_y, train_init, val_init)
             for candidate_feature in candidate_features:
-                candidate_feature.calculate(data_temp, is_root=True)
-                score = self._evaluate(candidate_feature, train_y, val_y, train_init, val_init, init_metric)
+                candidate_feature.calculate(data_temp, is_root=True, cache=cache)
+                if self.stage1_metric == 'predictive':
+                    score = self._evaluate_in_block(candidate_feature, block, init_metric)
+                else:
+                    score = self._evaluate(candidate_feature, train_y, val_y, train_init, val_init, init_metric)
                 candidate_feature.delete()
                 results.append([candidate_feature, score])
             return results
@@ -720,7 +806,8 @@ class OpenFE:
         random.shuffle(candidate_features)
         for f in candidate_features:
             f.delete()
-        with ProcessPoolExecutor(max_workers=self.n_jobs) as ex:
+        with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=attach_blocks,
+                                 initargs=(self.tmp_save_path, self.tmp_label_path)) as ex:
             with tqdm(total=n) as progress:
                 for i in range(n):
                     if i == (n-1):
@@ -738,24 +825,29 @@ class OpenFE:
                     res.extend(r.result())
         return res
 
-    def _trans(self, feature, n_train):
+    def _trans(self, features, n_train):
+        results = []
         try:
-            base_features = ['openfe_index']
-            base_features.extend(feature.get_fnode())
-            _data = pd.read_feather(self.tmp_save_path, columns=base_features).set_index('openfe_index')
-            feature.calculate(_data, is_root=True)
-            if (str(feature.data.dtype) == 'category') | (str(feature.data.dtype) == 'object'):
-                pass
-            else:
-                feature.data = feature.data.replace([-np.inf, np.inf], np.nan)
-                # feature.data = feature.data.fillna(0)
+            base_features = set()
+            for feature in features:
+                base_features |= set(feature.get_fnode())
+            _data = read_block(self.tmp_save_path, columns=list(base_features))
+            cache = ColumnCache()
+            for feature in features:
+                feature.calculate(_data, is_root=True, cache=cache)
+                if (str(feature.data.dtype) == 'category') | (str(feature.data.dtype) == 'object'):
+                    pass
+                else:
+                    feature.data = feature.data.replace([-np.inf, np.inf], np.nan)
+                    # feature.data = feature.data.fillna(0)
+                results.append((((str(feature.data.dtype) == 'category') or (str(feature.data.dtype) == 'object')),
+                                feature.data.values.ravel()[:n_train],
+                                feature.data.values.ravel()[n_train:],
+                                tree_to_formula(feature)))
         except:
             print(traceback.format_exc())
             exit()
-        return ((str(feature.data.dtype) == 'category') or (str(feature.data.dtype) == 'object')), \
-               feature.data.values.ravel()[:n_train], \
-               feature.data.values.ravel()[n_train:], \
-               tree_to_formula(feature)
+        return results
 
     def transform(self, X_train, X_test, new_features_list, n_jobs, name=""):
         """ Transform train and test data according to new features. Since there are global operators such as
@@ -773,16 +865,21 @@ class OpenFE:
 
         data = pd.concat([X_train, X_test], axis=0)
         data.index.name = 'openfe_index'
-        data.reset_index().to_feather(self.tmp_save_path)
+        self.tmp_dir = make_block_dir(name)
+        self.tmp_save_path = os.path.join(self.tmp_dir, 'data.feather')
+        save_block(data, self.tmp_save_path)
         n_train = len(X_train)
 
         self.myprint("Start transforming data.")
         start = datetime.now()
-        ex = ProcessPoolExecutor(n_jobs)
+        ex = ProcessPoolExecutor(n_jobs, initializer=attach_blocks, initargs=(self.tmp_save_path,))
         results = []
-        for feature in new_features_list:
-            results.append(ex.submit(self._trans, feature, n_train))
+        # Chunks of features, so that features in one chunk share their subexpressions
+        length = int(np.ceil(len(new_features_list) / n_jobs / 4))
+        for i in range(0, len(new_features_list), length):
+            results.append(ex.submit(self._trans, new_features_list[i:i + length], n_train))
         ex.shutdown(wait=True)
+        results = [res for future in results for res in future.result()]
         self.myprint(f"Time spent calculating new features {datetime.now()-start}.")
         _train = []
         _test = []
@@ -790,7 +887,7 @@ class OpenFE:
         names_map = {}
         cat_feats = []
         for i, res in enumerate(results):
-            is_cat, d1, d2, f = res.result()
+            is_cat, d1, d2, f = res
             names.append('autoFE_f_%d' % i + name)
             names_map['autoFE_f_%d' % i + name] = f
             _train.append(d1)
@@ -810,7 +907,7 @@ class OpenFE:
         _train = pd.concat([X_train, _train], axis=1)
         _test = pd.concat([X_test, _test], axis=1)
         self.myprint("Finish transformation.")
-        os.remove(self.tmp_save_path)
+        remove_block_dir(self.tmp_dir)
         return _train, _test
 
 
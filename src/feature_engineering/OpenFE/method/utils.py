@@ -1,8 +1,57 @@
+import os
+import shutil
+import tempfile
 import traceback
-from .FeatureGenerator import Node, FNode
+from .FeatureGenerator import Node, FNode, ColumnCache
 from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+
+# Memory-mapped columnar blocks of this process, path -> (arrow table, openfe_index)
+_blocks = {}
+
+
+def save_block(df, path):
+    """ Write a frame (index named 'openfe_index') as an uncompressed Arrow file, so that worker processes
+    can memory-map it instead of decompressing and copying it for every chunk.
+    """
+    df.reset_index().to_feather(path, compression='uncompressed')
+
+
+def attach_blocks(*paths):
+    """ ProcessPoolExecutor initializer: memory-map the blocks once per worker. The pages are shared
+    through the page cache, so the memory does not grow with n_jobs.
+    """
+    for path in paths:
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        _blocks[path] = (table, pd.Index(table.column('openfe_index').to_numpy()))
+
+
+def make_block_dir(name=""):
+    """ A new directory in the working directory for the blocks of one call, so that concurrent calls
+    (e.g. the splits of one dataset) never read or remove each other's blocks.
+    """
+    return tempfile.mkdtemp(prefix='openfe_tmp_%s_' % name, dir='.')
+
+
+def remove_block_dir(path):
+    """ Forget the memory maps of the blocks in a directory of make_block_dir and remove it. """
+    for block_path in [p for p in _blocks if os.path.dirname(p) == path]:
+        del _blocks[block_path]
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def read_block(path, columns=None, index=None):
+    """ Materialize only the requested columns and rows (in the order of index) of a block. """
+    if path not in _blocks:
+        attach_blocks(path)
+    table, block_index = _blocks[path]
+    if columns is not None:
+        table = table.select(['openfe_index'] + [c for c in columns if c != 'openfe_index'])
+    if index is not None:
+        table = table.take(pa.array(block_index.get_indexer_for(index)))
+    return table.to_pandas().set_index('openfe_index')
 
 
 def tree_to_formula(tree):
@@ -95,24 +144,29 @@ def split_num_cat_features(features_list):
     return num_features, cat_features
 
 
-def _cal(feature, n_train):
+def _cal(features, n_train, path):
+    results = []
     try:
-        base_features = ['openfe_index']
-        base_features.extend(feature.get_fnode())
-        _data = pd.read_feather('./openfe_tmp_data.feather', columns=base_features).set_index('openfe_index')
-        feature.calculate(_data, is_root=True)
-        if (str(feature.data.dtype) == 'category') | (str(feature.data.dtype) == 'object'):
-            pass
-        else:
-            feature.data = feature.data.replace([-np.inf, np.inf], np.nan)
-            # feature.data = feature.data.fillna(0)
+        base_features = set()
+        for feature in features:
+            base_features |= set(feature.get_fnode())
+        _data = read_block(path, columns=list(base_features))
+        cache = ColumnCache()
+        for feature in features:
+            feature.calculate(_data, is_root=True, cache=cache)
+            if (str(feature.data.dtype) == 'category') | (str(feature.data.dtype) == 'object'):
+                pass
+            else:
+                feature.data = feature.data.replace([-np.inf, np.inf], np.nan)
+                # feature.data = feature.data.fillna(0)
+            results.append((((str(feature.data.dtype) == 'category') or (str(feature.data.dtype) == 'object')),
+                            feature.data.values.ravel()[:n_train],
+                            feature.data.values.ravel()[n_train:],
+                            tree_to_formula(feature)))
     except:
         print(traceback.format_exc())
         exit()
-    return ((str(feature.data.dtype) == 'category') or (str(feature.data.dtype) == 'object')), \
-           feature.data.values.ravel()[:n_train], \
-           feature.data.values.ravel()[n_train:], \
-           tree_to_formula(feature)
+    return results
 
 
 def transform(X_train, X_test, new_features_list, n_jobs, name=""):
@@ -131,20 +185,26 @@ def transform(X_train, X_test, new_features_list, n_jobs, name=""):
 
     data = pd.concat([X_train, X_test], axis=0)
     data.index.name = 'openfe_index'
-    data.reset_index().to_feather('./openfe_tmp_data.feather')
+    block_dir = make_block_dir(name)
+    path = os.path.join(block_dir, 'data.feather')
+    save_block(data, path)
     n_train = len(X_train)
-    ex = ProcessPoolExecutor(n_jobs)
+    ex = ProcessPoolExecutor(n_jobs, initializer=attach_blocks, initargs=(path,))
     results = []
-    for feature in new_features_list:
-        results.append(ex.submit(_cal, feature, n_train))
+    # Chunks of features, so that features in one chunk share their subexpressions
+    length = int(np.ceil(len(new_features_list) / n_jobs / 4))
+    for i in range(0, len(new_features_list), length):
+        results.append(ex.submit(_cal, new_features_list[i:i + length], n_train, path))
     ex.shutdown(wait=True)
+    remove_block_dir(block_dir)
+    results = [res for future in results for res in future.result()]
     _train = []
     _test = []
     names = []
     names_map = {}
     cat_feats = []
     for i, res in enumerate(results):
-        is_cat, d1, d2, f = res.result()
+        is_cat, d1, d2, f = res
         names.append('autoFE_f_%d' % i + name)
         names_map['autoFE_f_%d' % i + name] = f
         _train.append(d1)
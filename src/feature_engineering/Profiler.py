@@ -0,0 +1,204 @@
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from pathlib import Path
+
+from src.datasets.Artifacts import ARTIFACT_DIR, artifact_key
+
+# One profile per feature artifact key, also for runs that failed or were killed by pynisher
+PROFILE_DIR = ARTIFACT_DIR / "profiles"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def profile_path(openml_task_id, split, method, config, fe_function) -> Path:
+    return PROFILE_DIR / f"{artifact_key(openml_task_id, split, method, config, fe_function)}.json"
+
+
+def _rss(pid) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _children(pid) -> list[int]:
+    """All descendants of a process (e.g. the JVM of h2o, Ray or joblib workers), from /proc on Linux."""
+    children = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return children
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children += [int(child) for child in f.read().split()]
+        except OSError:
+            continue
+    return children + [grandchild for child in children for grandchild in _children(child)]
+
+
+def _io_bytes() -> dict:
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return {"read_bytes": int(counters["read_bytes"]), "write_bytes": int(counters["write_bytes"])}
+    except (OSError, KeyError, ValueError):
+        return {"read_bytes": 0, "write_bytes": 0}
+
+
+def _function_name(code) -> str:
+    filename = code.co_filename
+    for root in [os.getcwd()] + sorted(sys.path, key=len, reverse=True):
+        if root and filename.startswith(root + os.sep):
+            filename = filename[len(root) + 1:]
+            break
+    return f"{filename}:{code.co_name}"
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one thread and the memory of the process and its children every interval seconds.
+
+    Every sample counts once for each function on the stack (inclusive) and once for the innermost one (exclusive), so
+    the counts divided by the number of samples are the fractions of the wall time spent in (below) a function.
+    """
+
+    def __init__(self, thread_id, interval, flush=None, flush_every=60.0):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.flush = flush
+        self.flush_every = flush_every
+        self.samples = 0
+        self.inclusive = Counter()
+        self.exclusive = Counter()
+        self.peak_rss = 0
+        self.peak_children_rss = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last_flush = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+            if self.flush is not None and time.perf_counter() - last_flush > self.flush_every:
+                self.flush()
+                last_flush = time.perf_counter()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is not None:
+            self.samples += 1
+            self.exclusive[_function_name(frame.f_code)] += 1
+            stack = set()
+            while frame is not None:
+                stack.add(_function_name(frame.f_code))
+                frame = frame.f_back
+            self.inclusive.update(stack)
+        self.peak_rss = max(self.peak_rss, _rss(os.getpid()))
+        self.peak_children_rss = max(self.peak_children_rss, sum(_rss(child) for child in _children(os.getpid())))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def stages(self, top=50) -> list[dict]:
+        samples = max(self.samples, 1)
+        return [{"function": function, "inclusive": count / samples, "exclusive": self.exclusive[function] / samples}
+                for function, count in self.inclusive.most_common(top)]
+
+
+class Profiled:
+    """Wraps a get_*_features function and profiles it in the process it runs in, i.e. in the pynisher subprocess.
+
+    The profile is written to ``path`` with status "running" at the start and every ``flush_every`` seconds, and at the
+    end with status "ok" or "error", so a run that pynisher kills for its time or memory limit keeps its last snapshot.
+    """
+
+    def __init__(self, fe_function, path, interval=0.05, flush_every=60.0, top=50):
+        functools.update_wrapper(self, fe_function)
+        self.fe_function = fe_function
+        self.path = Path(path)
+        self.interval = interval
+        self.flush_every = flush_every
+        self.top = top
+
+    def __call__(self, *args, **kwargs):
+        start = {
+            "wall": time.perf_counter(),
+            "self": resource.getrusage(resource.RUSAGE_SELF),
+            "children": resource.getrusage(resource.RUSAGE_CHILDREN),
+            "io": _io_bytes(),
+        }
+        sampler = StackSampler(threading.get_ident(), self.interval, flush_every=self.flush_every)
+        sampler.flush = lambda: self._write(start, sampler, "running")
+        # Replaces the profile of an earlier run, which would otherwise be reported if this run is killed before a flush
+        self._write(start, sampler, "running")
+        sampler.start()
+        try:
+            result = self.fe_function(*args, **kwargs)
+        except BaseException as e:
+            sampler.stop()
+            self._write(start, sampler, "error", error=f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+            raise
+        sampler.stop()
+        self._write(start, sampler, "ok", result=result)
+        return result
+
+    def _write(self, start, sampler, status, result=None, error=None):
+        usage_self = resource.getrusage(resource.RUSAGE_SELF)
+        usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        io = _io_bytes()
+        profile = {
+            "function": self.fe_function.__name__,
+            "status": status,
+            "error": error,
+            "wall_time": time.perf_counter() - start["wall"],
+            "cpu_user": usage_self.ru_utime - start["self"].ru_utime,
+            "cpu_system": usage_self.ru_stime - start["self"].ru_stime,
+            "cpu_children": (usage_children.ru_utime + usage_children.ru_stime
+                             - start["children"].ru_utime - start["children"].ru_stime),
+            # ru_maxrss is in KiB on Linux, the samples catch children that are still alive (JVM, Ray, ...)
+            "peak_rss_mb": max(usage_self.ru_maxrss * 1024, sampler.peak_rss) / 2 ** 20,
+            "peak_children_rss_mb": max(usage_children.ru_maxrss * 1024, sampler.peak_children_rss) / 2 ** 20,
+            "read_bytes": io["read_bytes"] - start["io"]["read_bytes"],
+            "write_bytes": io["write_bytes"] - start["io"]["write_bytes"],
+            "samples": sampler.samples,
+            "stages": sampler.stages(self.top),
+            "created": time.time(),
+        }
+        if isinstance(result, tuple):
+            shapes = [list(value.shape) for value in result if hasattr(value, "shape")]
+            if len(shapes) == 2:
+                profile["train_shape"], profile["test_shape"] = shapes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(profile, indent=2, default=str))
+        os.replace(tmp_path, self.path)
+
+
+def read_profile(path, killed_status="killed") -> dict:
+    """The profile of a finished call. A profile that is still "running" belongs to a process pynisher has killed."""
+    path = Path(path)
+    if not path.is_file():
+        return {"status": killed_status}
+    profile = json.loads(path.read_text())
+    if profile["status"] == "running":
+        profile["status"] = killed_status
+        path.write_text(json.dumps(profile, indent=2, default=str))
+    return profile
+
+
+def profile_summary(profile) -> dict:
+    """Flat resource columns of a profile for the exec_times frames."""
+    keys = ["status", "wall_time", "cpu_user", "cpu_system", "cpu_children", "peak_rss_mb", "peak_children_rss_mb",
+            "read_bytes", "write_bytes"]
+    summary = {key: profile.get(key) for key in keys}
+    summary["train_shape"] = str(profile.get("train_shape"))
+    summary["test_shape"] = str(profile.get("test_shape"))
+    return summary
@@ -1,12 +1,22 @@
 import argparse
+import math
 import os
-import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, NamedTuple
 
 import pandas as pd
 from pynisher import limit, WallTimeoutException, MemoryLimitException
+from threadpoolctl import threadpool_limits
 
+from src.datasets.Artifacts import ARTIFACT_STATS, load_first_features, save_features
+from src.datasets.Cache import get_cache_meta
 from src.datasets.Datasets import get_amlb_dataset, construct_dataframe
+from src.feature_engineering.Configs import FE_CONFIGS
+from src.feature_engineering.Profiler import Profiled, profile_path, profile_summary, read_profile
 
 # Imports for all working methods
 from src.feature_engineering.autofeat.Autofeat import get_autofeat_features
@@ -22,329 +32,288 @@ from src.feature_engineering.MAFESE.MAFESE import get_mafese_features
 from src.feature_engineering.MLJAR.MLJAR import get_mljar_features
 from src.feature_engineering.OpenFE.OpenFE import get_openFE_features
 
+WALL_TIME = (4, "h")
+# pynisher memory limit of every method, as in the sequential pipeline
+MEMORY_LIMIT = (32, "GB")
+# Memory in GB per memory class, only used to admit concurrent methods to the node (ResourceBudget), not as a limit
+MEMORY_CLASSES = {"light": 4, "medium": 16, "heavy": 32}
+
+
+class FESplit(NamedTuple):
+    train_x: pd.DataFrame
+    train_y: pd.Series
+    test_x: pd.DataFrame
+    test_y: pd.Series
+    name: str
+    task_hint: str
+
+
+@dataclass(frozen=True)
+class FEMethod:
+    """A feature engineering function, its alternative configurations (see FE_CONFIGS) and the resources it needs.
+
+    ``arguments`` maps a split and a configuration (plus the method's "threads") to the positional arguments of
+    ``function``. The configurations are tried in order while the call fails with one of ``retry_on``. ``forks`` marks
+    methods that start a JVM ("jvm") or Ray ("ray") next to the Python process.
+    """
+    function: Callable
+    configs: list[dict]
+    arguments: Callable[[FESplit, dict], tuple]
+    threads: int = 1
+    memory: str = "medium"
+    forks: str | None = None
+    retry_on: tuple[type[Exception], ...] = field(default=())
+
+    @property
+    def memory_gb(self) -> int:
+        return MEMORY_CLASSES[self.memory]
+
+    @property
+    def exclusive(self) -> bool:
+        # A JVM or Ray sizes itself to the node, so it does not share it with other methods
+        return self.forks is not None
+
+
+# Method -> registry entry, the function and configuration are part of the key in the feature artifact store
+FE_METHODS = {
+    "autofeat": FEMethod(get_autofeat_features, FE_CONFIGS["autofeat"],
+                         lambda s, c: (s.train_x, s.train_y, s.test_x, s.task_hint, c["feat_eng_steps"],
+                                       c["feat_sel_steps"]), memory="heavy"),
+    "autogluon": FEMethod(get_autogluon_features, FE_CONFIGS["autogluon"],
+                          lambda s, c: (s.train_x, s.train_y, s.test_x)),
+    "bioautoml": FEMethod(get_bioautoml_features, FE_CONFIGS["bioautoml"],
+                          lambda s, c: (s.train_x, s.train_y, s.test_x, c["estimations"], c["continuous"],
+                                        c["threads"]),
+                          threads=4, retry_on=(ValueError,)),
+    "boruta": FEMethod(get_boruta_features, FE_CONFIGS["boruta"], lambda s, c: (s.train_x, s.train_y, s.test_x)),
+    "correlationBasedFS": FEMethod(get_correlationbased_features, FE_CONFIGS["correlationBasedFS"],
+                                   lambda s, c: (s.train_x, s.train_y, s.test_x)),
+    "featuretools": FEMethod(get_featuretools_features, FE_CONFIGS["featuretools"],
+                             lambda s, c: (s.train_x, s.train_y, s.test_x, s.test_y, s.name), memory="heavy"),
+    "featurewiz": FEMethod(get_featurewiz_features, FE_CONFIGS["featurewiz"],
+                           lambda s, c: (s.train_x, s.train_y, s.test_x)),
+    "h2o": FEMethod(get_h2o_features, FE_CONFIGS["h2o"], lambda s, c: (s.train_x, s.train_y, s.test_x), threads=8,
+                    memory="heavy", forks="jvm"),
+    "macfe": FEMethod(get_macfe_features, FE_CONFIGS["macfe"],
+                      lambda s, c: (s.train_x, s.train_y, s.test_x, s.test_y, s.name)),
+    "mafese": FEMethod(get_mafese_features, FE_CONFIGS["mafese"],
+                       lambda s, c: (s.train_x, s.train_y, s.test_x, s.test_y, s.name, c["num_features"]),
+                       memory="light"),
+    "mljar": FEMethod(get_mljar_features, FE_CONFIGS["mljar"],
+                      lambda s, c: (s.train_x, s.train_y, s.test_x, c["num_features"]), memory="light"),
+    "openfe": FEMethod(get_openFE_features, FE_CONFIGS["openfe"],
+                       lambda s, c: (s.train_x, s.train_y, s.test_x, c["n_jobs"], s.name), memory="heavy"),
+}
+
+
+class ResourceBudget:
+    """CPUs and memory (GB) of the node, acquired by the methods that run concurrently on it."""
+
+    def __init__(self, cpus, memory_gb):
+        self.cpus = cpus
+        self.memory_gb = memory_gb
+        self.free_cpus = cpus
+        self.free_memory_gb = memory_gb
+        self._condition = threading.Condition()
+
+    def _request(self, fe_method, memory_gb) -> tuple[int, int]:
+        if fe_method is None or fe_method.exclusive:
+            return self.cpus, self.memory_gb
+        memory_gb = fe_method.memory_gb if memory_gb is None else min(memory_gb, fe_method.memory_gb)
+        # A method that needs more than the node gets the whole node instead of waiting forever
+        return min(fe_method.threads, self.cpus), min(memory_gb, self.memory_gb)
+
+    def acquire(self, fe_method, estimate=None) -> tuple[int, int]:
+        """Blocks until the method fits.
+
+        ``estimate()`` may return the expected memory in GB (at most the memory class) or None, it is re-evaluated
+        whenever resources are released.
+        """
+        with self._condition:
+            while True:
+                cpus, memory_gb = self._request(fe_method, None if estimate is None else estimate())
+                if self.free_cpus >= cpus and self.free_memory_gb >= memory_gb:
+                    break
+                self._condition.wait()
+            self.free_cpus -= cpus
+            self.free_memory_gb -= memory_gb
+        return cpus, memory_gb
+
+    def release(self, request):
+        cpus, memory_gb = request
+        with self._condition:
+            self.free_cpus += cpus
+            self.free_memory_gb += memory_gb
+            self._condition.notify_all()
+
+
+class ThreadLimited:
+    """Runs a feature engineering function with its native thread pools (BLAS, OpenMP) capped to the method's share."""
+
+    def __init__(self, fe_function, threads):
+        self.fe_function = fe_function
+        self.threads = threads
+        self.__name__ = fe_function.__name__
+
+    def __call__(self, *args):
+        os.environ["OMP_NUM_THREADS"] = str(self.threads)
+        with threadpool_limits(limits=self.threads):
+            return self.fe_function(*args)
+
+
+def run_fe_method(fe_method, fe_split, profile) -> tuple[pd.DataFrame | None, pd.DataFrame | None, dict, dict]:
+    """Runs one registered method under pynisher and returns the features, a record of the call and the configuration
+    that produced the features.
+
+    The record has the same fields for every outcome, "Status" is one of "ok", "timeout", "memory" or "error".
+    """
+    # The memory class only decides which methods share the node, every method runs under the same limit
+    memory = MEMORY_LIMIT
+    fe = limit(Profiled(ThreadLimited(fe_method.function, fe_method.threads), profile), wall_time=WALL_TIME,
+               memory=memory)
+    record = {"Status": "error", "Error": None, "Time": 0.0}
+    train_x = test_x = None
+    start_time = time.time()
+    for config in fe_method.configs:
+        try:
+            train_x, test_x = fe(*fe_method.arguments(fe_split, {**config, "threads": fe_method.threads}))
+            record.update(Status="ok", Error=None)
+            break
+        except WallTimeoutException as e:
+            record.update(Status="timeout", Error=f"WallTimeoutException: wall time limit {WALL_TIME} ({e})")
+            break
+        except MemoryLimitException as e:
+            record.update(Status="memory", Error=f"MemoryLimitException: memory limit {memory} ({e})")
+            break
+        except fe_method.retry_on as e:
+            record.update(Status="error", Error=f"{type(e).__name__}: {e}")
+        except Exception as e:
+            record.update(Status="error", Error=f"{type(e).__name__}: {e}")
+            break
+    record["Time"] = time.time() - start_time
+    if record["Status"] != "ok":
+        print(f"{fe_method.function.__name__} failed ({record['Status']}): {record['Error']}")
+    return train_x, test_x, record, config
+
+
+def parse_method_dataset(method_dataset) -> tuple[str, int]:
+    # Match against the registered prefixes, a regex on letters/digits would split e.g. "h2o359944" wrongly
+    for method in sorted(FE_METHODS, key=len, reverse=True):
+        if method_dataset.startswith(method) and method_dataset[len(method):].isdigit():
+            return method, int(method_dataset[len(method):])
+    raise ValueError(f"Unknown method or dataset in {method_dataset}, choose one of {list(FE_METHODS)} + task id")
+
 
 def main(args):
-    method_dataset = args.method_dataset
     # extract method name and task number from args
-    temp = re.compile("([a-zA-Z]+)([0-9]+)")
-    res = temp.match(method_dataset).groups()
-    method = res[0]
-    dataset = int(res[1])
-    # call execution method per method and task
-    run_and_save(method, dataset)
+    cells = [parse_method_dataset(method_dataset) for method_dataset in args.method_dataset]
+    # All splits of all cells are admitted against one budget, light methods share the node
+    budget = ResourceBudget(args.cpus, args.memory)
+    with ThreadPoolExecutor(max_workers=len(cells)) as executor:
+        list(executor.map(lambda cell: run_and_save(cell[0], cell[1], budget), cells))
 
 
-def run_and_save(method, dataset):
-    splits = 10
-    for split in range(splits):
+def _write_parquet(df, path):
+    # Concurrent splits (and cells on the same dataset) share the process, readers never see partial files
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _peak_memory_gb(df_times) -> float:
+    columns = [column for column in ["profile_peak_rss_mb", "profile_peak_children_rss_mb"] if column in df_times]
+    if df_times.empty or not columns or df_times["Status"].iloc[0] != "ok":
+        return 0.0
+    return float(df_times[columns].fillna(0).sum(axis=1).max()) / 1024
+
+
+def run_and_save(method, dataset, budget=None, splits=10):
+    """Runs the splits of one method and dataset concurrently, each admitted by the budget (default: one at a time).
+
+    The splits are sliced in this process from the memory-mapped dataset cache and handed to the forked pynisher
+    subprocesses, so the dataset is loaded once. Once splits have finished, the next ones request their observed peak
+    memory with some headroom instead of the whole memory class of the method.
+    """
+    budget = ResourceBudget(1, MEMORY_CLASSES["heavy"]) if budget is None else budget
+    fe_method = FE_METHODS.get(method)
+    observed_gb = []
+    lock = threading.Lock()
+    # Populate the dataset cache once before the splits read it concurrently
+    get_cache_meta(dataset)
+
+    def estimate():
+        with lock:
+            return math.ceil(1.5 * max(observed_gb)) + 1 if observed_gb else None
+
+    def run_split(split):
         # Get splits of dataset
         train_x, train_y, test_x, test_y, name, task_hint = get_amlb_dataset(dataset, split)
-        # Put it back together
-        df = construct_dataframe(train_x, train_y, test_x, test_y)
+        original_path = 'src/datasets/feature_engineered_datasets/' + task_hint + '_' + name + '_original' + '/' + task_hint + "_" + name + '_original_' + str(split) + '.parquet'
         # Save it in file if it does not exist
-        if not os.path.isfile('src/datasets/feature_engineered_datasets/' + task_hint + '_' + name + '_original' + '/' + task_hint + "_" + name + '_original_' + str(split) + '.parquet'):
-            df.to_parquet('src/datasets/feature_engineered_datasets/' + task_hint + '_' + name + '_original' + '/' + task_hint + "_" + name + '_original_' + str(split) + '.parquet', index=False)
-        df_times = pd.DataFrame()
-        if not os.path.isfile('src/datasets/feature_engineered_datasets/' + task_hint + '_' + name + '_' + method + '/' + task_hint + '_' + name + '_' + method + '_' + str(split) + '.parquet'):
+        if not os.path.isfile(original_path):
+            # Put it back together
+            _write_parquet(construct_dataframe(train_x, train_y, test_x, test_y), original_path)
+        if os.path.isfile('src/datasets/feature_engineered_datasets/' + task_hint + '_' + name + '_' + method + '/' + task_hint + '_' + name + '_' + method + '_' + str(split) + '.parquet'):
+            return
+        request = budget.acquire(fe_method, estimate)
+        try:
             # Pass different splits to fe methods and save time needed for fe
-            df_times = get_and_save_features(df_times, train_x, train_y, test_x, test_y, name, method, split, task_hint)
-            df_times.to_parquet('src/datasets/feature_engineered_datasets/exec_times/exec_times_' + name + '_' + method + '_' + str(split) + '.parquet', index=False)
+            df_times = get_and_save_features(pd.DataFrame(), train_x, train_y, test_x, test_y, name, method, split,
+                                             task_hint, dataset)
+            if peak_gb := _peak_memory_gb(df_times):
+                with lock:
+                    observed_gb.append(peak_gb)
+        finally:
+            budget.release(request)
+        _write_parquet(df_times, 'src/datasets/feature_engineered_datasets/exec_times/exec_times_' + name + '_' + method + '_' + str(split) + '.parquet')
+
+    with ThreadPoolExecutor(max_workers=splits) as executor:
+        list(executor.map(run_split, range(splits)))
 
 
-def get_and_save_features(df_times, train_x, train_y, test_x, test_y, name, method, split, task_hint):
-    execution_time = 0
+def get_and_save_features(df_times, train_x, train_y, test_x, test_y, name, method, split, task_hint, task_id):
     df = pd.DataFrame()
+    record = {'Dataset': name, 'Method': method, 'Split': split, 'Status': "error", 'Error': None, 'Time': 0.0}
+    fe_method = FE_METHODS.get(method)
 
-    if method == "autofeat":
-        try:
-            fe = limit(get_autofeat_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x, task_hint, 2, 5)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-
-    elif method == "autogluon":
-        try:
-            fe = limit(get_autogluon_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-
-    elif method == "bioautoml":
-        estimations = 50
-        continuous = False
-        try:
-            fe = limit(get_bioautoml_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x, estimations, continuous)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except ValueError:
-            continuous = True
-            try:
-                fe = limit(get_bioautoml_features, wall_time=(4, "h"), memory=(32, "GB"))
-                start_time = time.time()  #
-                train_x, test_x = fe(train_x, train_y, test_x, estimations, continuous)
-                end_time = time.time()  #
-                execution_time = end_time - start_time
-                df = construct_dataframe(train_x, train_y, test_x, test_y)
-            except WallTimeoutException:
-                print(WallTimeoutException)
-                print(fe.wall_time)
-                df = pd.DataFrame()
-            except MemoryLimitException:
-                print(MemoryLimitException)
-                print(fe.memory)
-                df = pd.DataFrame()
-            except Exception:
-                print(Exception)
-                df = pd.DataFrame()
-
-    elif method == "boruta":
-        try:
-            fe = limit(get_boruta_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-
-    elif method == "correlationBasedFS":
-        try:
-            fe = limit(get_correlationbased_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-
-    elif method == "featuretools":
-        try:
-            fe = limit(get_featuretools_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x, test_y, name)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-
-    elif method == "featurewiz":
-        try:
-            fe = limit(get_featurewiz_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-
-    elif method == "h2o":
-        try:
-            fe = limit(get_h2o_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-
-    elif method == "macfe":
-        try:
-            fe = limit(get_macfe_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x, test_y, name)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-
-    elif method == "mafese":
-        num_features = 50
-        try:
-            fe = limit(get_mafese_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x, test_y, name, num_features)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-
-    elif method == "mljar":
-        num_features = 50
-        try:
-            fe = limit(get_mljar_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x, num_features)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-
-    elif method == "openfe":
-        try:
-            fe = limit(get_openFE_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x, 1, name)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, r)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
+    if fe_method is None:
+        record['Error'] = f"Unknown feature engineering method {method}, known: {sorted(FE_METHODS)}"
+        print(record['Error'])
 
-    """
-    elif method == "nfs":
-        try:
-            fe = limit(get_nfs_features, wall_time=(4, "h"), memory=(32, "GB"))
-            start_time = time.time()  #
-            train_x, test_x = fe(train_x, train_y, test_x, test_y, name)
-            end_time = time.time()  #
-            execution_time = end_time - start_time
-            df = construct_dataframe(train_x, train_y, test_x, test_y)
-        except WallTimeoutException:
-            print(WallTimeoutException)
-            print(fe.wall_time)
-            df = pd.DataFrame()
-        except MemoryLimitException:
-            print(MemoryLimitException)
-            print(fe.memory)
-            df = pd.DataFrame()
-        except Exception:
-            print(Exception)
-            df = pd.DataFrame()
-    """
+    # Reuse features that were already computed for this split (e.g. by the AMLTK pipeline)
+    elif (first := load_first_features(task_id, split, method, fe_method.configs, fe_method.function)) is not None:
+        _, (train_x, test_x, meta) = first
+        record.update(Status="cached", Time=meta["execution_time"])
+        df = construct_dataframe(train_x, train_y, test_x, test_y)
+
+    else:
+        # Resource profile of the call, written by the pynisher subprocess next to the feature artifact
+        profile = profile_path(task_id, split, method, fe_method.configs[0], fe_method.function)
+        fe_split = FESplit(train_x, train_y, test_x, test_y, name, task_hint)
+        new_train_x, new_test_x, result, config = run_fe_method(fe_method, fe_split, profile)
+        record.update(result)
+        summary = profile_summary(read_profile(profile))
+        print(f"Profile of {method} on {name} split {split}: {summary}")
+        record.update({f"profile_{key}": value for key, value in summary.items()})
+        if record['Status'] == "ok":
+            df = construct_dataframe(new_train_x, train_y, new_test_x, test_y)
+            save_features(task_id, split, method, config, fe_method.function, new_train_x, new_test_x,
+                          record['Time'])
 
-    df.to_parquet('src/datasets/feature_engineered_datasets/' + task_hint + '_' + name + '_' + method + '/' + task_hint + '_' + name + '_' + method + '_' + str(split) + '.parquet', index=False)
-    df_times = df_times._append({'Dataset': name, 'Method': method, 'Time': execution_time}, ignore_index=True)
+    print(f"Feature artifact store: {ARTIFACT_STATS}")
+    _write_parquet(df, 'src/datasets/feature_engineered_datasets/' + task_hint + '_' + name + '_' + method + '/' + task_hint + '_' + name + '_' + method + '_' + str(split) + '.parquet')
+    df_times = df_times._append(record, ignore_index=True)
     return df_times
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Run feature engineering methods')
-    parser.add_argument('--method_dataset', type=str, required=True, help='Feature engineering dataset')
+    parser.add_argument('--method_dataset', type=str, nargs='+', required=True,
+                        help='Feature engineering dataset(s), e.g. "mljar359944 mafese359944" share the node')
+    parser.add_argument('--cpus', type=int, default=int(os.environ.get("SLURM_CPUS_PER_TASK", os.cpu_count())),
+                        help='CPUs of the node shared by the methods')
+    parser.add_argument('--memory', type=int, default=32, help='Memory of the node in GB shared by the methods')
     args = parser.parse_args()
     main(args)